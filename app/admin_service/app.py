@@ -11,9 +11,16 @@ def health():
 
 @app.route("/staged", methods=["GET"])
 def staged():
+    """GET -> staged CSV; ?format=parquet returns the Parquet staging file when it is current."""
     f = DATA_DIR / "staged.csv"
     if not f.exists():
         return jsonify({"exists": False}), 404
+    if request.args.get("format") == "parquet":
+        from etl.staging import fresh_staged_parquet
+        pq_file = fresh_staged_parquet(f)
+        if pq_file is None:
+            return jsonify({"exists": False, "format": "parquet"}), 404
+        return send_file(str(pq_file), mimetype="application/vnd.apache.parquet")
     return send_file(str(f), mimetype="text/csv")
 
 @app.route("/validate", methods=["POST"])
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+benchmarks/bench_email_validation.py
+
+Times the strict Email check in etl/validate.py: the per-row
+validate_email_strict apply against the vectorized validate_email_series,
+on the Email column of the sample extract tiled up to --rows rows.
+
+Usage (from repo root):
+  python benchmarks/bench_email_validation.py                 # 10M rows
+  python benchmarks/bench_email_validation.py --rows 1000000 --repeat 3
+"""
+from pathlib import Path
+import argparse
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+from etl.utils import read_csv
+from etl.validate import validate_email_series, validate_email_strict
+
+DEFAULT_CSV = ROOT / "sample_data" / "retail_data_Source.csv"
+
+
+def scaled_column(csv_path, rows: int) -> pd.Series:
+    emails = read_csv(csv_path, text=True)["Email"]
+    reps = -(-rows // len(emails))
+    return pd.Series(np.tile(emails.to_numpy(dtype=object), reps)[:rows], dtype=emails.dtype)
+
+
+def best_of(func, repeat: int):
+    best, out = None, None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = func()
+        elapsed = time.perf_counter() - t0
+        best = elapsed if best is None else min(best, elapsed)
+    return best, out
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--csv", default=str(DEFAULT_CSV))
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--repeat", type=int, default=1)
+    args = parser.parse_args()
+
+    ser = scaled_column(args.csv, args.rows)
+    print(f"rows: {len(ser)}  dtype: {ser.dtype}")
+
+    per_row, expected = best_of(lambda: ser.apply(validate_email_strict).astype(bool), args.repeat)
+    vectorized, got = best_of(lambda: validate_email_series(ser), args.repeat)
+
+    assert (expected.to_numpy() == got.to_numpy()).all(), "vectorized check disagrees with validate_email_strict"
+    print(f"per-row apply:  {per_row:.2f}s")
+    print(f"vectorized:     {vectorized:.2f}s  ({per_row / vectorized:.1f}x)")
+    print(f"invalid rows:   {int((~got).sum())}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,13 @@
 #!/usr/bin/env python3
 """
-etl/clean_csv.py
+etl/bad_records.py
 
 Usage (from repo root):
   # preview cleaning (doesn't write unless --out)
-  python etl/clean_csv.py --csv sample_data/retail_data_Source.csv --preview
+  python etl/bad_records.py --csv sample_data/retail_data_Source.csv --preview
 
   # write cleaned CSV and save rejects
-  python etl/clean_csv.py --csv sample_data/retail_data_Source.csv --out data/cleaned.csv --fill-defaults --drop-missing
+  python etl/bad_records.py --csv sample_data/retail_data_Source.csv --out data/cleaned.csv --fill-defaults --drop-missing
 
 Options:
   --csv PATH              input CSV (required)
@@ -16,145 +16,41 @@ Options:
   --fill-defaults         fill missing Transaction_ID/Customer_ID/Email with defaults
   --drop-missing          drop rows missing critical fields (Amount or Email) and save them to bad_records
   --preview               only show counts and sample fixes, do not write file
-  --date-formats          comma-separated list of input date formats to try
-  --time-formats          comma-separated list of input time formats to try
+  --date-formats          comma-separated list of input date formats to try, overriding the cleaning rules
+  --time-formats          comma-separated list of input time formats to try, overriding the cleaning rules
+  --chunksize N           stream the input N rows at a time, appending to --out and --bad-records-out
+  --workers N             clean N byte-range partitions in parallel processes, merged in row order
+  --id-mode MODE          missing Transaction_ID fill: random (UUID4, default) or content (stable hash of the row)
 """
 from pathlib import Path
 import argparse
-import pandas as pd
-import uuid
-from datetime import datetime
+import sys
 
-DEFAULT_OUT = Path("data/cleaned.csv")
-DEFAULT_BAD_OUT = Path("data/bad_records.csv")
-
-
-def try_parse_date(val, fmts):
-    if pd.isna(val): 
-        return None
-    s = str(val).strip()
-    if s == "":
-        return None
-    for f in fmts:
-        try:
-            dt = datetime.strptime(s, f)
-            return dt.strftime("%Y-%m-%d")  # normalized target
-        except Exception:
-            continue
-    return None
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+from etl.clean_csv import DEFAULT_OUT, ID_MODES, clean_csv as _clean_csv
 
-
-def try_parse_time(val, fmts):
-    if pd.isna(val):
-        return None
-    s = str(val).strip()
-    if s == "":
-        return None
-    for f in fmts:
-        try:
-            dt = datetime.strptime(s, f)
-            return dt.strftime("%H:%M:%S")  # normalized target
-        except Exception:
-            continue
-    return None
+DEFAULT_BAD_OUT = Path("data/bad_records.csv")
 
 
 def clean_csv(in_path: Path, out_path: Path = DEFAULT_OUT, bad_records_out: Path = DEFAULT_BAD_OUT, 
               fill_defaults: bool = False, drop_missing: bool = False, 
-              date_formats=None, time_formats=None, preview=False):
-    
-    date_formats = date_formats or ["%m/%d/%Y", "%Y-%m-%d"]
-    time_formats = time_formats or ["%H:%M:%S", "%H:%M"]
-
-    df = pd.read_csv(in_path, dtype=str)
-
-    # normalize whitespace
-    df = df.map(lambda x: x.strip() if isinstance(x, str) else x)
-
-    # 1) normalize Date -> YYYY-MM-DD
-    df["__parsed_date"] = df["Date"].apply(lambda v: try_parse_date(v, date_formats) if "Date" in df.columns else None)
-
-    # 2) normalize Time -> HH:MM:SS
-    if "Time" in df.columns:
-        df["__parsed_time"] = df["Time"].apply(lambda v: try_parse_time(v, time_formats))
-    else:
-        df["__parsed_time"] = None
-
-    # 3) fill defaults if requested
-    if fill_defaults:
-        if "Transaction_ID" in df.columns:
-            missing_tx = df["Transaction_ID"].isna() | (df["Transaction_ID"].astype(str).str.strip() == "") | (df["Transaction_ID"].astype(str).str.lower() == "nan")
-            df.loc[missing_tx, "Transaction_ID"] = [str(uuid.uuid4()) for _ in range(missing_tx.sum())]
-
-        if "Customer_ID" in df.columns:
-            missing_cust = df["Customer_ID"].isna() | (df["Customer_ID"].astype(str).str.strip() == "") | (df["Customer_ID"].astype(str).str.lower() == "nan")
-            df.loc[missing_cust, "Customer_ID"] = "unknown"
-
-        if "Email" in df.columns:
-            missing_email = df["Email"].isna() | (df["Email"].astype(str).str.strip() == "") | (df["Email"].astype(str).str.lower() == "nan")
-            df.loc[missing_email, "Email"] = "unknown@example.com"
-
-    # 4) Separate BAD records from GOOD records
-    dropped = 0
-    if drop_missing:
-        cond_amount_missing = ("Amount" in df.columns) and (df["Amount"].isna() | (df["Amount"].astype(str).str.strip() == "") | (df["Amount"].astype(str).str.lower() == "nan"))
-        cond_email_missing = ("Email" in df.columns) and (df["Email"].isna() | (df["Email"].astype(str).str.strip() == "") | (df["Email"].astype(str).str.lower() == "nan"))
-        
-        # Create masks
-        bad_mask = (cond_amount_missing | cond_email_missing)
-        keep_mask = ~bad_mask
-        
-        # Extract bad rows
-        bad_rows = df[bad_mask]
-        dropped = len(bad_rows)
-
-        # Save bad rows if any exist and not in preview mode
-        if dropped > 0 and not preview:
-            bad_records_out.parent.mkdir(parents=True, exist_ok=True)
-            bad_rows.to_csv(bad_records_out, index=False)
-            print(f"⚠ Wrote {dropped} rejected rows to: {bad_records_out}")
-
-        # Filter the main DataFrame to keep only good rows
-        df = df[keep_mask]
-    else:
-        dropped = 0
-
-    # 5) apply parsed normalized date/time back to columns
-    if "__parsed_date" in df.columns:
-        df.loc[df["__parsed_date"].notna(), "Date"] = df.loc[df["__parsed_date"].notna(), "__parsed_date"]
-        df = df.drop(columns="__parsed_date")
-    if "__parsed_time" in df.columns:
-        df.loc[df["__parsed_time"].notna(), "Time"] = df.loc[df["__parsed_time"].notna(), "__parsed_time"]
-        df = df.drop(columns="__parsed_time")
-
-    # 6) optional: coerce numeric columns
-    for col in ["Item_Price", "Amount", "Total_Amount", "Total_Purchases", "Ratings"]:
-        if col in df.columns:
-            df[col] = pd.to_numeric(df[col], errors="coerce")
-
-    # Summary
-    summary = {
-        "original_rows": None,
-        "final_rows": int(df.shape[0]),
-        "dropped_rows": int(dropped),
-        "missing_transaction_ids_after": int((df["Transaction_ID"].isna() | (df["Transaction_ID"].astype(str).str.strip() == "")).sum()) if "Transaction_ID" in df.columns else 0,
-        "missing_customer_ids_after": int((df["Customer_ID"].isna() | (df["Customer_ID"].astype(str).str.strip() == "")).sum()) if "Customer_ID" in df.columns else 0,
-        "missing_emails_after": int((df["Email"].isna() | (df["Email"].astype(str).str.strip() == "")).sum()) if "Email" in df.columns else 0,
-    }
-
-    if preview:
-        print("Preview summary (no file written):")
-        print(summary)
-        print("Sample rows (first 5):")
-        print(df.head(5).to_dict(orient="records"))
-        return summary
-
-    # Ensure output folder exists
-    out_path.parent.mkdir(parents=True, exist_ok=True)
-    df.to_csv(out_path, index=False)
-    print(f"✔ Wrote cleaned file to: {out_path}")
-    print("Summary:", summary)
-    return summary
+              date_formats=None, time_formats=None, preview=False, chunksize: int = None, workers: int = 1, id_mode: str = "random"):
+    """Same cleaning as etl/clean_csv.py, but rows dropped by --drop-missing are saved to bad_records_out."""
+    return _clean_csv(
+        in_path,
+        out_path=out_path,
+        fill_defaults=fill_defaults,
+        drop_missing=drop_missing,
+        date_formats=date_formats,
+        time_formats=time_formats,
+        preview=preview,
+        bad_records_out=bad_records_out,
+        chunksize=chunksize,
+        workers=workers,
+        id_mode=id_mode,
+    )
 
 
 def _cli():
@@ -165,12 +61,15 @@ def _cli():
     parser.add_argument("--fill-defaults", action="store_true")
     parser.add_argument("--drop-missing", action="store_true")
     parser.add_argument("--preview", action="store_true")
-    parser.add_argument("--date-formats", default="%m/%d/%Y,%Y-%m-%d")
-    parser.add_argument("--time-formats", default="%H:%M:%S,%H:%M")
+    parser.add_argument("--date-formats", default=None, help="Override the cleaning rules' date formats")
+    parser.add_argument("--time-formats", default=None, help="Override the cleaning rules' time formats")
+    parser.add_argument("--chunksize", type=int, default=None, help="Stream the input this many rows at a time")
+    parser.add_argument("--workers", type=int, default=1, help="Clean byte-range partitions in this many processes")
+    parser.add_argument("--id-mode", choices=ID_MODES, default="random", help="How --fill-defaults fills missing Transaction_IDs")
     args = parser.parse_args()
 
-    date_formats = [s.strip() for s in args.date_formats.split(",") if s.strip()]
-    time_formats = [s.strip() for s in args.time_formats.split(",") if s.strip()]
+    date_formats = [s.strip() for s in args.date_formats.split(",") if s.strip()] if args.date_formats else None
+    time_formats = [s.strip() for s in args.time_formats.split(",") if s.strip()] if args.time_formats else None
 
     clean_csv(
         Path(args.csv),
@@ -180,7 +79,10 @@ def _cli():
         drop_missing=args.drop_missing,
         date_formats=date_formats,
         time_formats=time_formats,
-        preview=args.preview
+        preview=args.preview,
+        chunksize=args.chunksize,
+        workers=args.workers,
+        id_mode=args.id_mode
     )
 
 
@@ -9,26 +9,53 @@ Usage (from repo root):
   # write cleaned CSV
   python etl/clean_csv.py --csv sample_data/retail_data_Source.csv --out data/cleaned.csv --fill-defaults
 
+  # stream a large extract 100k rows at a time
+  python etl/clean_csv.py --csv big_extract.csv --out data/cleaned.csv --chunksize 100000
+
+Cleaning rules (formats, defaults, required and numeric columns) come from
+the `cleaning:` section of configs/ingestion_config.yml; see etl/cleaning_rules.py.
+
 Options:
   --csv PATH           input CSV (required)
   --out PATH           output cleaned CSV (defaults to data/cleaned.csv)
-  --fill-defaults      fill missing Transaction_ID/Customer_ID/Email with defaults
-  --drop-missing       drop rows missing critical fields (Amount or Email)
+  --fill-defaults      fill missing values with the defaults from the cleaning rules (Transaction_ID/Customer_ID/Email)
+  --drop-missing       drop rows missing required fields from the cleaning rules (Amount or Email)
   --preview            only show counts and sample fixes, do not write file
-  --date-formats       comma-separated list of input date formats to try (default: %m/%d/%Y,%Y-%m-%d)
-  --time-formats       comma-separated list of input time formats to try (default: %H:%M:%S,%H:%M)
+  --date-formats       comma-separated list of input date formats to try (default: from the cleaning rules)
+  --time-formats       comma-separated list of input time formats to try (default: from the cleaning rules)
+  --chunksize N        stream the input N rows at a time (bounded memory); default reads the whole file
+  --workers N          clean N byte-range partitions of the file in parallel processes (default: 1)
+  --id-mode MODE       missing Transaction_ID fill: random (UUID4, default) or content (stable hash of the row)
 """
 from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
 import argparse
+import numpy as np
 import pandas as pd
-import uuid
+import shutil
+import sys
+import tempfile
+import time
 from datetime import datetime
 
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+from etl.ids import bulk_uuid4, content_uuids
+from etl.cleaning_rules import UUID_DEFAULT, CleaningPlan, load_plan
+from etl.staging import TypedColumns, fresh_typed_parquet
+from etl.utils import open_csv_byte_range, read_csv, split_csv_byte_ranges
+
 DEFAULT_OUT = Path("data/cleaned.csv")
+ID_MODES = ("random", "content")
+_NAN_TOKENS = ["nan", "naN", "nAn", "nAN", "Nan", "NaN", "NAn", "NAN"]
+
+# summary counters that are summed across chunks
+SUMMARY_COUNTERS = ["final_rows", "dropped_rows", "missing_transaction_ids_after", "missing_customer_ids_after", "missing_emails_after"]
 
 
 def try_parse_date(val, fmts):
-    if pd.isna(val): 
+    if pd.isna(val):
         return None
     s = str(val).strip()
     if s == "":
@@ -57,88 +84,390 @@ def try_parse_time(val, fmts):
     return None
 
 
-def clean_csv(in_path: Path, out_path: Path = DEFAULT_OUT, fill_defaults: bool = False, drop_missing: bool = False, date_formats=None, time_formats=None, preview=False):
-    date_formats = date_formats or ["%m/%d/%Y", "%Y-%m-%d"]
-    time_formats = time_formats or ["%H:%M:%S", "%H:%M"]
+def _strip_column(ser: pd.Series) -> pd.Series:
+    if pd.api.types.is_string_dtype(ser.dtype) and ser.dtype != object:
+        # pandas string dtype: Arrow's utf8_trim_whitespace kernel when Arrow-backed
+        return ser.str.strip()
+    if ser.dtype == object and pd.api.types.infer_dtype(ser, skipna=True) in ("string", "empty"):
+        return ser.str.strip()
+    if ser.dtype == object:
+        # mixed values: only strings are stripped
+        return ser.map(lambda x: x.strip() if isinstance(x, str) else x)
+    return ser
+
+
+def strip_whitespace(df: pd.DataFrame, skip=()) -> pd.DataFrame:
+    """Strip surrounding whitespace from the string columns of `df`, one vectorized pass per column."""
+    df = df.copy(deep=False)
+    for col in df.columns:
+        if col not in skip:
+            df[col] = _strip_column(df[col])
+    return df
+
+
+class MissingMatrix:
+    """
+    Missing-value flags for the tracked columns, computed once per frame.
+
+    Two bitmaps (np.packbits, 8 rows per byte) are kept per column:
+    `blank` (NaN or empty after strip, what the summary counts) and
+    `nan_token` (the literal text "nan" in any case, which fill-defaults and
+    drop-missing also treat as missing). Steps that change the frame update
+    the flags instead of re-deriving them from the strings.
+    """
+
+    def __init__(self, df: pd.DataFrame, columns):
+        self.n = len(df)
+        self._blank = {}
+        self._nan_token = {}
+        for col in columns:
+            if col not in df.columns:
+                continue
+            ser = df[col]
+            text = ser.str.strip() if pd.api.types.is_string_dtype(ser.dtype) else ser.astype(str).str.strip()
+            isna = ser.isna().to_numpy()
+            self._blank[col] = np.packbits(isna | (text == "").to_numpy(dtype=bool, na_value=False))
+            self._nan_token[col] = np.packbits(~isna & text.isin(_NAN_TOKENS).to_numpy(dtype=bool, na_value=False))
+
+    def __contains__(self, col):
+        return col in self._blank
+
+    def _unpack(self, bits):
+        return np.unpackbits(bits, count=self.n).astype(bool)
+
+    def blank(self, col) -> np.ndarray:
+        return self._unpack(self._blank[col])
+
+    def missing(self, col) -> np.ndarray:
+        return self._unpack(self._blank[col] | self._nan_token[col])
+
+    def count_blank(self, col) -> int:
+        return int(np.unpackbits(self._blank[col], count=self.n).sum())
+
+    def mark_filled(self, col, filled: np.ndarray):
+        keep = np.packbits(~filled)
+        self._blank[col] &= keep
+        self._nan_token[col] &= keep
 
-    df = pd.read_csv(in_path, dtype=str)
+    def take(self, rows: np.ndarray):
+        """Keep only the rows where the bool array `rows` is True."""
+        for flags in (self._blank, self._nan_token):
+            for col, bits in flags.items():
+                flags[col] = np.packbits(self._unpack(bits)[rows])
+        self.n = int(rows.sum())
+
+
+def clean_frame(df: pd.DataFrame, fill_defaults: bool = False, drop_missing: bool = False, date_formats=None, time_formats=None, timings=None, id_mode: str = "random", plan: CleaningPlan = None, typed: pd.DataFrame = None):
+    """
+    Clean one DataFrame read with dtype=str (a whole file or a single chunk).
+
+    The column operations come from the compiled cleaning rules (`plan`,
+    default: the `cleaning:` section of the ingestion config, with
+    date_formats / time_formats overriding its parse formats). Every step
+    only looks at the rows it is given, so chunks can be cleaned
+    independently. Returns (cleaned_df, bad_rows_df, summary); bad_rows_df
+    is None unless drop_missing is set. Stage durations in seconds are added
+    to the optional `timings` dict. `typed` holds the same rows' coerced
+    numeric columns from validation's typed artifact (etl/staging.py); they
+    replace the pd.to_numeric pass for plain numeric rules.
+    """
+    plan = plan or load_plan(date_formats=date_formats, time_formats=time_formats)
+    rules = plan.present(df.columns)
+    timings = {} if timings is None else timings
 
     # normalize whitespace
-    df = df.applymap(lambda x: x.strip() if isinstance(x, str) else x)
+    t0 = time.perf_counter()
+    if plan.strip_whitespace:
+        df = strip_whitespace(df, skip=plan.strip_skip)
+    timings["strip_whitespace"] = timings.get("strip_whitespace", 0.0) + time.perf_counter() - t0
 
-    # 1) normalize Date -> YYYY-MM-DD
-    df["__parsed_date"] = df["Date"].apply(lambda v: try_parse_date(v, date_formats) if "Date" in df.columns else None)
+    # missing flags for the tracked columns, shared by steps 2, 3 and the summary
+    missing = MissingMatrix(df, plan.tracked_columns)
 
-    # 2) normalize Time -> HH:MM:SS
-    if "Time" in df.columns:
-        df["__parsed_time"] = df["Time"].apply(lambda v: try_parse_time(v, time_formats))
-    else:
-        df["__parsed_time"] = None
+    # 1) parse rules: normalized values go to a scratch column until rejected rows are split off
+    # each format is tried against the whole column (see etl/parsing.py)
+    for rule in rules:
+        if rule.parse is not None:
+            df[rule.parsed_column] = rule.parse_column(df[rule.column])
 
-    # 3) fill defaults if requested
+    # 2) fill defaults if requested
     if fill_defaults:
-        # Transaction_ID
-        if "Transaction_ID" in df.columns:
-            missing_tx = df["Transaction_ID"].isna() | (df["Transaction_ID"].astype(str).str.strip() == "") | (df["Transaction_ID"].astype(str).str.lower() == "nan")
-            df.loc[missing_tx, "Transaction_ID"] = [str(uuid.uuid4()) for _ in range(missing_tx.sum())]
-
-        # Customer_ID
-        if "Customer_ID" in df.columns:
-            missing_cust = df["Customer_ID"].isna() | (df["Customer_ID"].astype(str).str.strip() == "") | (df["Customer_ID"].astype(str).str.lower() == "nan")
-            df.loc[missing_cust, "Customer_ID"] = "unknown"
-
-        # Email
-        if "Email" in df.columns:
-            missing_email = df["Email"].isna() | (df["Email"].astype(str).str.strip() == "") | (df["Email"].astype(str).str.lower() == "nan")
-            df.loc[missing_email, "Email"] = "unknown@example.com"
-
-    # 4) drop rows with missing critical fields if requested (Amount or Email)
+        for rule in rules:
+            if rule.default is None:
+                continue
+            filled = missing.missing(rule.column)
+            if rule.default == UUID_DEFAULT:
+                if filled.any():
+                    if id_mode == "content":
+                        content_cols = [c for c in df.columns if c != rule.column and not c.startswith("__parsed_")]
+                        new_ids = content_uuids(df.loc[filled, content_cols])
+                    else:
+                        new_ids = bulk_uuid4(int(filled.sum()))
+                    df.loc[filled, rule.column] = new_ids
+            else:
+                df.loc[filled, rule.column] = rule.default
+            missing.mark_filled(rule.column, filled)
+
+    # 3) separate rows missing required fields if requested
+    bad_rows = None
     if drop_missing:
-        cond_amount_missing = ("Amount" in df.columns) and (df["Amount"].isna() | (df["Amount"].astype(str).str.strip() == "") | (df["Amount"].astype(str).str.lower() == "nan"))
-        cond_email_missing = ("Email" in df.columns) and (df["Email"].isna() | (df["Email"].astype(str).str.strip() == "") | (df["Email"].astype(str).str.lower() == "nan"))
-        # keep rows where both are present
-        keep_mask = ~ (cond_amount_missing | cond_email_missing)
-        dropped = (~keep_mask).sum()
-        df = df[keep_mask]
-    else:
-        dropped = 0
-
-    # 5) apply parsed normalized date/time back to columns
-    if "__parsed_date" in df.columns:
-        # where parsed exists, overwrite Date with normalized; else keep original
-        df.loc[df["__parsed_date"].notna(), "Date"] = df.loc[df["__parsed_date"].notna(), "__parsed_date"]
-        df = df.drop(columns="__parsed_date")
-    if "__parsed_time" in df.columns:
-        df.loc[df["__parsed_time"].notna(), "Time"] = df.loc[df["__parsed_time"].notna(), "__parsed_time"]
-        df = df.drop(columns="__parsed_time")
-
-    # 6) optional: coerce numeric columns (Item_Price, Amount) to numeric types and fill empties with NaN
-    for col in ["Item_Price", "Amount", "Total_Amount", "Total_Purchases", "Ratings"]:
-        if col in df.columns:
-            df[col] = pd.to_numeric(df[col], errors="coerce")
-
-    # Summary
-    summary = {
+        bad_mask = np.zeros(len(df), dtype=bool)
+        for rule in rules:
+            if rule.required:
+                bad_mask |= missing.missing(rule.column)
+        bad_rows = df[bad_mask]
+        if plan.strip_whitespace and plan.strip_skip:
+            # skipped columns are only left unstripped for to_numeric; rejected rows are written as text
+            bad_rows = strip_whitespace(bad_rows, skip=set(bad_rows.columns) - plan.strip_skip)
+        df = df[~bad_mask]
+        missing.take(~bad_mask)
+        if typed is not None:
+            typed = typed[~bad_mask]
+
+    # 4) apply parsed values (where parsed exists; else keep original) and coerce numerics
+    for rule in rules:
+        if rule.parse is not None:
+            parsed = df[rule.parsed_column]
+            df.loc[parsed.notna(), rule.column] = parsed[parsed.notna()]
+            df = df.drop(columns=rule.parsed_column)
+        if rule.numeric:
+            values = None
+            if typed is not None and rule.column in typed and _takes_typed(rule, plan, fill_defaults):
+                values = typed[rule.column].to_numpy(dtype="float64")
+                if not np.isnan(values).any():
+                    # the artifact is all float64, but to_numeric keeps a column without gaps integer
+                    values = None
+            df[rule.column] = values if values is not None else pd.to_numeric(df[rule.column], errors="coerce")
+
+    dropped = 0 if bad_rows is None else len(bad_rows)
+    return df, bad_rows, summarize_frame(df, dropped, missing)
+
+
+def _takes_typed(rule, plan: CleaningPlan, fill_defaults: bool) -> bool:
+    """Whether the artifact's value (to_numeric of the unstripped text) is what the rule would compute."""
+    if rule.parse is not None or (fill_defaults and rule.default is not None):
+        return False
+    return not plan.strip_whitespace or rule.column in plan.strip_skip
+
+
+def summarize_frame(df: pd.DataFrame, dropped: int, missing: MissingMatrix) -> dict:
+    return {
         "original_rows": None,
         "final_rows": int(df.shape[0]),
         "dropped_rows": int(dropped),
-        "missing_transaction_ids_after": int((df["Transaction_ID"].isna() | (df["Transaction_ID"].astype(str).str.strip() == "")).sum()) if "Transaction_ID" in df.columns else 0,
-        "missing_customer_ids_after": int((df["Customer_ID"].isna() | (df["Customer_ID"].astype(str).str.strip() == "")).sum()) if "Customer_ID" in df.columns else 0,
-        "missing_emails_after": int((df["Email"].isna() | (df["Email"].astype(str).str.strip() == "")).sum()) if "Email" in df.columns else 0,
+        "missing_transaction_ids_after": missing.count_blank("Transaction_ID") if "Transaction_ID" in missing else 0,
+        "missing_customer_ids_after": missing.count_blank("Customer_ID") if "Customer_ID" in missing else 0,
+        "missing_emails_after": missing.count_blank("Email") if "Email" in missing else 0,
     }
 
+
+def merge_summaries(summaries) -> dict:
+    merged = {"original_rows": None}
+    for key in SUMMARY_COUNTERS:
+        merged[key] = sum(s[key] for s in summaries)
+    return merged
+
+
+class _CsvAppender:
+    """Write DataFrames to one CSV, emitting the header only with the first write."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.rows = 0
+        self._started = False
+
+    def write(self, df: pd.DataFrame):
+        if not self._started:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            df.to_csv(self.path, index=False, mode="w")
+            self._started = True
+        else:
+            df.to_csv(self.path, index=False, mode="a", header=False)
+        self.rows += len(df)
+
+    @property
+    def started(self):
+        return self._started
+
+
+class _CleanRun:
+    """Per-run accumulator: chunk summaries, preview rows and stage timings. Picklable, so partitions can return one."""
+
+    def __init__(self):
+        self.summaries = []
+        self.preview_rows = []
+        self.timings = {}
+        self.columns = None
+        self.wrote_out = False
+        self.wrote_bad = False
+        self.numeric_kinds = {}
+
+    def note_numerics(self, cleaned: pd.DataFrame):
+        """Record whether each numeric column of a written chunk came out integer ("i") or float ("f")."""
+        if len(cleaned) == 0:
+            return
+        for col in cleaned.columns:
+            kind = cleaned[col].dtype.kind
+            if kind in "iuf":
+                self.numeric_kinds.setdefault(col, set()).add("f" if kind == "f" else "i")
+
+    def mixed_numerics(self) -> list:
+        """Numeric columns that were integer in some chunks and float in others."""
+        return [col for col, kinds in self.numeric_kinds.items() if len(kinds) > 1]
+
+    def merge(self, other: "_CleanRun"):
+        self.summaries.extend(other.summaries)
+        for col, kinds in other.numeric_kinds.items():
+            self.numeric_kinds.setdefault(col, set()).update(kinds)
+        self.preview_rows.extend(other.preview_rows[: 5 - len(self.preview_rows)])
+        for stage, seconds in other.timings.items():
+            self.timings[stage] = self.timings.get(stage, 0.0) + seconds
+        self.columns = self.columns or other.columns
+
+
+def _clean_frames(frames, out_writer, bad_writer, preview, typed: TypedColumns = None, **clean_kwargs) -> _CleanRun:
+    """Clean an iterable of frames, appending results to the writers (taking each chunk's rows of `typed`)."""
+    run = _CleanRun()
+    for chunk in frames:
+        run.columns = list(chunk.columns)
+        typed_chunk = typed.take(len(chunk)) if typed is not None else None
+        cleaned, bad_rows, summary = clean_frame(chunk, timings=run.timings, typed=typed_chunk, **clean_kwargs)
+        run.summaries.append(summary)
+
+        if preview:
+            if len(run.preview_rows) < 5:
+                run.preview_rows.extend(cleaned.head(5 - len(run.preview_rows)).to_dict(orient="records"))
+            continue
+        out_writer.write(cleaned)
+        run.note_numerics(cleaned)
+        if bad_writer is not None and summary["dropped_rows"] > 0:
+            bad_writer.write(bad_rows)
+    run.wrote_out = out_writer.started
+    run.wrote_bad = bad_writer is not None and bad_writer.started
+    return run
+
+
+def _clean_partition(in_path, start, end, header, part_out, part_bad, chunksize, preview, clean_kwargs) -> _CleanRun:
+    """Process-pool task: clean one byte range of the input into its own part files."""
+    out_writer = _CsvAppender(part_out)
+    bad_writer = _CsvAppender(part_bad) if part_bad is not None else None
+    with open_csv_byte_range(in_path, start, end, header) as fh:
+        frames = read_csv(fh, text=True, chunksize=chunksize, header=header) if chunksize else [read_csv(fh, text=True, header=header)]
+        return _clean_frames(frames, out_writer, bad_writer, preview, **clean_kwargs)
+
+
+def _concat_parts(parts, dest: Path):
+    """Concatenate CSV part files in order, keeping only the first header."""
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    with dest.open("wb") as fo:
+        for i, part in enumerate(parts):
+            with part.open("rb") as fi:
+                if i > 0:
+                    fi.readline()
+                shutil.copyfileobj(fi, fo)
+
+
+def _render_as_float(path: Path, columns, chunksize):
+    """
+    Rewrite `columns` of a cleaned CSV as floats.
+
+    pd.to_numeric leaves a column integer only when every value is an
+    integer; a whole-file clean then writes "9", and "9.0" once any value is
+    fractional or missing. Chunks decide this on their own rows, so when
+    they disagree the integer chunks are re-rendered the way the whole file
+    would have been.
+    """
+    tmp = path.with_name(f".{path.name}.float")
+    writer = _CsvAppender(tmp)
+    frames = read_csv(path, text=True, chunksize=chunksize, na_values=[""]) if chunksize else [read_csv(path, text=True, na_values=[""])]
+    for frame in frames:
+        for col in columns:
+            frame[col] = pd.to_numeric(frame[col], errors="coerce").astype("float64")
+        writer.write(frame)
+    tmp.replace(path)
+
+
+def _clean_parallel(in_path: Path, out_path: Path, bad_records_out, workers: int, chunksize, preview, clean_kwargs) -> _CleanRun:
+    """
+    Clean byte-range partitions of `in_path` in a process pool.
+
+    Each worker writes its partition to part files in a temp dir next to
+    `out_path`; the parts are then concatenated in partition order, so the
+    output keeps the original row order.
+    """
+    header, ranges = split_csv_byte_ranges(in_path, workers)
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    run = _CleanRun()
+    with tempfile.TemporaryDirectory(dir=out_path.parent, prefix=".clean_parts_") as tmp:
+        tmp = Path(tmp)
+        tasks = []
+        for i, (start, end) in enumerate(ranges):
+            part_bad = tmp / f"bad_{i:05d}.csv" if bad_records_out is not None else None
+            tasks.append((in_path, start, end, header, tmp / f"out_{i:05d}.csv", part_bad, chunksize, preview, clean_kwargs))
+
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_clean_partition, *zip(*tasks))) if tasks else []
+        for part in results:
+            run.merge(part)
+
+        out_parts = [t[4] for t, r in zip(tasks, results) if r.wrote_out]
+        bad_parts = [t[5] for t, r in zip(tasks, results) if r.wrote_bad]
+        if not preview:
+            if out_parts:
+                _concat_parts(out_parts, out_path)
+            if bad_parts:
+                _concat_parts(bad_parts, bad_records_out)
+        run.wrote_out = bool(out_parts)
+        run.wrote_bad = bool(bad_parts)
+    return run
+
+
+def clean_csv(in_path: Path, out_path: Path = DEFAULT_OUT, fill_defaults: bool = False, drop_missing: bool = False, date_formats=None, time_formats=None, preview=False, bad_records_out: Path = None, chunksize: int = None, workers: int = 1, id_mode: str = "random"):
+    """
+    Clean `in_path` into `out_path` and return the summary dict.
+
+    With `chunksize`, the input is streamed that many rows at a time and each
+    cleaned chunk is appended to `out_path` (and rejected rows to
+    `bad_records_out`), so peak memory does not depend on the file size.
+    With `workers` > 1, the file is split into byte-range partitions on line
+    boundaries that are cleaned in a process pool and merged in row order.
+    The summary and the output are the same in every mode. A fresh typed
+    artifact that validate.py --emit-typed left for `in_path` supplies the
+    numeric columns (single-process mode only).
+    """
+    clean_kwargs = dict(fill_defaults=fill_defaults, drop_missing=drop_missing, date_formats=date_formats, time_formats=time_formats, id_mode=id_mode)
+    if workers and workers > 1:
+        run = _clean_parallel(in_path, out_path, bad_records_out, workers, chunksize, preview, clean_kwargs)
+    else:
+        frames = read_csv(in_path, text=True, chunksize=chunksize) if chunksize else [read_csv(in_path, text=True)]
+        bad_writer = _CsvAppender(bad_records_out) if bad_records_out is not None else None
+        typed_path = fresh_typed_parquet(in_path)
+        typed = TypedColumns(typed_path) if typed_path is not None else None
+        run = _clean_frames(frames, _CsvAppender(out_path), bad_writer, preview, typed=typed, **clean_kwargs)
+
+    summary = merge_summaries(run.summaries)
+    timings = {stage: round(seconds, 3) for stage, seconds in run.timings.items()}
+
     if preview:
         print("Preview summary (no file written):")
         print(summary)
+        print("Stage timings (s):", timings)
         print("Sample rows (first 5):")
-        print(df.head(5).to_dict(orient="records"))
+        print(run.preview_rows)
         return summary
 
-    # Ensure output folder exists
-    out_path.parent.mkdir(parents=True, exist_ok=True)
-    df.to_csv(out_path, index=False)
-    print(f"Wrote cleaned file to: {out_path}")
+    mixed = run.mixed_numerics()
+    if run.wrote_out and mixed:
+        _render_as_float(out_path, mixed, chunksize)
+    if not run.wrote_out:
+        # header-only input: still produce a header-only output
+        columns = run.columns if run.columns is not None else pd.read_csv(in_path, nrows=0).columns
+        _CsvAppender(out_path).write(pd.DataFrame(columns=columns))
+    if run.wrote_bad:
+        print(f"⚠ Wrote {summary['dropped_rows']} rejected rows to: {bad_records_out}")
+    print(f"✔ Wrote cleaned file to: {out_path}")
     print("Summary:", summary)
+    print("Stage timings (s):", timings)
     return summary
 
 
@@ -149,12 +478,15 @@ def _cli():
     parser.add_argument("--fill-defaults", action="store_true")
     parser.add_argument("--drop-missing", action="store_true")
     parser.add_argument("--preview", action="store_true")
-    parser.add_argument("--date-formats", default="%m/%d/%Y,%Y-%m-%d")
-    parser.add_argument("--time-formats", default="%H:%M:%S,%H:%M")
+    parser.add_argument("--date-formats", default=None, help="Override the cleaning rules' date formats")
+    parser.add_argument("--time-formats", default=None, help="Override the cleaning rules' time formats")
+    parser.add_argument("--chunksize", type=int, default=None, help="Stream the input this many rows at a time")
+    parser.add_argument("--workers", type=int, default=1, help="Clean byte-range partitions in this many processes")
+    parser.add_argument("--id-mode", choices=ID_MODES, default="random", help="How --fill-defaults fills missing Transaction_IDs")
     args = parser.parse_args()
 
-    date_formats = [s.strip() for s in args.date_formats.split(",") if s.strip()]
-    time_formats = [s.strip() for s in args.time_formats.split(",") if s.strip()]
+    date_formats = [s.strip() for s in args.date_formats.split(",") if s.strip()] if args.date_formats else None
+    time_formats = [s.strip() for s in args.time_formats.split(",") if s.strip()] if args.time_formats else None
 
     clean_csv(
         Path(args.csv),
@@ -163,7 +495,10 @@ def _cli():
         drop_missing=args.drop_missing,
         date_formats=date_formats,
         time_formats=time_formats,
-        preview=args.preview
+        preview=args.preview,
+        chunksize=args.chunksize,
+        workers=args.workers,
+        id_mode=args.id_mode
     )
 
 
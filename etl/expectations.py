@@ -0,0 +1,524 @@
+"""Validation expectations planned up front and evaluated one column at a time.
+
+validate_csv used to walk the frame once per expectation, re-stripping the
+strings and rebuilding the null mask for every check. build_plan groups
+every expectation from the config by the column it reads; run_plan then
+visits each column once, and the expectations on that column share one
+ColumnView, which computes the stripped text, the blank mask and the numeric
+coercion at most once. Failures are reported in the order validate_csv has
+always used: exists, not-null, unique, type, email, date, time.
+
+Expectations are accumulators: run_plan feeds them a file chunk by chunk,
+each keeps a failure count and its first samples, and two accumulators for
+consecutive parts of a file merge into one. Uniqueness is counted exactly
+without holding the whole key column in memory (etl/uniqueness.py). The
+report is the same for any chunk size.
+"""
+import copy
+import functools
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from pandas.tseries.api import guess_datetime_format
+
+from etl import shared_frames
+from etl.parsing import matches_format_series
+from etl.uniqueness import BLOOM_BITS, SPILL_PARTITIONS, SPILL_ROWS, DuplicateCounter, RepeatFilter, key_hashes
+
+EMAIL_PATTERN = r"[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}"
+SAMPLE_SIZE = 10
+DUPLICATE_SAMPLE_SIZE = 20
+
+# report order of the expectation kinds
+EXISTS, NOT_NULL, UNIQUE, TYPE, EMAIL, DATE, TIME = range(7)
+
+STRING_TYPES = ("string", "str", "object")
+INT_TYPES = ("int", "integer")
+FLOAT_TYPES = ("float", "numeric", "number")
+TIMESTAMP_TYPES = ("timestamp", "datetime", "date")
+
+# values pd.to_datetime skips when inferring a format from the first element
+_DATETIME_SKIP = {"", "NaT", "nat", "NAT", "nan", "NaN", "NAN", "now", "today"}
+
+
+def _as_text(ser: pd.Series) -> pd.Series:
+    if pd.api.types.is_string_dtype(ser.dtype) and ser.dtype != object:
+        return ser
+    return ser.astype("str")
+
+
+def email_matches(stripped: pd.Series) -> np.ndarray:
+    """Full-match already stripped text against EMAIL_PATTERN; missing -> False."""
+    return _as_text(stripped).str.fullmatch(EMAIL_PATTERN).to_numpy(dtype=bool, na_value=False)
+
+
+class ColumnView:
+    """One column (of one chunk) plus the derived values its expectations share, each computed on first use."""
+
+    def __init__(self, ser: pd.Series):
+        self.ser = ser
+
+    @functools.cached_property
+    def stripped(self) -> pd.Series:
+        return _as_text(self.ser).str.strip()
+
+    @functools.cached_property
+    def blank(self) -> np.ndarray:
+        """NaN or empty after strip."""
+        return self.ser.isna().to_numpy(dtype=bool) | self.stripped.eq("").to_numpy(dtype=bool, na_value=False)
+
+    @functools.cached_property
+    def numeric(self) -> pd.Series:
+        return pd.to_numeric(self.ser, errors="coerce")
+
+    @functools.cached_property
+    def numeric_failed(self) -> np.ndarray:
+        """Non-blank values pd.to_numeric cannot convert."""
+        return self.numeric.isna().to_numpy(dtype=bool) & ~self.blank
+
+    def samples(self, mask: np.ndarray, n: int = SAMPLE_SIZE) -> list:
+        return self.ser[mask].head(n).astype(str).tolist()
+
+
+class Expectation:
+    """
+    One configured check on one column, accumulated over chunks.
+
+    Subclasses implement `failed_mask` (rows of a chunk that fail) and
+    `result` (the report body). `order` places the failure in the report.
+    """
+
+    kind = None
+    name = None
+    sample_size = SAMPLE_SIZE
+    # evaluated in the planning process (state that cannot go to a pool worker)
+    local_only = False
+
+    def __init__(self, column: str, index: int = 0):
+        self.column = column
+        self.order = (self.kind, index)
+        self.count = 0
+        self.samples = []
+
+    def failed_mask(self, view: ColumnView):
+        raise NotImplementedError
+
+    def update(self, view: ColumnView):
+        failed = self.failed_mask(view)
+        if failed is None:
+            return
+        self.count += int(failed.sum())
+        if len(self.samples) < self.sample_size:
+            self.samples.extend(view.samples(failed, self.sample_size - len(self.samples)))
+
+    def merge(self, other: "Expectation"):
+        """Fold in the accumulator of the rows that follow this one's."""
+        self.count += other.count
+        self.samples.extend(other.samples[: self.sample_size - len(self.samples)])
+
+    def fresh(self) -> "Expectation":
+        """An empty accumulator with the same configuration (and state learned so far)."""
+        clone = copy.copy(self)
+        clone.count = 0
+        clone.samples = []
+        return clone
+
+    def result(self) -> dict:
+        raise NotImplementedError
+
+    def close(self):
+        """Release resources held by the accumulator (e.g. spill files)."""
+
+    def failure(self):
+        """The failing-expectation dict, or None when the check passed."""
+        if not self.count:
+            return None
+        return {"expectation": self.name, "column": self.column, "success": False, "result": self.result()}
+
+
+class NotNull(Expectation):
+    kind = NOT_NULL
+    name = "expect_column_values_to_not_be_null"
+
+    def failed_mask(self, view):
+        return view.blank
+
+    def result(self):
+        return {"unexpected_count": self.count, "sample_unexpected_values": self.samples}
+
+
+class Unique(Expectation):
+    """
+    Exact uniqueness over every chunk (duplicated(keep=False) semantics).
+
+    By default every key goes to a disk-spilling DuplicateCounter. With
+    `prefilter` and a `source` to re-read the column from, the scan only
+    feeds Bloom filters, and a second pass over `source` counts just the
+    rows that may repeat (see etl/uniqueness.py); the result is the same.
+    """
+
+    kind = UNIQUE
+    name = "expect_column_values_to_be_unique"
+    local_only = True
+
+    def __init__(self, column, index=0, prefilter: bool = False, source=None, spill_rows: int = SPILL_ROWS, partitions: int = SPILL_PARTITIONS, bloom_bits: int = BLOOM_BITS):
+        super().__init__(column, index)
+        self.rows = 0
+        self.counter = DuplicateCounter(spill_rows, partitions)
+        self.repeats = RepeatFilter(bloom_bits) if prefilter and source is not None else None
+        # source(column) -> iterable of the column's chunks in file order, for the second pass
+        self.source = source
+        self._final = None
+
+    def update(self, view):
+        values = view.ser.to_numpy(dtype=object)
+        if self.repeats is None:
+            self.counter.add(values, np.arange(self.rows, self.rows + len(values), dtype=np.int64))
+        else:
+            self.repeats.update(key_hashes(values))
+        self.rows += len(values)
+
+    def merge(self, other: "Unique"):
+        if self.repeats is None:
+            self.counter.merge(other.counter, self.rows)
+        else:
+            self.repeats.merge(other.repeats)
+        self.rows += other.rows
+
+    def _second_pass(self):
+        """Feed the counter only the rows the Bloom filters flag as possible repeats."""
+        start = 0
+        for ser in self.source(self.column):
+            if start >= self.rows:
+                break
+            values = ser.to_numpy(dtype=object)[: self.rows - start]
+            candidates = self.repeats.maybe_repeated(key_hashes(values))
+            self.counter.add(values[candidates], np.flatnonzero(candidates).astype(np.int64) + start)
+            start += len(values)
+
+    def _finalize(self):
+        if self._final is None:
+            if self.repeats is not None and self.repeats.any():
+                self._second_pass()
+            self._final = self.counter.result(DUPLICATE_SAMPLE_SIZE)
+        return self._final
+
+    def close(self):
+        self.counter.close()
+
+    def failure(self):
+        self.count, self.samples = self._finalize()
+        return super().failure()
+
+    def result(self):
+        return {"duplicate_count": self.count, "sample_duplicate_values": self.samples}
+
+
+class NotInHistory(Expectation):
+    """Unique-key values must not have been ingested from another file (etl/key_index.py)."""
+
+    kind = UNIQUE
+    name = "expect_column_values_to_not_exist_in_history"
+    local_only = True
+
+    def __init__(self, column, index, key_index, load_id=None):
+        super().__init__(column, index)
+        # reported right after the in-file uniqueness check of the same key
+        self.order = (UNIQUE, index, 1)
+        self.key_index = key_index
+        self.load_id = load_id
+
+    def failed_mask(self, view):
+        return self.key_index.probe(self.column, view.ser.to_numpy(dtype=object), exclude_load=self.load_id)
+
+    def result(self):
+        return {"existing_count": self.count, "sample_existing_values": self.samples}
+
+
+def _first_datetime_candidate(ser: pd.Series):
+    """The element pd.to_datetime would infer a format from, or None."""
+    for value in ser.dropna():
+        if not (isinstance(value, str) and value in _DATETIME_SKIP):
+            return value
+    return None
+
+
+class TypeConvertible(Expectation):
+    """
+    Values convert to the configured type. Timestamp columns with a format
+    in the config's `validations:` are parsed with exactly that format;
+    the others fall back to pd.to_datetime's format inference.
+    """
+
+    kind = TYPE
+    name = "expect_column_type_convertible"
+
+    def __init__(self, column, index, desired_type, fmt: str = None):
+        super().__init__(column, index)
+        self.desired_type = desired_type
+        self.fmt = fmt
+        # format pd.to_datetime inferred from the column's first value, fixed for later chunks
+        self._datetime_format = None
+
+    @property
+    def inferred(self) -> bool:
+        """Whether this is a timestamp check without a configured format."""
+        return self.desired_type in TIMESTAMP_TYPES and self.fmt is None
+
+    def _to_datetime(self, ser):
+        if self._datetime_format is None:
+            first = _first_datetime_candidate(ser)
+            if first is None:
+                return pd.to_datetime(ser, errors="coerce")
+            guessed = guess_datetime_format(first) if isinstance(first, str) else None
+            self._datetime_format = guessed or "mixed"
+        return pd.to_datetime(ser, format=self._datetime_format, errors="coerce")
+
+    def merge(self, other):
+        super().merge(other)
+        self._datetime_format = self._datetime_format or other._datetime_format
+
+    def failed_mask(self, view):
+        if self.desired_type in INT_TYPES or self.desired_type in FLOAT_TYPES:
+            return view.numeric_failed
+        if self.desired_type in TIMESTAMP_TYPES:
+            if self.fmt is not None:
+                # parsed once per distinct value, see etl/parsing.py
+                return ~matches_format_series(view.ser, self.fmt).to_numpy(dtype=bool) & ~view.blank
+            try:
+                coerced = self._to_datetime(view.ser)
+            except Exception:
+                # parsing raised: every non-blank value counts as failed
+                return ~view.blank
+            return coerced.isna().to_numpy(dtype=bool) & ~view.blank
+        return None
+
+    def result(self):
+        res = {"desired_type": self.desired_type, "failed_count": self.count, "sample_bad_values": self.samples}
+        if self.fmt is not None:
+            res["expected_format"] = self.fmt
+        return res
+
+
+class StrictEmail(Expectation):
+    kind = EMAIL
+    name = "expect_column_values_to_match_strict_email"
+
+    def failed_mask(self, view):
+        return view.blank | ~email_matches(view.stripped)
+
+    def result(self):
+        return {"invalid_count": self.count, "sample_invalid_values": self.samples}
+
+
+class StrictFormat(Expectation):
+    """Exact strptime format (validate_date_strict / validate_time_strict semantics)."""
+
+    def __init__(self, column, kind, name, fmt):
+        self.kind = kind
+        self.name = name
+        super().__init__(column)
+        self.fmt = fmt
+
+    def failed_mask(self, view):
+        # parsed once per distinct value, see etl/parsing.py
+        return view.blank | ~matches_format_series(view.ser, self.fmt).to_numpy(dtype=bool)
+
+    def result(self):
+        return {"invalid_count": self.count, "sample_invalid_values": self.samples, "expected_format": self.fmt}
+
+
+class ValidationPlan:
+    """
+    Expectations grouped by the column they read, plus the failures already
+    known from the header alone (missing required / unique-key columns).
+    `rows` and `stopped_early` describe the last run_plan.
+    """
+
+    def __init__(self):
+        self.by_column = {}
+        self.missing = []
+        self.rows = 0
+        self.stopped_early = False
+
+    def add(self, expectation: Expectation):
+        self.by_column.setdefault(expectation.column, []).append(expectation)
+
+    def add_missing(self, column: str, order, reason: str):
+        self.missing.append((order, {"expectation": "expect_column_to_exist", "column": column, "success": False, "reason": reason}))
+
+    @property
+    def columns(self):
+        return list(self.by_column)
+
+    @property
+    def history_checks(self) -> int:
+        return sum(isinstance(exp, NotInHistory) for exp in self.expectations)
+
+    @property
+    def timestamp_checks(self) -> list:
+        return [exp for exp in self.expectations if isinstance(exp, TypeConvertible) and exp.desired_type in TIMESTAMP_TYPES]
+
+    @property
+    def expectations(self):
+        return [exp for exps in self.by_column.values() for exp in exps]
+
+    def update(self, df: pd.DataFrame, columns=None) -> dict:
+        """Evaluate the expectations of `columns` (default: all) on one chunk, one ColumnView per column; returns the views."""
+        views = {}
+        for col in self.by_column if columns is None else columns:
+            view = views[col] = ColumnView(df[col])
+            for exp in self.by_column[col]:
+                exp.update(view)
+        return views
+
+    def failed_values(self) -> int:
+        """Failing values so far (uniqueness is only known at the end and is not counted)."""
+        return sum(exp.count for exp in self.expectations if not isinstance(exp, Unique))
+
+    def failures(self) -> list:
+        """The failing expectations in report order."""
+        failures = list(self.missing)
+        for exp in self.expectations:
+            failure = exp.failure()
+            if failure is not None:
+                failures.append((exp.order, failure))
+        failures.sort(key=lambda item: item[0])
+        return [failure for _, failure in failures]
+
+    def close(self):
+        for exp in self.expectations:
+            exp.close()
+
+
+def datetime_format(validation):
+    """The strptime format of a `validations:` entry, or None (e.g. "email")."""
+    return validation if isinstance(validation, str) and "%" in validation else None
+
+
+def build_plan(cfg: dict, columns, unique_prefilter: bool = False, source=None, key_index=None, load_id=None) -> ValidationPlan:
+    """
+    Plan every expectation in the validate config (see validate.load_config) for a file with `columns`.
+
+    `unique_prefilter` and `source` (column -> iterable of that column's chunks)
+    enable the Bloom-filter uniqueness mode. With a `key_index`, unique keys
+    are also checked against the values ingested from other files (all but
+    `load_id`).
+    """
+    columns = set(columns)
+    validations = cfg.get("validations", {}) or {}
+    plan = ValidationPlan()
+
+    for i, col in enumerate(cfg["required"]):
+        if col not in columns:
+            plan.add_missing(col, (EXISTS, i), "column missing")
+        else:
+            plan.add(NotNull(col, i))
+    for i, key in enumerate(cfg["unique_keys"]):
+        if key not in columns:
+            plan.add_missing(key, (UNIQUE, i), "column missing (for uniqueness check)")
+        else:
+            plan.add(Unique(key, i, prefilter=unique_prefilter, source=source))
+            if key_index is not None:
+                plan.add(NotInHistory(key, i, key_index, load_id))
+    for i, (col, desired_type) in enumerate(cfg["col_types"].items()):
+        if col in columns and desired_type not in STRING_TYPES:
+            plan.add(TypeConvertible(col, i, desired_type, datetime_format(validations.get(col))))
+    if "Email" in columns:
+        plan.add(StrictEmail("Email"))
+    if "Date" in columns:
+        plan.add(StrictFormat("Date", DATE, "expect_column_values_to_match_strict_date", validations.get("Date", "%Y-%m-%d")))
+    if "Time" in columns:
+        plan.add(StrictFormat("Time", TIME, "expect_column_values_to_match_strict_time", validations.get("Time", "%H:%M:%S")))
+    return plan
+
+
+def _column_groups(plan: ValidationPlan, workers: int) -> list:
+    """
+    Split the pool-evaluated columns into at most `workers` groups with
+    similar expectation counts (largest first, each to the lightest group).
+    """
+    columns = [c for c in plan.by_column if not any(e.local_only for e in plan.by_column[c])]
+    groups = [[] for _ in range(min(workers, len(columns)))]
+    loads = [0] * len(groups)
+    for col in sorted(columns, key=lambda c: -len(plan.by_column[c])):
+        i = loads.index(min(loads))
+        groups[i].append(col)
+        loads[i] += len(plan.by_column[col])
+    return [g for g in groups if g]
+
+
+def _evaluate_group(handle, columns, expectations):
+    """Pool task: evaluate fresh accumulators for `columns` on a shared chunk."""
+    shm = shared_frames.attach(handle)
+    try:
+        return _evaluate_shared(shm, handle, columns, expectations)
+    finally:
+        shm.close()
+
+
+def _evaluate_shared(shm, handle, columns, expectations):
+    # kept separate so the frame referencing the shared buffers is gone before the block closes
+    df = shared_frames.read_shared_frame(shm, handle, columns)
+    for exp in expectations:
+        exp.update(ColumnView(df[exp.column]))
+    return expectations
+
+
+def run_plan(frames, plan: ValidationPlan, failure_budget: int = None, workers: int = 1, sink=None) -> list:
+    """
+    Evaluate `plan` over a DataFrame or an iterable of chunks and return the
+    failing expectations in report order.
+
+    With `failure_budget`, reading stops after the first chunk that takes the
+    failing-value count past it (plan.stopped_early is then set and the
+    report covers the plan.rows rows read).
+
+    With `workers` > 1 (and pyarrow), column groups of each chunk are
+    evaluated in a process pool: the chunk is placed once in shared memory
+    as Arrow buffers (etl/shared_frames.py) and each task returns only its
+    accumulators, which are merged back in column order. Uniqueness stays in
+    this process, overlapping with the pool.
+
+    A `sink` (staging.TypedStagingWriter) receives every chunk with the
+    ColumnViews of its `columns`, so their coercion is computed once for
+    both the checks and the typed artifact (pooled columns are coerced
+    again here).
+    """
+    if isinstance(frames, pd.DataFrame):
+        frames = [frames]
+    groups = _column_groups(plan, workers) if workers and workers > 1 and shared_frames.available else []
+    pooled = {c for g in groups for c in g}
+    local = [c for c in plan.by_column if c not in pooled]
+    pool = ProcessPoolExecutor(max_workers=len(groups)) if groups else None
+    try:
+        for df in frames:
+            if pool is None:
+                views = plan.update(df)
+            else:
+                views = _update_pooled(pool, plan, df, groups, local)
+            if sink is not None:
+                sink.write(df, {c: views.get(c) or ColumnView(df[c]) for c in sink.columns})
+            plan.rows += len(df)
+            if failure_budget is not None and plan.failed_values() > failure_budget:
+                plan.stopped_early = True
+                break
+        return plan.failures()
+    finally:
+        if pool is not None:
+            pool.shutdown()
+        plan.close()  # failures() has already finalized the counts
+
+
+def _update_pooled(pool, plan: ValidationPlan, df: pd.DataFrame, groups, local):
+    with shared_frames.SharedFrame(df[[c for g in groups for c in g]]) as shared:
+        tasks = []
+        for group in groups:
+            masters = [exp for col in group for exp in plan.by_column[col]]
+            tasks.append((masters, pool.submit(_evaluate_group, shared.handle, group, [exp.fresh() for exp in masters])))
+        views = plan.update(df, local)
+        for masters, task in tasks:
+            for master, part in zip(masters, task.result()):
+                master.merge(part)
+    return views
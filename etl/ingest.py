@@ -2,7 +2,15 @@
 """
 ingest.py - small CLI for ingesting CSV files into data/ and optionally validating.
 Usage:
-    python etl/ingest.py path/to/file.csv [--dest data/staged.csv] [--validate]
+    python etl/ingest.py path/to/file.csv [--dest data/staged.csv] [--validate] [--parquet] [--no-key-index]
+
+--parquet also writes a typed, compressed Parquet copy next to the staged CSV
+(data/staged.parquet) that validate/transform read instead of the CSV.
+
+After an ingest that passed --validate, the file's unique_keys values are
+added to the key index (data/key_index.sqlite), so later deltas are
+validated against them; --no-key-index skips that. Files ingested without
+--validate are never indexed.
 """
 import argparse
 from pathlib import Path
@@ -21,6 +29,19 @@ def copy_to_dest(src: str, dest: Path = DEFAULT_DEST) -> Path:
     shutil.copy2(str(src_p), str(dest))
     return dest
 
+def write_parquet_if_requested(dest: Path, do_parquet: bool):
+    if not do_parquet:
+        return None
+    sys.path.insert(0, str(ROOT))
+    try:
+        from etl import staging
+        out = staging.write_parquet_staging(dest)
+        print(f"Wrote Parquet staging file -> {out}")
+        return out
+    except Exception as e:
+        print(f"Parquet staging skipped: {e}")
+        return None
+
 def run_validation_if_requested(dest: Path, do_validate: bool):
     if not do_validate:
         return True
@@ -34,11 +55,31 @@ def run_validation_if_requested(dest: Path, do_validate: bool):
         print(f"Validation failed: {e}")
         return False
 
+def update_key_index(dest: Path, do_index: bool):
+    if not do_index:
+        return 0
+    sys.path.insert(0, str(ROOT))
+    try:
+        from etl import validate
+        from etl.key_index import KeyIndex
+        unique_keys = validate.load_config()["unique_keys"]
+        if not unique_keys:
+            return 0
+        with KeyIndex() as index:
+            rows = index.add_file(dest, unique_keys)
+        print(f"Key index updated ({rows} rows)" if rows else "Key index already has this file")
+        return rows
+    except Exception as e:
+        print(f"Key index update skipped: {e}")
+        return 0
+
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument("src", help="Path to CSV to ingest")
     parser.add_argument("--dest", default=str(DEFAULT_DEST), help="Destination staged CSV")
     parser.add_argument("--validate", action="store_true", help="Run validation after copy")
+    parser.add_argument("--parquet", action="store_true", help="Also write a typed Parquet staging file next to dest")
+    parser.add_argument("--no-key-index", action="store_true", help="Do not add the file's unique keys to the key index")
     args = parser.parse_args()
 
     dest = Path(args.dest)
@@ -49,10 +90,15 @@ def main():
         print(f"Error copying file: {e}")
         raise SystemExit(1)
 
+    write_parquet_if_requested(dest, args.parquet)
     ok = run_validation_if_requested(dest, args.validate)
     if not ok:
         print("Ingest completed with validation errors.")
         raise SystemExit(2)
+    if args.validate:
+        update_key_index(dest, not args.no_key_index)
+    elif not args.no_key_index:
+        print("Key index not updated: only validated files are indexed (use --validate)")
     print("Ingest finished successfully.")
 
 if __name__ == "__main__":
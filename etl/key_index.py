@@ -0,0 +1,97 @@
+"""Persistent index of the unique-key values already ingested, for delta validation.
+
+Deltas (e.g. sample_data/retail_data_delta.csv) arrive as separate files, so
+uniqueness within one file does not catch a delta that reuses a
+Transaction_ID loaded earlier. KeyIndex keeps every ingested value of the
+config's unique_keys in a SQLite table under data/. Validation probes a
+file's keys against it in batches, so the cost grows with the delta, not
+with the history. ingest.py adds a file's keys after a successful ingest in
+a single transaction, so the index never holds part of a file.
+
+Each file's keys are tagged with a digest of its content. Probes skip keys
+from the file being validated, so re-validating or re-ingesting the same
+file does not report it against itself.
+"""
+from pathlib import Path
+import hashlib
+import sqlite3
+
+import numpy as np
+import pandas as pd
+
+from etl.staging import iter_staged
+
+ROOT = Path(__file__).resolve().parents[1]
+KEY_INDEX_PATH = ROOT / "data" / "key_index.sqlite"
+# distinct values per probe / insert batch
+BATCH_SIZE = 50_000
+# rows per chunk when reading a file's keys
+CHUNKSIZE = 200_000
+
+
+def file_digest(path) -> str:
+    """SHA-256 of the file's content, the load id of its keys."""
+    with open(path, "rb") as fh:
+        return hashlib.file_digest(fh, "sha256").hexdigest()
+
+
+class KeyIndex:
+    """SQLite-backed set of (column, value) pairs, each tagged with the load that added it."""
+
+    def __init__(self, path=KEY_INDEX_PATH):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(self.path))
+        with self.conn:
+            self.conn.execute("CREATE TABLE IF NOT EXISTS keys (key_column TEXT NOT NULL, value TEXT NOT NULL, load_id TEXT NOT NULL, PRIMARY KEY (key_column, value)) WITHOUT ROWID")
+            self.conn.execute("CREATE TABLE IF NOT EXISTS loads (load_id TEXT PRIMARY KEY, source TEXT, rows INTEGER, loaded_at TEXT DEFAULT CURRENT_TIMESTAMP)")
+            self.conn.execute("CREATE TEMP TABLE IF NOT EXISTS probe (value TEXT PRIMARY KEY) WITHOUT ROWID")
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def has_load(self, load_id: str) -> bool:
+        return self.conn.execute("SELECT 1 FROM loads WHERE load_id = ?", (load_id,)).fetchone() is not None
+
+    def probe(self, column: str, values, exclude_load: str = None) -> np.ndarray:
+        """Bool mask over `values`: True where the value was ingested by another load."""
+        ser = pd.Series(np.asarray(values, dtype=object))
+        distinct = ser.dropna().unique()
+        found = []
+        for start in range(0, len(distinct), BATCH_SIZE):
+            batch = distinct[start:start + BATCH_SIZE]
+            with self.conn:
+                self.conn.execute("DELETE FROM probe")
+                self.conn.executemany("INSERT OR IGNORE INTO probe (value) VALUES (?)", ((str(v),) for v in batch))
+            found.extend(r[0] for r in self.conn.execute(
+                "SELECT p.value FROM probe p JOIN keys k ON k.key_column = ? AND k.value = p.value WHERE k.load_id != ?",
+                (column, exclude_load or ""),
+            ))
+        return ser.isin(found).to_numpy()
+
+    def add_file(self, csv_path, columns, load_id: str = None) -> int:
+        """
+        Add every value of `columns` in a staged file, all in one transaction.
+        Returns the number of rows read (0 if this content was indexed before).
+        """
+        load_id = load_id or file_digest(csv_path)
+        if self.has_load(load_id):
+            return 0
+        rows = 0
+        with self.conn:
+            for df in iter_staged(csv_path, CHUNKSIZE, text=True, columns=columns):
+                for col in df.columns:
+                    values = df[col].dropna().unique()
+                    self.conn.executemany(
+                        "INSERT OR IGNORE INTO keys (key_column, value, load_id) VALUES (?, ?, ?)",
+                        ((col, str(v), load_id) for v in values),
+                    )
+                rows += len(df)
+            self.conn.execute("INSERT INTO loads (load_id, source, rows) VALUES (?, ?, ?)", (load_id, str(csv_path), rows))
+        return rows
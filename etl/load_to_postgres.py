@@ -3,7 +3,7 @@
 etl/load_to_postgres.py
 
 Usage:
-    python etl/load_to_postgres.py --csv sample_data/retail_data_Source.csv
+    python etl/load_to_postgres.py --csv sample_data/retail_data_Source.csv [--workers N] [--upsert | --bulk] [--staging-table]
 
 Environment variables:
     PGHOST, PGPORT, PGDATABASE, PGUSER, PGPASSWORD
@@ -11,24 +11,74 @@ or pass connection args via command-line.
 
 What it does:
 - Runs SQL file sql/ddl/create_tables_postgres.sql to ensure raw_transactions exists.
-- Loads CSV into a temporary table using COPY, then INSERTs into raw_transactions,
-  coercing/renaming columns where necessary.
+- Streams the CSV chunk by chunk, trims and types each chunk client-side
+  (empty -> NULL, numbers and dates parsed, bad values -> NULL) and COPYs the
+  rows straight into raw_transactions, so every row is written once.
+- When raw_transactions is partitioned by month (the DDL's default), the
+  partitions the file needs are created first and each chunk is COPYed
+  straight into its month's partition (see routed_chunks).
+  --detach-before YYYY-MM [--archive-schema S] detaches (and archives) the
+  older months.
+- --workers N splits the CSV into N byte-range partitions that are COPYed in
+  parallel, each over its own connection, and committed together (see
+  parallel_load); runs interrupted by a crash are finished by the next one.
+- --upsert loads a delta file incrementally: COPY into an unlogged staging
+  table, then one INSERT ... ON CONFLICT (transaction_id) merge that reports
+  inserted / updated / unchanged rows (see upsert_load).
+- --bulk (initial and backfill loads) drops raw_transactions' plain indexes
+  before loading and rebuilds them afterwards, in parallel, then ANALYZEs
+  (see bulk_load); --rebuild-indexes finishes an interrupted bulk load.
+- --staging-table uses the older path instead: COPY into a temporary all-TEXT
+  table, then INSERT ... SELECT into raw_transactions.
 """
 import argparse
 import os
-import psycopg2
+import uuid
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from pathlib import Path
+import numpy as np
 import pandas as pd
 import io
 import sys
 import textwrap
 import subprocess
 
+try:
+    import psycopg2
+except ImportError:  # only needed to connect; the row preparation below works without it
+    psycopg2 = None
+
 REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+from etl.cleaning_rules import load_plan
+from etl.key_index import file_digest
+from etl.utils import NA_VALUES, header_columns, open_csv_byte_range, read_csv, split_csv_byte_ranges
+
 DDL_FILE = REPO_ROOT / "sql" / "ddl" / "create_tables_postgres.sql"
 
 DEFAULT_CSV = REPO_ROOT / "sample_data" / "retail_data_Source.csv"
 
+# rows per client-side chunk of the streaming loader (one chunk is buffered at a time)
+COPY_CHUNKSIZE = 100_000
+# bytes handed to COPY per read
+COPY_READ_SIZE = 1 << 20
+# global transaction id prefix of the prepared partition loads of --workers
+GID_PREFIX = "raw_load_"
+# coordinator log of the --workers runs, so interrupted ones can be finished (see recover_loads)
+LOAD_RUNS_TABLE = "etl_load_runs"
+# unique index the incremental merge conflicts on (created by --upsert, not by the DDL)
+MERGE_KEY_INDEX = "ux_raw_transactions_transaction_id"
+# transaction_id -> date of a partitioned raw_transactions, keeping transaction_id unique across months (see ensure_merge_key)
+MERGE_KEYS_TABLE = "raw_transaction_keys"
+# definitions of the indexes a bulk load dropped and has not rebuilt yet
+DEFERRED_INDEX_TABLE = "etl_deferred_indexes"
+# per-session maintenance_work_mem of the --bulk index builds
+BULK_MAINTENANCE_WORK_MEM = "512MB"
+# monthly partitions of a partitioned raw_transactions are <prefix>YYYY_MM; undated rows go to the default one
+PARTITION_PREFIX = "raw_transactions_p"
+DEFAULT_PARTITION = "raw_transactions_default"
+
 # mapping from CSV headers -> table columns (lowercased compare)
 # if your CSV uses slightly different names, adjust mapping here
 PREFERRED_COL_MAP = {
@@ -63,83 +113,737 @@ PREFERRED_COL_MAP = {
     "products": "products"
 }
 
-def run_sql_file(conn, path: Path):
+# raw_transactions columns that are not TEXT (see sql/ddl/create_tables_postgres.sql)
+NUMERIC_COLUMNS = {"item_price", "total_purchases", "amount", "total_amount", "ratings"}
+INTEGER_COLUMNS = {"quantity", "year"}
+TIMESTAMP_COLUMNS = {"date"}
+_INT32_MAX = 2**31 - 1
+
+
+def without_index_statements(sql: str) -> str:
+    """`sql` minus its (single-line) CREATE INDEX statements."""
+    return "\n".join(line for line in sql.splitlines() if not line.lstrip().upper().startswith("CREATE INDEX"))
+
+
+def run_sql_file(conn, path: Path, indexes: bool = True):
     sql = path.read_text()
+    if not indexes:
+        sql = without_index_statements(sql)
     with conn.cursor() as cur:
         cur.execute(sql)
     conn.commit()
 
+def _sql_cast(expr: str, tbl_col: str) -> str:
+    if tbl_col in NUMERIC_COLUMNS:
+        return f"({expr})::numeric"
+    if tbl_col in INTEGER_COLUMNS:
+        return f"({expr})::integer"
+    if tbl_col in TIMESTAMP_COLUMNS:
+        return f"({expr})::timestamp"
+    return expr
+
+
 def create_table_and_load(conn, csv_path: Path):
-    # Ensure DDL executed
+    """
+    Older path (--staging-table): COPY the CSV as-is into a temporary
+    all-TEXT table, then INSERT ... SELECT the known columns into
+    raw_transactions, trimmed, with empty values as NULL and SQL casts for
+    the typed columns. Unlike stream_load, a value that does not cast fails
+    the whole load. Everything runs in one transaction.
+    """
+    refuse_keyed_append(conn)
     run_sql_file(conn, DDL_FILE)
+    csv_cols = list(pd.read_csv(csv_path, nrows=0).columns)
+    mapping = table_mapping(csv_cols)
+    prepare_partitions(conn, csv_path, mapping)
+
+    tmp_table = "tmp_raw_csv"
+    cols_sql = ", ".join(f'"{c}" TEXT' for c in csv_cols)
+    cols = ", ".join(tbl_col for _, tbl_col in mapping)
+    select_clause = ", ".join(_sql_cast(f"NULLIF(trim({tmp_table}.\"{csv_col}\"), '')", tbl_col) for csv_col, tbl_col in mapping)
+    try:
+        with conn.cursor() as cur:
+            cur.execute(f"CREATE TEMP TABLE {tmp_table} ({cols_sql}) ON COMMIT DROP")
+            with open(csv_path, "r", encoding="utf-8") as fh:
+                cur.copy_expert(f"COPY {tmp_table} FROM STDIN WITH (FORMAT csv, HEADER true, NULL '')", fh, size=COPY_READ_SIZE)
+            cur.execute(f"INSERT INTO raw_transactions ({cols}) SELECT {select_clause} FROM {tmp_table}")
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
 
-    # Read CSV header to align column names
-    df = pd.read_csv(csv_path, nrows=0)
-    csv_cols = [c for c in df.columns]
 
-    # Build mapping from csv column to table column (if found)
+def table_mapping(csv_cols) -> list:
+    """(csv column, raw_transactions column) for the CSV columns the table has; others are not loaded."""
     mapping = []
     for c in csv_cols:
         key = c.strip().lower()
         if key in PREFERRED_COL_MAP:
             mapping.append((c, PREFERRED_COL_MAP[key]))
+    return mapping
+
+
+def _date_rule(csv_col):
+    """The cleaning rule that parses `csv_col` into YYYY-MM-DD, if any (etl/cleaning_rules.py)."""
+    for rule in load_plan().rules:
+        if rule.column == csv_col and rule.parse is not None:
+            return rule
+    return None
+
+
+def typed_frame(chunk: pd.DataFrame, mapping) -> pd.DataFrame:
+    """
+    A text chunk as raw_transactions rows, ready for COPY ... CSV.
+
+    Values are trimmed and empty ones become NULL; TEXT columns are otherwise
+    kept verbatim (a name or feedback of "NA" or "None" stays text), while in
+    NUMERIC, INTEGER and date columns the NA_VALUES tokens are NULL too.
+    NUMERIC and INTEGER columns are parsed (values that do not parse, are not finite or, for
+    INTEGER, are not whole 32-bit numbers become NULL) and the date column
+    goes through the cleaning rules' date formats, so a bad value never
+    fails the COPY. Valid NUMERIC values are sent as their text, so Postgres
+    keeps every digit.
+    """
+    out = {}
+    for csv_col, tbl_col in mapping:
+        text = chunk[csv_col].str.strip()
+        text = text.where(text != "")
+        if tbl_col in NUMERIC_COLUMNS or tbl_col in INTEGER_COLUMNS or tbl_col in TIMESTAMP_COLUMNS:
+            text = text.where(~text.isin(NA_VALUES))
+        if tbl_col in NUMERIC_COLUMNS or tbl_col in INTEGER_COLUMNS:
+            values = pd.to_numeric(text, errors="coerce").to_numpy(dtype="float64", na_value=np.nan, copy=True)
+            values[~np.isfinite(values)] = np.nan
+            if tbl_col in INTEGER_COLUMNS:
+                values[(values % 1 != 0) | (np.abs(values) > _INT32_MAX)] = np.nan
+                out[tbl_col] = pd.array(values, dtype="Float64").astype("Int64")
+            else:
+                out[tbl_col] = text.where(~np.isnan(values))
+        elif tbl_col in TIMESTAMP_COLUMNS:
+            rule = _date_rule(csv_col)
+            out[tbl_col] = rule.parse_column(text) if rule is not None else text
         else:
-            # Unknown column -> keep as is into 'products' or ignore
-            mapping.append((c, c))
+            out[tbl_col] = text
+    return pd.DataFrame(out, index=chunk.index)
 
-    # Read whole CSV as text and use COPY to a temp table with matching columns
-    # For simplicity we'll COPY into a temporary table with all columns as text, then INSERT selecting columns we want.
-    tmp_table = "tmp_raw_csv"
+
+def _copy_bytes(typed: pd.DataFrame) -> bytes:
+    return typed.to_csv(index=False, header=False, na_rep="").encode("utf-8")
+
+
+def copy_chunks(csv_path, mapping, chunksize: int = COPY_CHUNKSIZE, header: bytes = None):
+    """COPY-ready CSV bytes of `csv_path` (or of a byte-range file object with its `header`), one typed chunk at a time."""
+    for chunk in read_csv(csv_path, text=True, chunksize=chunksize, header=header, na_values=[""]):
+        yield _copy_bytes(typed_frame(chunk, mapping))
+
+
+# months that start and end within pd.Timestamp's range get a partition
+_FIRST_MONTH = (pd.Timestamp.min.to_period("M") + 1).strftime("%Y-%m")
+_LAST_MONTH = (pd.Timestamp.max.to_period("M") - 1).strftime("%Y-%m")
+
+
+def _months(typed: pd.DataFrame) -> pd.Series:
+    """'YYYY-MM' of each typed row's date, '' where it has none or its month gets no partition."""
+    if "date" not in typed:
+        return pd.Series("", index=typed.index)
+    months = typed["date"].str.slice(0, 7).fillna("")
+    valid = months.str.fullmatch(r"\d{4}-(0[1-9]|1[0-2])") & (months >= _FIRST_MONTH) & (months <= _LAST_MONTH)
+    return months.where(valid, "")
+
+
+def month_partition(month: str) -> str:
+    """Partition holding the rows of `month` ('YYYY-MM'); '' is the default partition."""
+    return f"{PARTITION_PREFIX}{month[:4]}_{month[5:7]}" if month else DEFAULT_PARTITION
+
+
+def partition_ddl(month: str) -> str:
+    start = pd.Period(month, freq="M")
+    return (
+        f"CREATE TABLE IF NOT EXISTS {month_partition(month)} PARTITION OF raw_transactions "
+        f"FOR VALUES FROM ('{start.start_time:%Y-%m-%d}') TO ('{(start + 1).start_time:%Y-%m-%d}')"
+    )
+
+
+def routed_chunks(csv_path, mapping, chunksize: int = COPY_CHUNKSIZE, header: bytes = None):
+    """Like copy_chunks, but split by month: (partition, COPY-ready bytes) for each month of each chunk."""
+    for chunk in read_csv(csv_path, text=True, chunksize=chunksize, header=header, na_values=[""]):
+        typed = typed_frame(chunk, mapping)
+        for month, rows in typed.groupby(_months(typed), sort=True):
+            yield month_partition(month), _copy_bytes(rows)
+
+
+def file_months(csv_path, mapping, chunksize: int = COPY_CHUNKSIZE) -> set:
+    """The 'YYYY-MM' months of the dates in `csv_path`, as the loader types them."""
+    date_cols = [csv_col for csv_col, tbl_col in mapping if tbl_col in TIMESTAMP_COLUMNS]
+    months = set()
+    if not date_cols:
+        return months
+    for chunk in read_csv(csv_path, text=True, chunksize=chunksize, na_values=[""], usecols=date_cols[:1]):
+        months.update(_months(typed_frame(chunk, [(date_cols[0], "date")])))
+    months.discard("")
+    return months
+
+
+def is_partitioned(conn) -> bool:
     with conn.cursor() as cur:
-        cur.execute(f"DROP TABLE IF EXISTS {tmp_table}")
-        # Create temp table with text columns for all CSV headers
-        cols_sql = ", ".join([f"\"{c}\" TEXT" for c, _ in mapping])
-        cur.execute(f"CREATE TEMP TABLE {tmp_table} ({cols_sql}) ON COMMIT DROP;")
-        conn.commit()
+        cur.execute("SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = 'raw_transactions'::regclass)")
+        partitioned = cur.fetchone()[0]
+    conn.commit()
+    return partitioned
+
+
+def prepare_partitions(conn, csv_path, mapping, chunksize: int = COPY_CHUNKSIZE) -> bool:
+    """
+    If raw_transactions is partitioned, create (and commit) the monthly
+    partitions `csv_path` needs and return True.
+
+    This runs before the load transaction opens: creating a partition locks
+    the whole table, and a month missing at load time would send its rows
+    to the default partition, which then blocks creating that month.
+    """
+    if not is_partitioned(conn):
+        return False
+    with conn.cursor() as cur:
+        for month in sorted(file_months(csv_path, mapping, chunksize)):
+            cur.execute(partition_ddl(month))
+    conn.commit()
+    return True
+
+
+class ChunkStream(io.RawIOBase):
+    """Read-only file object over an iterator of byte strings; holds one chunk at a time."""
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._buf = memoryview(b"")
+
+    def readable(self):
+        return True
+
+    def readinto(self, buf):
+        while not len(self._buf):
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                return 0
+            self._buf = memoryview(chunk)
+        n = min(len(buf), len(self._buf))
+        buf[:n] = self._buf[:n]
+        self._buf = self._buf[n:]
+        return n
+
+
+def copy_sql(table: str, mapping) -> str:
+    cols = ", ".join(tbl_col for _, tbl_col in mapping)
+    return f"COPY {table} ({cols}) FROM STDIN WITH (FORMAT csv, NULL '')"
+
+
+def copy_rows(cur, source, mapping, chunksize: int = COPY_CHUNKSIZE, header: bytes = None, partitioned: bool = False) -> int:
+    """COPY `source` into raw_transactions, or chunk by chunk into its monthly partitions; returns the rows copied."""
+    if not partitioned:
+        cur.copy_expert(copy_sql("raw_transactions", mapping), ChunkStream(copy_chunks(source, mapping, chunksize, header=header)), size=COPY_READ_SIZE)
+        return cur.rowcount
+    rows = 0
+    for partition, data in routed_chunks(source, mapping, chunksize, header=header):
+        cur.copy_expert(copy_sql(partition, mapping), io.BytesIO(data), size=COPY_READ_SIZE)
+        rows += cur.rowcount
+    return rows
+
+
+def stream_load(conn, csv_path: Path, chunksize: int = COPY_CHUNKSIZE, ddl: bool = True) -> int:
+    """
+    Load `csv_path` into raw_transactions with one COPY fed by copy_chunks
+    (or one per month and chunk into the partitions, see copy_rows), in a
+    single transaction. Returns the number of rows loaded.
+    """
+    refuse_keyed_append(conn)
+    if ddl:
+        run_sql_file(conn, DDL_FILE)
+    mapping = table_mapping(pd.read_csv(csv_path, nrows=0).columns)
+    partitioned = prepare_partitions(conn, csv_path, mapping, chunksize)
+    with conn.cursor() as cur:
+        rows = copy_rows(cur, csv_path, mapping, chunksize, partitioned=partitioned)
+    conn.commit()
+    return rows
+
+
+def _load_partition(params: dict, csv_path, start: int, end: int, header: bytes, mapping, chunksize: int, gid: str, partitioned: bool = False) -> int:
+    """Pool task: COPY one byte range over its own connection and leave it as prepared transaction `gid`."""
+    conn = connect(params)
+    try:
+        conn.tpc_begin(gid)
+        with open_csv_byte_range(csv_path, start, end, header) as fh, conn.cursor() as cur:
+            rows = copy_rows(cur, fh, mapping, chunksize, header=header, partitioned=partitioned)
+        conn.tpc_prepare()
+        return rows
+    finally:
+        # a prepared transaction outlives the session; the coordinator finishes it
+        conn.close()
+
+
+def finish_prepared(conn, prefix: str, commit: bool = True) -> int:
+    """COMMIT (or ROLLBACK) PREPARED every prepared load whose gid starts with `prefix`; returns how many."""
+    conn.autocommit = True
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT gid FROM pg_prepared_xacts WHERE starts_with(gid, %s) AND database = current_database() ORDER BY gid", (prefix,))
+            gids = [row[0] for row in cur.fetchall()]
+            for gid in gids:
+                cur.execute(("COMMIT PREPARED %s" if commit else "ROLLBACK PREPARED %s"), (gid,))
+    finally:
+        conn.autocommit = False
+    return len(gids)
+
+
+def run_prefix(run_id: str) -> str:
+    """gid prefix of the prepared partition loads of one parallel_load run."""
+    return f"{GID_PREFIX}{run_id}_"
+
+
+def _prepared_count(conn, prefix: str) -> int:
+    with conn.cursor() as cur:
+        cur.execute("SELECT count(*) FROM pg_prepared_xacts WHERE starts_with(gid, %s) AND database = current_database()", (prefix,))
+        count = cur.fetchone()[0]
+    conn.commit()
+    return count
+
+
+def _run_lock(conn, run_id: str, wait: bool = True) -> bool:
+    """Take the session-level advisory lock a run's coordinator holds while it is alive."""
+    with conn.cursor() as cur:
+        if wait:
+            cur.execute("SELECT pg_advisory_lock(hashtextextended(%s, 0))", (run_id,))
+            locked = True
+        else:
+            cur.execute("SELECT pg_try_advisory_lock(hashtextextended(%s, 0))", (run_id,))
+            locked = cur.fetchone()[0]
+    conn.commit()
+    return locked
 
-    # Use COPY FROM STDIN for the temp table
-    with open(csv_path, "r", encoding="utf-8") as fh:
+
+def _run_unlock(conn, run_id: str):
+    with conn.cursor() as cur:
+        cur.execute("SELECT pg_advisory_unlock(hashtextextended(%s, 0))", (run_id,))
+    conn.commit()
+
+
+def _set_run_state(conn, run_id: str, state: str):
+    with conn.cursor() as cur:
+        cur.execute(f"UPDATE {LOAD_RUNS_TABLE} SET state = %s, updated_at = now() WHERE run_id = %s", (state, run_id))
+    conn.commit()
+
+
+def recover_loads(conn) -> dict:
+    """
+    Finish the parallel_load runs whose coordinator is gone.
+
+    A run whose commit was decided (state 'committing') is rolled forward:
+    its remaining prepared partitions are committed. A run still
+    'preparing' never decided and is rolled back. Runs whose coordinator
+    still holds its advisory lock are running and are left alone. Returns
+    {run_id: 'done' | 'aborted'} for the runs finished here.
+    """
+    with conn.cursor() as cur:
+        cur.execute(textwrap.dedent(f"""
+            CREATE TABLE IF NOT EXISTS {LOAD_RUNS_TABLE} (
+                run_id TEXT PRIMARY KEY,
+                csv TEXT NOT NULL,
+                file_digest TEXT NOT NULL,
+                partitions INTEGER NOT NULL,
+                state TEXT NOT NULL DEFAULT 'preparing' CHECK (state IN ('preparing', 'committing', 'done', 'aborted')),
+                started_at TIMESTAMP NOT NULL DEFAULT now(),
+                updated_at TIMESTAMP NOT NULL DEFAULT now()
+            )
+        """))
+        cur.execute(f"SELECT run_id, state FROM {LOAD_RUNS_TABLE} WHERE state IN ('preparing', 'committing') ORDER BY started_at")
+        runs = cur.fetchall()
+    conn.commit()
+    finished = {}
+    for run_id, state in runs:
+        if not _run_lock(conn, run_id, wait=False):
+            continue  # its coordinator is still running
+        try:
+            commit = state == "committing"
+            finish_prepared(conn, run_prefix(run_id), commit=commit)
+            finished[run_id] = "done" if commit else "aborted"
+            _set_run_state(conn, run_id, finished[run_id])
+        finally:
+            _run_unlock(conn, run_id)
+    return finished
+
+
+def parallel_load(conn, params: dict, csv_path: Path, workers: int, chunksize: int = COPY_CHUNKSIZE, ddl: bool = True) -> int:
+    """
+    Load `csv_path` into raw_transactions from `workers` processes at once.
+
+    The CSV is split into byte-range partitions on line boundaries; each is
+    typed and COPYed over its own connection (`params`) inside a two-phase
+    transaction that is prepared, not committed. Their gids carry this
+    run's id and the file's digest, and the run is logged in
+    LOAD_RUNS_TABLE while this coordinator holds the run's advisory lock.
+
+    Only when every partition is prepared is the commit decision recorded
+    (state 'committing') and are the partitions COMMIT PREPARED; otherwise
+    they are rolled back, so the load is all or nothing. Runs interrupted
+    by a crash are finished first by recover_loads: rolled forward if their
+    commit was decided, rolled back if not. The server needs
+    max_prepared_transactions >= workers (see docker-compose.yml).
+    """
+    refuse_keyed_append(conn)
+    if ddl:
+        run_sql_file(conn, DDL_FILE)
+    for run_id, state in recover_loads(conn).items():
+        print(f"Interrupted parallel load {run_id}: {'committed' if state == 'done' else 'rolled back'}.")
+    header, ranges = split_csv_byte_ranges(csv_path, workers)
+    mapping = table_mapping(header_columns(header))
+    # workers cannot create partitions: their prepared transactions would hold the table lock
+    partitioned = prepare_partitions(conn, csv_path, mapping, chunksize)
+    run_id = uuid.uuid4().hex
+    digest = file_digest(csv_path)
+    prefix = run_prefix(run_id)
+    # lock before the run is visible, so recover_loads never takes a live run for abandoned
+    _run_lock(conn, run_id)
+    try:
         with conn.cursor() as cur:
-            # Build COPY command using header names exactly
-            cols_list = ",".join([f"\"{c}\"" for c, _ in mapping])
-            copy_sql = f"COPY {tmp_table}({cols_list}) FROM STDIN WITH CSV HEADER DELIMITER ',' NULL ''"
-            cur.copy_expert(copy_sql, fh)
+            cur.execute(
+                f"INSERT INTO {LOAD_RUNS_TABLE} (run_id, csv, file_digest, partitions) VALUES (%s, %s, %s, %s)",
+                (run_id, str(csv_path), digest, len(ranges)),
+            )
         conn.commit()
+        try:
+            with ProcessPoolExecutor(max_workers=max(1, len(ranges))) as pool:
+                tasks = [
+                    pool.submit(_load_partition, params, csv_path, start, end, header, mapping, chunksize, f"{prefix}{digest[:16]}_{i:04d}", partitioned)
+                    for i, (start, end) in enumerate(ranges)
+                ]
+                rows = sum(task.result() for task in tasks)
+            prepared = _prepared_count(conn, prefix)
+            if prepared != len(ranges):
+                raise RuntimeError(f"only {prepared} of {len(ranges)} partitions of {csv_path} are prepared; not committing")
+        except Exception:
+            finish_prepared(conn, prefix, commit=False)
+            _set_run_state(conn, run_id, "aborted")
+            raise
+        _set_run_state(conn, run_id, "committing")  # the commit decision, durable before any COMMIT PREPARED
+        finish_prepared(conn, prefix, commit=True)
+        _set_run_state(conn, run_id, "done")
+    finally:
+        _run_unlock(conn, run_id)
+    return rows
 
-    # Insert from temp into raw_transactions selecting/casting columns
-    # Prepare select list using mapping: use COALESCE(NULLIF(trim(col),''),'') as appropriate.
-    select_parts = []
-    for csv_col, tbl_col in mapping:
-        # only insert into columns that exist in raw_transactions (we know list from DDL)
-        # insert as-is with trimming
-        select_parts.append(f"trim(NULLIF({tmp_table}.\"{csv_col}\",'') ) AS {tbl_col}")
 
-    select_clause = ",\n    ".join(select_parts)
+def _latest_sql(staging: str, cols: str) -> str:
+    """`cols` of the last staged row per transaction_id."""
+    return f"SELECT DISTINCT ON (transaction_id) {cols} FROM {staging} WHERE transaction_id IS NOT NULL ORDER BY transaction_id, load_seq DESC"
+
 
-    insert_sql = textwrap.dedent(f"""
-        INSERT INTO raw_transactions (
-            transaction_id, customer_id, name, email, phone, address, city, state, zipcode, country,
-            department, item_price, quantity, date, year, month, time, total_purchases, amount, total_amount,
-            product_category, product_brand, product_type, feedback, shipping_method, payment_method, order_status, ratings, products
+def merge_sql(staging: str, mapping, key=("transaction_id",)) -> str:
+    """
+    Set-based merge of `staging` into raw_transactions, conflicting on `key`
+    (transaction_id, plus date on the partitioned table; see merge_key).
+
+    The last staged row per transaction_id wins, rows without one are not
+    merged, and rows equal to the stored ones are left untouched. Inserts
+    are the candidates whose key is not stored yet (all CTEs see the table
+    as it was before the INSERT; xmax cannot be read back from a
+    partitioned table). Returns one row: (inserted, updated, merged
+    candidates).
+    """
+    cols = [tbl_col for _, tbl_col in mapping if tbl_col not in key]
+    keys = ", ".join(key)
+    all_cols = ", ".join(list(key) + cols)
+    updates = ", ".join(f"{c} = EXCLUDED.{c}" for c in cols)
+    changed = f"({', '.join('t.' + c for c in cols)}) IS DISTINCT FROM ({', '.join('EXCLUDED.' + c for c in cols)})"
+    conflict = f"DO UPDATE SET {updates} WHERE {changed}" if cols else "DO NOTHING"
+    # transaction_id is never NULL in src; a NULL date conflicts like the NULLS NOT DISTINCT index
+    stored = " AND ".join(f"t.{c} = src.{c}" if c == "transaction_id" else f"t.{c} IS NOT DISTINCT FROM src.{c}" for c in key)
+    return textwrap.dedent(f"""
+        WITH src AS (
+            {_latest_sql(staging, all_cols)}
+        ), fresh AS (
+            SELECT count(*) AS n FROM src
+            WHERE NOT EXISTS (SELECT 1 FROM raw_transactions AS t WHERE {stored})
+        ), merged AS (
+            INSERT INTO raw_transactions AS t ({all_cols})
+            SELECT {all_cols} FROM src
+            ON CONFLICT ({keys}) {conflict}
+            RETURNING t.transaction_id
+        )
+        SELECT (SELECT n FROM fresh), count(*) - (SELECT n FROM fresh), (SELECT count(*) FROM src)
+        FROM merged
+    """)
+
+
+def merge_key(partitioned: bool) -> tuple:
+    """
+    Columns the merge conflicts on. A unique index on a partitioned table
+    must include the partition key, so there it is (transaction_id, date)
+    and each delta row is checked against its own month only; uniqueness of
+    transaction_id alone is kept by MERGE_KEYS_TABLE (see move_keys_sql).
+    """
+    return ("transaction_id", "date") if partitioned else ("transaction_id",)
+
+
+def claim_keys_sql(staging: str) -> str:
+    """Register the delta's new transaction_ids, with their date, in MERGE_KEYS_TABLE."""
+    return textwrap.dedent(f"""
+        INSERT INTO {MERGE_KEYS_TABLE} (transaction_id, date)
+        {_latest_sql(staging, "transaction_id, date")}
+        ON CONFLICT (transaction_id) DO NOTHING
+    """)
+
+
+def move_keys_sql(staging: str) -> str:
+    """
+    For delta rows whose date differs from the stored one, record the new
+    date in MERGE_KEYS_TABLE and delete the stored row from its old month,
+    so the merge inserts it into the new one instead of adding a second
+    row. Returns one row: (moved rows).
+    """
+    return textwrap.dedent(f"""
+        WITH src AS (
+            {_latest_sql(staging, "transaction_id, date")}
+        ), moved AS (
+            UPDATE {MERGE_KEYS_TABLE} AS k SET date = src.date
+            FROM src JOIN {MERGE_KEYS_TABLE} AS old ON old.transaction_id = src.transaction_id
+            WHERE k.transaction_id = src.transaction_id AND k.date IS DISTINCT FROM src.date
+            RETURNING k.transaction_id, old.date AS old_date
+        ), dropped AS (
+            DELETE FROM raw_transactions AS t USING moved
+            WHERE t.transaction_id = moved.transaction_id AND t.date IS NOT DISTINCT FROM moved.old_date
+            RETURNING t.transaction_id
         )
-        SELECT
-            {select_clause}
-        FROM {tmp_table};
+        SELECT count(*) FROM dropped
     """)
 
+
+def ensure_merge_key(conn, partitioned: bool = False):
+    """
+    Create the unique merge_key index the merge needs and, on the
+    partitioned table, MERGE_KEYS_TABLE filled from the stored rows (fails
+    if raw_transactions already holds duplicate transaction_ids).
+    """
+    # NULLS NOT DISTINCT: undated rows still conflict on transaction_id
+    columns = "(transaction_id, date) NULLS NOT DISTINCT" if partitioned else "(transaction_id)"
     with conn.cursor() as cur:
-        cur.execute(insert_sql)
+        try:
+            cur.execute(f"CREATE UNIQUE INDEX IF NOT EXISTS {MERGE_KEY_INDEX} ON raw_transactions {columns}")
+            if partitioned:
+                cur.execute("SELECT to_regclass(%s)", (MERGE_KEYS_TABLE,))
+                if cur.fetchone()[0] is None:
+                    cur.execute(f"CREATE TABLE {MERGE_KEYS_TABLE} (transaction_id TEXT PRIMARY KEY, date TIMESTAMP)")
+                    # a transaction_id stored under two dates violates the primary key here
+                    cur.execute(f"INSERT INTO {MERGE_KEYS_TABLE} SELECT transaction_id, date FROM raw_transactions WHERE transaction_id IS NOT NULL")
+        except psycopg2.IntegrityError as e:
+            conn.rollback()
+            raise RuntimeError("raw_transactions has duplicate transaction_ids; deduplicate it before incremental loads") from e
     conn.commit()
 
-def get_conn(args):
-    conn = psycopg2.connect(
+
+def refuse_keyed_append(conn):
+    """
+    Raise if MERGE_KEYS_TABLE exists. Only upsert_load keeps it in step
+    with raw_transactions, so once it does the append modes would let a
+    transaction_id into a second month unnoticed.
+    """
+    with conn.cursor() as cur:
+        cur.execute("SELECT to_regclass(%s)", (MERGE_KEYS_TABLE,))
+        keyed = cur.fetchone()[0] is not None
+    conn.commit()
+    if keyed:
+        raise RuntimeError(f"raw_transactions is merged on transaction_id ({MERGE_KEYS_TABLE}); load further files with --upsert")
+
+
+def upsert_load(conn, csv_path: Path, chunksize: int = COPY_CHUNKSIZE) -> dict:
+    """
+    Merge a delta file into raw_transactions on transaction_id, in one transaction.
+
+    The delta is typed and COPYed (same stream as stream_load) into a
+    per-run UNLOGGED staging table, then merged with merge_sql, so the cost
+    follows the size of the delta. On the partitioned table the delta's
+    keys first go through MERGE_KEYS_TABLE (claim_keys_sql, move_keys_sql):
+    a transaction re-delivered with a corrected date moves to its new month
+    and counts as updated. Once MERGE_KEYS_TABLE exists the other load
+    modes refuse to append (refuse_keyed_append), so it covers every stored
+    row. Returns the row counts.
+    """
+    run_sql_file(conn, DDL_FILE)
+    mapping = table_mapping(pd.read_csv(csv_path, nrows=0).columns)
+    if "transaction_id" not in {tbl_col for _, tbl_col in mapping}:
+        raise ValueError(f"{csv_path} has no Transaction_ID column to merge on")
+    partitioned = prepare_partitions(conn, csv_path, mapping, chunksize)
+    if partitioned and "date" not in {tbl_col for _, tbl_col in mapping}:
+        raise ValueError(f"{csv_path} has no Date column; raw_transactions is partitioned by date")
+    ensure_merge_key(conn, partitioned)
+    staging = f"raw_transactions_delta_{uuid.uuid4().hex[:12]}"
+    try:
+        with conn.cursor() as cur:
+            cur.execute(f"CREATE UNLOGGED TABLE {staging} (LIKE raw_transactions INCLUDING DEFAULTS, load_seq BIGINT GENERATED ALWAYS AS IDENTITY)")
+            cur.copy_expert(copy_sql(staging, mapping), ChunkStream(copy_chunks(csv_path, mapping, chunksize)), size=COPY_READ_SIZE)
+            rows = cur.rowcount
+            cur.execute(f"SELECT count(*) FILTER (WHERE transaction_id IS NULL) FROM {staging}")
+            no_key = cur.fetchone()[0]
+            moved = 0
+            if partitioned:
+                cur.execute(claim_keys_sql(staging))
+                cur.execute(move_keys_sql(staging))
+                moved = cur.fetchone()[0]
+            cur.execute(merge_sql(staging, mapping, merge_key(partitioned)))
+            inserted, updated, candidates = cur.fetchone()
+            inserted, updated = inserted - moved, updated + moved  # moved rows are re-inserted
+            cur.execute(f"DROP TABLE {staging}")
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return {
+        "rows": rows,
+        "inserted": inserted,
+        "updated": updated,
+        "unchanged": candidates - inserted - updated,
+        "duplicates_in_delta": rows - no_key - candidates,
+        "skipped_without_transaction_id": no_key,
+    }
+
+
+def defer_indexes(conn) -> list:
+    """
+    Drop raw_transactions' plain (non-unique) indexes. Their definitions are
+    saved in DEFERRED_INDEX_TABLE in the same transaction, so an interrupted
+    bulk load never loses one. Returns the names of all pending indexes.
+    """
+    with conn.cursor() as cur:
+        cur.execute(f"CREATE TABLE IF NOT EXISTS {DEFERRED_INDEX_TABLE} (indexname TEXT PRIMARY KEY, indexdef TEXT NOT NULL)")
+        cur.execute(textwrap.dedent("""
+            SELECT c.relname, pg_get_indexdef(i.indexrelid)
+            FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid
+            WHERE i.indrelid = 'raw_transactions'::regclass AND NOT i.indisunique AND NOT i.indisprimary
+        """))
+        for name, definition in cur.fetchall():
+            # a partitioned table's index is reported as ON ONLY, which would not build the partitions' indexes
+            definition = definition.replace(" ON ONLY ", " ON ", 1)
+            cur.execute(f"INSERT INTO {DEFERRED_INDEX_TABLE} VALUES (%s, %s) ON CONFLICT (indexname) DO NOTHING", (name, definition))
+            cur.execute(f'DROP INDEX "{name}"')
+        cur.execute(f"SELECT indexname FROM {DEFERRED_INDEX_TABLE} ORDER BY indexname")
+        pending = [row[0] for row in cur.fetchall()]
+    conn.commit()
+    return pending
+
+
+def _build_index(params: dict, name: str, definition: str, maintenance_work_mem: str):
+    """Thread task: build one deferred index over its own connection and mark it done."""
+    conn = connect(params)
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SET maintenance_work_mem = %s", (maintenance_work_mem,))
+            cur.execute("SELECT to_regclass(%s)", (name,))
+            if cur.fetchone()[0] is None:  # a resumed run may find it built already
+                cur.execute(definition)
+            cur.execute(f"DELETE FROM {DEFERRED_INDEX_TABLE} WHERE indexname = %s", (name,))
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def deferred_indexes(conn) -> list:
+    """(name, definition) of the indexes a bulk load dropped and has not rebuilt yet."""
+    with conn.cursor() as cur:
+        cur.execute("SELECT to_regclass(%s)", (DEFERRED_INDEX_TABLE,))
+        pending = []
+        if cur.fetchone()[0] is not None:
+            cur.execute(f"SELECT indexname, indexdef FROM {DEFERRED_INDEX_TABLE} ORDER BY indexname")
+            pending = cur.fetchall()
+    conn.commit()
+    return pending
+
+
+def rebuild_indexes(conn, params: dict, maintenance_work_mem: str = BULK_MAINTENANCE_WORK_MEM) -> list:
+    """Build every pending deferred index at once (one connection each), then ANALYZE raw_transactions."""
+    pending = deferred_indexes(conn)
+    if pending:
+        with ThreadPoolExecutor(max_workers=len(pending)) as pool:
+            for task in [pool.submit(_build_index, params, name, definition, maintenance_work_mem) for name, definition in pending]:
+                task.result()
+    conn.autocommit = True
+    try:
+        with conn.cursor() as cur:
+            cur.execute("ANALYZE raw_transactions")
+    finally:
+        conn.autocommit = False
+    return [name for name, _ in pending]
+
+
+def bulk_load(conn, params: dict, csv_path: Path, workers: int = 1, chunksize: int = COPY_CHUNKSIZE, maintenance_work_mem: str = BULK_MAINTENANCE_WORK_MEM) -> int:
+    """
+    Append `csv_path` with raw_transactions' plain indexes deferred.
+
+    The indexes are dropped (defer_indexes), the file is loaded by
+    stream_load or, with `workers` > 1, parallel_load, and the indexes are
+    rebuilt concurrently with `maintenance_work_mem` per session before a
+    final ANALYZE. If the run is interrupted, the indexes still to build
+    stay in DEFERRED_INDEX_TABLE; --rebuild-indexes (rebuild_indexes)
+    finishes them without loading the file again. While some are pending
+    the DDL's CREATE INDEX statements are skipped, so a resumed run does
+    not build them serially only to drop them again.
+    """
+    refuse_keyed_append(conn)
+    run_sql_file(conn, DDL_FILE, indexes=not deferred_indexes(conn))
+    defer_indexes(conn)
+    if workers > 1:
+        rows = parallel_load(conn, params, csv_path, workers, chunksize=chunksize, ddl=False)
+    else:
+        rows = stream_load(conn, csv_path, chunksize=chunksize, ddl=False)
+    rebuild_indexes(conn, params, maintenance_work_mem)
+    return rows
+
+
+def detach_partitions(conn, before: str, archive_schema: str = None) -> list:
+    """
+    Detach the monthly partitions of the months before `before` ('YYYY-MM')
+    from raw_transactions, in one transaction. They stay as plain tables,
+    moved to `archive_schema` if given, to be dumped or dropped. Returns
+    their names.
+    """
+    cutoff = month_partition(pd.Period(before, freq="M").strftime("%Y-%m"))
+    try:
+        with conn.cursor() as cur:
+            cur.execute(textwrap.dedent("""
+                SELECT c.relname
+                FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid
+                WHERE i.inhparent = 'raw_transactions'::regclass AND starts_with(c.relname, %s)
+                ORDER BY c.relname
+            """), (PARTITION_PREFIX,))
+            names = [row[0] for row in cur.fetchall() if row[0] < cutoff]
+            if archive_schema and names:
+                cur.execute(f'CREATE SCHEMA IF NOT EXISTS "{archive_schema}"')
+            for name in names:
+                # not CONCURRENTLY: that is refused while a default partition exists
+                cur.execute(f"ALTER TABLE raw_transactions DETACH PARTITION {name}")
+                if archive_schema:
+                    cur.execute(f'ALTER TABLE {name} SET SCHEMA "{archive_schema}"')
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return names
+
+
+def conn_params(args) -> dict:
+    return dict(
         host=args.host or os.environ.get("PGHOST", "localhost"),
         port=args.port or int(os.environ.get("PGPORT", 5432)),
         dbname=args.dbname or os.environ.get("PGDATABASE", "loyalty"),
         user=args.user or os.environ.get("PGUSER", "postgres"),
         password=args.password or os.environ.get("PGPASSWORD", "example"),
     )
-    return conn
+
+
+def connect(params: dict):
+    if psycopg2 is None:
+        raise RuntimeError("psycopg2 is required to load into Postgres")
+    return psycopg2.connect(**params)
+
+
+def get_conn(args):
+    return connect(conn_params(args))
 
 def main():
     parser = argparse.ArgumentParser()
@@ -149,8 +853,35 @@ def main():
     parser.add_argument("--dbname")
     parser.add_argument("--user")
     parser.add_argument("--password")
+    parser.add_argument("--chunksize", type=int, default=COPY_CHUNKSIZE, help="Rows typed client-side per COPY chunk")
+    parser.add_argument("--staging-table", action="store_true", help="Load through a temporary TEXT table and INSERT ... SELECT (older path)")
+    parser.add_argument("--workers", type=int, default=1, help="COPY this many byte-range partitions in parallel, committed together")
+    parser.add_argument("--upsert", action="store_true", help="Merge the file into raw_transactions on transaction_id instead of appending")
+    parser.add_argument("--bulk", action="store_true", help="Drop the plain indexes while loading, then rebuild them in parallel and ANALYZE")
+    parser.add_argument("--rebuild-indexes", action="store_true", help="Only rebuild the indexes an interrupted --bulk load left dropped")
+    parser.add_argument("--maintenance-work-mem", default=BULK_MAINTENANCE_WORK_MEM, help="maintenance_work_mem of each --bulk index build")
+    parser.add_argument("--detach-before", metavar="YYYY-MM", help="Only detach the monthly partitions older than this month")
+    parser.add_argument("--archive-schema", help="Move the partitions --detach-before detaches into this schema")
     args = parser.parse_args()
 
+    if args.detach_before:
+        conn = get_conn(args)
+        try:
+            detached = detach_partitions(conn, args.detach_before, args.archive_schema)
+            print(f"Detached {len(detached)} partitions: {detached}")
+        finally:
+            conn.close()
+        return
+
+    if args.rebuild_indexes:
+        conn = get_conn(args)
+        try:
+            built = rebuild_indexes(conn, conn_params(args), args.maintenance_work_mem)
+            print(f"Rebuilt {len(built)} deferred indexes: {built}")
+        finally:
+            conn.close()
+        return
+
     csv_path = Path(args.csv)
     if not csv_path.exists():
         print("CSV not found:", csv_path)
@@ -158,8 +889,21 @@ def main():
 
     conn = get_conn(args)
     try:
-        create_table_and_load(conn, csv_path)
-        print("Load complete.")
+        if args.staging_table:
+            create_table_and_load(conn, csv_path)
+            print("Load complete.")
+        elif args.bulk:
+            rows = bulk_load(conn, conn_params(args), csv_path, workers=args.workers, chunksize=args.chunksize, maintenance_work_mem=args.maintenance_work_mem)
+            print(f"Bulk load complete ({rows} rows); indexes rebuilt and table analyzed.")
+        elif args.upsert:
+            counts = upsert_load(conn, csv_path, chunksize=args.chunksize)
+            print("Merge complete:", counts)
+        elif args.workers > 1:
+            rows = parallel_load(conn, conn_params(args), csv_path, args.workers, chunksize=args.chunksize)
+            print(f"Load complete ({rows} rows, {args.workers} workers).")
+        else:
+            rows = stream_load(conn, csv_path, chunksize=args.chunksize)
+            print(f"Load complete ({rows} rows).")
     finally:
         conn.close()
 
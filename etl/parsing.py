@@ -0,0 +1,201 @@
+"""Vectorized date/time parsing shared by the cleaning and validation scripts.
+
+The scalar helpers in clean_csv.py (try_parse_date / try_parse_time) loop over
+candidate formats with datetime.strptime for every row. parse_datetime_series
+gives the same answers for a whole column at once: each format is tried with
+pd.to_datetime against the values that are still unparsed, so a column costs
+one vectorized pass per format instead of one Python call per row.
+
+Retail extracts repeat the same Date/Time/Email values many times, so the
+public helpers go through memoized_map: a column is factorized, only distinct
+values missing from a bounded per-process cache are parsed, and the results
+are broadcast back by code. The cache outlives a single call, so chunks and
+files processed in the same process reuse earlier work.
+"""
+from collections import OrderedDict
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+DATE_OUT_FMT = "%Y-%m-%d"
+TIME_OUT_FMT = "%H:%M:%S"
+
+# upper bound on cached distinct values per (kind, formats) key
+DEFAULT_CACHE_SIZE = 200_000
+
+# character ranges of the two normalized targets inside "YYYY-MM-DDTHH:MM:SS"
+_ISO_FIELDS = {DATE_OUT_FMT: (0, 10), TIME_OUT_FMT: (11, 19)}
+
+
+def _leap_second_rejects(values, fmt):
+    """
+    Return a bool array marking values strptime would reject but pandas accepts.
+
+    pandas rolls a seconds field of 60/61 over into the next minute, while
+    datetime.strptime raises. Only values that parsed to second 0 or 1 can
+    be affected, so just those few are re-checked with strptime.
+    """
+    rejects = np.zeros(len(values), dtype=bool)
+    for i, v in enumerate(values):
+        try:
+            datetime.strptime(v, fmt)
+        except ValueError:
+            rejects[i] = True
+    return rejects
+
+
+def _format_parsed(parsed: pd.Series, out_fmt: str) -> np.ndarray:
+    """
+    Render parsed timestamps with `out_fmt`.
+
+    Series.dt.strftime goes through Python per element, so the two normalized
+    targets are cut out of numpy's ISO rendering instead. Years outside
+    1000-9999 (where strftime does not zero-pad) keep the strftime path.
+    """
+    field = _ISO_FIELDS.get(out_fmt)
+    years = parsed.dt.year.to_numpy()
+    if field is None or years.min() < 1000 or years.max() > 9999:
+        return parsed.dt.strftime(out_fmt).to_numpy(dtype=object)
+    start, stop = field
+    iso = parsed.to_numpy().astype("datetime64[s]").astype("U19")
+    chars = iso.view("U1").reshape(len(iso), 19)[:, start:stop]
+    return np.ascontiguousarray(chars).view(f"U{stop - start}").ravel().astype(object)
+
+
+def parse_datetime_series(ser: pd.Series, fmts, out_fmt: str) -> pd.Series:
+    """
+    Parse a column of date/time strings against candidate formats.
+
+    Returns an object Series aligned with `ser` holding the value re-formatted
+    with `out_fmt`, or None where the value is missing, blank or matches none of
+    `fmts` (same contract as try_parse_date / try_parse_time).
+    """
+    n = len(ser)
+    out = np.full(n, None, dtype=object)
+    if n == 0:
+        return pd.Series(out, index=ser.index, dtype=object)
+
+    present = ser.notna().to_numpy()
+    text = np.full(n, "", dtype=object)
+    text[present] = ser[present].astype(str).str.strip().to_numpy(dtype=object)
+    pending = present & (text != "")
+
+    for fmt in fmts:
+        if not pending.any():
+            break
+        idx = np.flatnonzero(pending)
+        parsed = pd.to_datetime(pd.Series(text[idx]), format=fmt, errors="coerce")
+        ok = parsed.notna().to_numpy().copy()
+        if "%S" in fmt:
+            suspect = ok & (parsed.dt.second.to_numpy() <= 1)  # :60 -> :00, :61 -> :01
+            if suspect.any():
+                ok[suspect] = ~_leap_second_rejects(text[idx[suspect]], fmt)
+        if not ok.any():
+            continue
+        out[idx[ok]] = _format_parsed(parsed[ok], out_fmt)
+        pending[idx[ok]] = False
+
+    return pd.Series(out, index=ser.index, dtype=object)
+
+
+class ParseCache:
+    """Bounded LRU mapping of raw value -> parsed result."""
+
+    def __init__(self, maxsize: int = DEFAULT_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def lookup(self, values):
+        """Return (results, missing_positions) for a sequence of values."""
+        results = np.empty(len(values), dtype=object)
+        missing = []
+        data = self._data
+        for i, v in enumerate(values):
+            if v in data:
+                data.move_to_end(v)
+                results[i] = data[v]
+            else:
+                missing.append(i)
+        self.hits += len(values) - len(missing)
+        self.misses += len(missing)
+        return results, np.asarray(missing, dtype=np.intp)
+
+    def store(self, values, results):
+        data = self._data
+        for v, r in zip(values, results):
+            data[v] = r
+        while len(data) > self.maxsize:
+            data.popitem(last=False)
+
+    def clear(self):
+        self._data.clear()
+        self.hits = 0
+        self.misses = 0
+
+
+_CACHES = {}
+
+
+def get_cache(key) -> ParseCache:
+    """Process-wide cache for one parse kind, e.g. ("date", ("%m/%d/%Y",))."""
+    cache = _CACHES.get(key)
+    if cache is None:
+        cache = _CACHES[key] = ParseCache()
+    return cache
+
+
+def clear_caches():
+    for cache in _CACHES.values():
+        cache.clear()
+
+
+def memoized_map(ser: pd.Series, func, cache_key, na_result=None) -> pd.Series:
+    """
+    Apply a vectorized `func` to the distinct values of `ser` only.
+
+    `func` receives a Series of distinct non-null values and returns an
+    array-like of results in the same order. Missing values map to
+    `na_result`. Results are remembered under `cache_key` across calls.
+    """
+    codes, uniques = pd.factorize(ser, use_na_sentinel=True)
+    uniques = np.asarray(uniques, dtype=object)
+    cache = get_cache(cache_key)
+    results, missing = cache.lookup(uniques)
+    if len(missing):
+        fresh = np.asarray(func(pd.Series(uniques[missing], dtype=object)), dtype=object)
+        results[missing] = fresh
+        cache.store(uniques[missing], fresh)
+
+    out = np.empty(len(codes), dtype=object)
+    present = codes >= 0
+    out[present] = results[codes[present]]
+    out[~present] = na_result
+    return pd.Series(out, index=ser.index, dtype=object)
+
+
+def parse_date_series(ser: pd.Series, fmts) -> pd.Series:
+    """Vectorized try_parse_date: normalize a column to YYYY-MM-DD."""
+    fmts = tuple(fmts)
+    return memoized_map(ser, lambda u: parse_datetime_series(u, fmts, DATE_OUT_FMT), ("date", fmts))
+
+
+def parse_time_series(ser: pd.Series, fmts) -> pd.Series:
+    """Vectorized try_parse_time: normalize a column to HH:MM:SS."""
+    fmts = tuple(fmts)
+    return memoized_map(ser, lambda u: parse_datetime_series(u, fmts, TIME_OUT_FMT), ("time", fmts))
+
+
+def matches_format_series(ser: pd.Series, fmt: str) -> pd.Series:
+    """Vectorized validate_date_strict / validate_time_strict for one exact format."""
+    return memoized_map(
+        ser,
+        lambda u: parse_datetime_series(u, [fmt], TIME_OUT_FMT).notna().to_numpy(),
+        ("strict", fmt),
+        na_result=False,
+    ).astype(bool)
@@ -0,0 +1,96 @@
+"""Cache of validation reports for files that have not changed.
+
+A report depends only on the staged file's content, the ingestion config and
+the options that change what is checked (the failure budget and the state of
+the key index). ResultCache keys a report on a digest of those, so the
+/validate endpoint, ingest.py --validate and the CLI return the stored report
+instead of re-validating an unchanged file.
+
+Hashing a large file is the expensive part of a lookup, so each file's
+digest is remembered with its size and mtime and only recomputed when
+either changes. Reports are kept as one JSON file per key under
+validation_results/.cache/; reading an entry marks it recently used and the
+least recently used ones are removed past `max_entries`.
+"""
+from pathlib import Path
+import hashlib
+import json
+import os
+
+from etl.key_index import file_digest
+
+ROOT = Path(__file__).resolve().parents[1]
+CACHE_DIR = ROOT / "validation_results" / ".cache"
+MAX_ENTRIES = 64
+STAMPS_FILE = "stamps.json"
+
+
+def _write_json(path: Path, data):
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with tmp.open("w", encoding="utf-8") as fo:
+        json.dump(data, fo, default=str)
+    tmp.replace(path)
+
+
+class ResultCache:
+    """Validation reports by content digest, least recently used evicted first."""
+
+    def __init__(self, cache_dir=CACHE_DIR, max_entries: int = MAX_ENTRIES):
+        self.cache_dir = Path(cache_dir)
+        self.max_entries = max_entries
+
+    def _stamps(self) -> dict:
+        try:
+            return json.loads((self.cache_dir / STAMPS_FILE).read_text(encoding="utf-8"))
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def content_digest(self, path) -> str:
+        """SHA-256 of the file, reused while its size and mtime are unchanged."""
+        path = Path(path).resolve()
+        st = path.stat()
+        stamps = self._stamps()
+        size, mtime_ns, digest = stamps.get(str(path), (None, None, None))
+        if (size, mtime_ns) == (st.st_size, st.st_mtime_ns):
+            return digest
+        digest = file_digest(path)
+        stamps.pop(str(path), None)
+        stamps[str(path)] = (st.st_size, st.st_mtime_ns, digest)
+        # oldest stamps first; keep a few per cache entry
+        for old in list(stamps)[: max(0, len(stamps) - 4 * self.max_entries)]:
+            del stamps[old]
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        _write_json(self.cache_dir / STAMPS_FILE, stamps)
+        return digest
+
+    def key(self, csv_path, config_path, **options) -> str:
+        """Cache key of a report on `csv_path` under `config_path` with the given report-changing options."""
+        parts = {
+            "csv": self.content_digest(csv_path),
+            "config": self.content_digest(config_path),
+            "options": options,
+        }
+        return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode()).hexdigest()
+
+    def get(self, key: str):
+        """The cached report for `key`, or None."""
+        path = self.cache_dir / f"{key}.json"
+        try:
+            result = json.loads(path.read_text(encoding="utf-8"))
+        except (FileNotFoundError, ValueError):
+            return None
+        os.utime(path)  # mark as recently used
+        return result
+
+    def put(self, key: str, result: dict):
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        _write_json(self.cache_dir / f"{key}.json", result)
+        self._evict()
+
+    def _evict(self):
+        entries = [p for p in self.cache_dir.glob("*.json") if p.name != STAMPS_FILE]
+        if len(entries) <= self.max_entries:
+            return
+        entries.sort(key=lambda p: p.stat().st_mtime_ns)
+        for path in entries[: len(entries) - self.max_entries]:
+            path.unlink(missing_ok=True)
@@ -0,0 +1,91 @@
+"""Row samples read by seeking, and failure-rate estimates from them.
+
+validate.py --sample N validates about N rows instead of the whole file. The
+data bytes are cut into N equal strata and one row is taken from each: the
+first row that starts at or after a random offset in the stratum (wrapping
+around to the stratum's first row). Only those rows are read, one seek
+each, so the time depends on N and not on the file size. A row's chance of
+being picked grows with the length of the row before it, which is close to
+uniform when rows have similar lengths, as in the retail extracts. Like
+split_csv_byte_ranges, this assumes no quoted field contains a newline.
+
+Failure rates are estimated per expectation with Wilson score intervals.
+"""
+from pathlib import Path
+import io
+import math
+
+import numpy as np
+
+from etl.utils import read_csv
+
+CONFIDENCE = 0.95
+_Z = {0.9: 1.6449, 0.95: 1.96, 0.99: 2.5758}
+
+
+def sample_lines(path, n: int, seed: int = 0):
+    """
+    (header bytes, [sampled row bytes in file order], data bytes) for about
+    `n` rows of `path`, one per byte stratum.
+    """
+    p = Path(path)
+    size = p.stat().st_size
+    rng = np.random.default_rng(seed)
+    lines = []
+    with p.open("rb") as fh:
+        header = fh.readline()
+        data_start = fh.tell()
+        data = size - data_start
+        strata = max(1, min(n, data))
+        bounds = [data_start + data * i // strata for i in range(strata + 1)]
+        for lo, hi in zip(bounds, bounds[1:]):
+            if hi <= lo:
+                continue
+            _seek_row_start(fh, int(rng.integers(lo, hi)), data_start)
+            if fh.tell() >= hi:
+                # no row starts after the offset: wrap around to the stratum's first row
+                _seek_row_start(fh, lo, data_start)
+                if fh.tell() >= hi:
+                    continue  # no row starts in this stratum
+            line = fh.readline()
+            if line.strip():
+                lines.append(line if line.endswith(b"\n") else line + b"\n")
+    return header, lines, data
+
+
+def _seek_row_start(fh, offset: int, data_start: int):
+    """Move to the first row that starts at or after `offset`."""
+    if offset > data_start:
+        fh.seek(offset - 1)
+        fh.readline()
+    else:
+        fh.seek(data_start)
+
+
+def read_sample(path, n: int, seed: int = 0):
+    """(text DataFrame of the sampled rows, estimated number of rows in the file)."""
+    header, lines, data = sample_lines(path, n, seed)
+    df = read_csv(io.BytesIO(header + b"".join(lines)), text=True, header=header)
+    mean_bytes = sum(len(line) for line in lines) / len(lines) if lines else 0
+    estimated_rows = int(round(data / mean_bytes)) if mean_bytes else 0
+    return df, estimated_rows
+
+
+def wilson_interval(failed: int, n: int, confidence: float = CONFIDENCE):
+    """Wilson score interval for a failure rate of `failed` out of `n`, or None without rows."""
+    if n <= 0:
+        return None
+    z = _Z[confidence]
+    p = failed / n
+    denom = 1 + z * z / n
+    centre = (p + z * z / (2 * n)) / denom
+    half = z * math.sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / denom
+    return [round(max(0.0, centre - half), 6), round(min(1.0, centre + half), 6)]
+
+
+def failure_estimate(failed: int, n: int, confidence: float = CONFIDENCE) -> dict:
+    return {
+        "sample_failed": failed,
+        "estimated_failure_rate": round(failed / n, 6) if n else None,
+        "confidence_interval": wilson_interval(failed, n, confidence),
+    }
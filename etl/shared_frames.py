@@ -0,0 +1,77 @@
+"""Hand DataFrames to pool workers through shared memory instead of pickling them.
+
+SharedFrame writes a text frame's Arrow IPC stream into one SharedMemory
+block. Workers get only the block's name and size; read_shared_frame maps
+the Arrow buffers straight out of the block and converts just the columns
+the worker asks for. Requires pyarrow.
+"""
+from multiprocessing import shared_memory
+
+import pandas as pd
+
+from etl.utils import arrow_to_frame
+
+try:
+    import pyarrow as pa
+except ImportError:  # callers check `available` and fall back to serial work
+    pa = None
+
+available = pa is not None
+
+
+class SharedFrame:
+    """
+    A DataFrame copied into shared memory as an Arrow IPC stream.
+
+    Use as a context manager; the block is unlinked on exit. The picklable
+    `handle` is what workers receive.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        sizer = pa.MockOutputStream()
+        with pa.ipc.new_stream(sizer, table.schema) as writer:
+            writer.write_table(table)
+        self.size = sizer.size()
+        self._shm = shared_memory.SharedMemory(create=True, size=max(self.size, 1))
+        sink = pa.FixedSizeBufferWriter(pa.py_buffer(self._shm.buf))
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        sink.close()
+
+    @property
+    def handle(self):
+        return (self._shm.name, self.size)
+
+    def close(self):
+        if self._shm is not None:
+            self._shm.close()
+            self._shm.unlink()
+            self._shm = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def attach(handle):
+    """Open a SharedFrame block in a worker process (the creator owns its lifetime)."""
+    name, _ = handle
+    # pool workers share the creator's resource tracker, which unlinks the block only if it leaks
+    return shared_memory.SharedMemory(name=name)
+
+
+def read_shared_frame(shm, handle, columns=None) -> pd.DataFrame:
+    """
+    Text DataFrame of `columns` from an attached block.
+
+    The frame may reference the shared buffers, so it must be dropped before
+    the block is closed.
+    """
+    _, size = handle
+    table = pa.ipc.open_stream(pa.py_buffer(shm.buf)[:size]).read_all()
+    if columns is not None:
+        table = table.select(list(columns))
+    return arrow_to_frame(table, text=True)
@@ -0,0 +1,302 @@
+"""Columnar Parquet staging next to data/staged.csv.
+
+ingest.py --parquet parses the staged CSV once and writes a typed, zstd
+compressed Parquet file with bounded row groups (data/staged.parquet).
+Validation, transforms and the admin service then read it via read_staged
+instead of re-parsing the CSV text, and can load only the columns they need.
+
+Config int/float columns are stored typed only when every value in the file
+converts; otherwise the column stays text so no raw value is lost to
+staging. The CSV's size and mtime are recorded in the Parquet metadata, and
+a Parquet file that no longer matches its CSV is ignored.
+
+validate.py --emit-typed also writes the values its type checks coerced
+(data/staged.typed.parquet): every config int/float column as float64
+(pd.to_numeric of the raw text, unconvertible values null) plus a
+`__failed_<column>` null mask marking the values that failed to convert;
+the other columns stay text. read_staged(text=False) serves it in place of
+re-coercing, and clean_csv takes its numeric columns from it (TypedColumns).
+"""
+from pathlib import Path
+import json
+
+import numpy as np
+import pandas as pd
+
+from etl.utils import NUMERIC_TYPES, arrow_csv_options, arrow_to_frame, column_types, coerce_to_config_types, header_columns, numeric_to_arrow, read_csv
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.csv as pa_csv
+    import pyarrow.parquet as pq
+except ImportError:  # staging is optional; read_staged falls back to the CSV
+    pa = None
+
+ROW_GROUP_SIZE = 100_000
+COMPRESSION = "zstd"
+FAILED_PREFIX = "__failed_"
+
+
+def staged_parquet_path(csv_path) -> Path:
+    return Path(csv_path).with_suffix(".parquet")
+
+
+def typed_parquet_path(csv_path) -> Path:
+    return Path(csv_path).with_suffix(".typed.parquet")
+
+
+def _source_stamp(csv_path) -> dict:
+    st = Path(csv_path).stat()
+    return {b"source_size": str(st.st_size).encode(), b"source_mtime_ns": str(st.st_mtime_ns).encode()}
+
+
+def fresh_staged_parquet(csv_path):
+    """Return the Parquet staging file for `csv_path` if it was written from the CSV as it is now."""
+    return _fresh(staged_parquet_path(csv_path), csv_path)
+
+
+def fresh_typed_parquet(csv_path):
+    """Return the typed artifact for `csv_path` if validation wrote it from the CSV as it is now."""
+    return _fresh(typed_parquet_path(csv_path), csv_path)
+
+
+def _fresh(pq_path, csv_path):
+    if pa is None:
+        return None
+    if not pq_path.exists() or not Path(csv_path).exists():
+        return None
+    metadata = pq.read_schema(str(pq_path)).metadata or {}
+    stamp = _source_stamp(csv_path)
+    if any(metadata.get(k) != v for k, v in stamp.items()):
+        return None
+    return pq_path
+
+
+def _batches(csv_path):
+    columns = header_columns(csv_path)
+    read_opts, convert_opts = arrow_csv_options(columns, text=True)
+    return pa_csv.open_csv(csv_path, read_options=read_opts, convert_options=convert_opts)
+
+
+def _castable_types(csv_path) -> dict:
+    """First pass: which config int/float columns convert losslessly in every batch."""
+    cfg = column_types()
+    targets = {}
+    for col in header_columns(csv_path):
+        t = cfg.get(col)
+        if t in NUMERIC_TYPES:
+            targets[col] = pa.int64() if t in ("int", "integer") else pa.float64()
+    for batch in _batches(csv_path):
+        for col in list(targets):
+            try:
+                pc.cast(batch.column(col), targets[col])
+            except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+                del targets[col]
+        if not targets:
+            break
+    return targets
+
+
+def write_parquet_staging(csv_path, dest=None, row_group_size: int = ROW_GROUP_SIZE, compression: str = COMPRESSION) -> Path:
+    """Stream `csv_path` into a typed Parquet file (two passes over the CSV, bounded memory)."""
+    if pa is None:
+        raise RuntimeError("pyarrow is required to write Parquet staging files")
+    dest = Path(dest) if dest is not None else staged_parquet_path(csv_path)
+    typed = _castable_types(csv_path)
+    stamp = _source_stamp(csv_path)
+
+    tmp = dest.with_name(dest.name + ".tmp")
+    writer = None
+    pending, rows = [], 0
+
+    def flush():
+        nonlocal writer
+        table = pa.Table.from_batches(pending)
+        table = pa.Table.from_arrays(
+            [pc.cast(col, typed[name]) if name in typed else col for name, col in zip(table.column_names, table.columns)],
+            names=table.column_names,
+        )
+        if writer is None:
+            writer = pq.ParquetWriter(str(tmp), table.schema.with_metadata(stamp), compression=compression)
+        writer.write_table(table, row_group_size=row_group_size)
+
+    try:
+        # buffer Arrow batches so each write produces one full row group
+        for batch in _batches(csv_path):
+            pending.append(batch)
+            rows += batch.num_rows
+            if rows >= row_group_size:
+                flush()
+                pending, rows = [], 0
+        if pending:
+            flush()
+        if writer is None:
+            # header-only CSV: write an empty file with the header's columns
+            schema = pa.schema([(n, typed.get(n, pa.string())) for n in header_columns(csv_path)], metadata=stamp)
+            writer = pq.ParquetWriter(str(tmp), schema, compression=compression)
+    finally:
+        if writer is not None:
+            writer.close()
+    tmp.replace(dest)
+    return dest
+
+
+class TypedStagingWriter:
+    """
+    Stream validated chunks of `csv_path` into its typed artifact.
+
+    `columns` are the config int/float columns to store coerced. The file
+    is written next to the CSV under a temporary name and only replaces the
+    artifact on close(publish=True), so a partial run never shadows it.
+    """
+
+    def __init__(self, csv_path, columns, dest=None, compression: str = COMPRESSION):
+        if pa is None:
+            raise RuntimeError("pyarrow is required to write the typed staging artifact")
+        self.columns = list(columns)
+        self.dest = Path(dest) if dest is not None else typed_parquet_path(csv_path)
+        self.compression = compression
+        self._tmp = self.dest.with_name(self.dest.name + ".tmp")
+        self._metadata = dict(_source_stamp(csv_path), typed_columns=json.dumps(self.columns).encode())
+        self._writer = None
+
+    def write(self, df: pd.DataFrame, views: dict):
+        """Append one chunk; `views` maps each typed column to its ColumnView (etl/expectations.py)."""
+        names, arrays = [], []
+        for col in df.columns:
+            names.append(col)
+            if col in self.columns:
+                arrays.append(pa.array(views[col].numeric.to_numpy(dtype="float64", na_value=np.nan), from_pandas=True))
+            else:
+                arrays.append(pa.array(df[col], type=pa.string(), from_pandas=True))
+        for col in self.columns:
+            names.append(FAILED_PREFIX + col)
+            arrays.append(pa.array(views[col].numeric_failed))
+        table = pa.Table.from_arrays(arrays, names=names)
+        if self._writer is None:
+            self._writer = pq.ParquetWriter(str(self._tmp), table.schema.with_metadata(self._metadata), compression=self.compression)
+        self._writer.write_table(table, row_group_size=ROW_GROUP_SIZE)
+
+    def close(self, publish: bool = True):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+            if publish:
+                self._tmp.replace(self.dest)
+        self._tmp.unlink(missing_ok=True)
+
+
+def _typed_columns(pq_path) -> list:
+    return json.loads(pq.read_schema(str(pq_path)).metadata[b"typed_columns"])
+
+
+class TypedColumns:
+    """Sequential reader of an artifact's coerced float64 columns: take(n) returns the next n rows."""
+
+    def __init__(self, pq_path):
+        self.columns = _typed_columns(pq_path)
+        self._batches = pq.ParquetFile(str(pq_path)).iter_batches(columns=self.columns)
+        self._rest = None
+
+    def __contains__(self, col):
+        return col in self.columns
+
+    def take(self, n: int) -> pd.DataFrame:
+        parts, rows = [], 0
+        if self._rest is not None:
+            parts, rows, self._rest = [self._rest], self._rest.num_rows, None
+        while rows < n:
+            batch = next(self._batches, None)
+            if batch is None:
+                raise ValueError("typed artifact has fewer rows than its CSV")
+            parts.append(pa.Table.from_batches([batch]))
+            rows += batch.num_rows
+        table = pa.concat_tables(parts) if parts else pa.table({c: pa.array([], pa.float64()) for c in self.columns})
+        if rows > n:
+            self._rest = table.slice(n)
+        table = table.slice(0, n)
+        return pd.DataFrame({c: table.column(c).to_numpy() for c in self.columns})
+
+
+def _typed_to_frame(table, typed, start: int = 0) -> pd.DataFrame:
+    """The read_staged(text=False) frame from an artifact table: config types applied to the `typed` floats."""
+    cfg = column_types()
+    names, arrays = [], []
+    for name, col in zip(table.column_names, table.columns):
+        if name.startswith(FAILED_PREFIX):
+            continue
+        names.append(name)
+        arrays.append(numeric_to_arrow(col.to_numpy(), cfg[name]) if name in typed and cfg.get(name) in NUMERIC_TYPES else col)
+    return coerce_to_config_types(arrow_to_frame(pa.Table.from_arrays(arrays, names=names), text=False, start=start))
+
+
+def _table_to_frame(table, text: bool, start: int = 0) -> pd.DataFrame:
+    if text:
+        table = pa.Table.from_arrays([c if pa.types.is_string(c.type) else pc.cast(c, pa.string()) for c in table.columns], names=table.column_names)
+        return arrow_to_frame(table, text=True, start=start)
+    # numeric config columns kept as text in staging are coerced like read_csv does
+    return coerce_to_config_types(arrow_to_frame(table, text=False, start=start))
+
+
+def staged_columns(csv_path) -> list:
+    """Column names of a staged dataset, from the Parquet schema or the CSV header."""
+    pq_path = fresh_staged_parquet(csv_path)
+    if pq_path is None:
+        return header_columns(csv_path)
+    return pq.read_schema(str(pq_path)).names
+
+
+def _staged_source(csv_path, text: bool):
+    """(Parquet file to read instead of the CSV or None, whether it is the typed artifact)."""
+    if not text:
+        typed = fresh_typed_parquet(csv_path)
+        if typed is not None:
+            return typed, True
+    return fresh_staged_parquet(csv_path), False
+
+
+def read_staged(csv_path, text: bool = False, columns=None) -> pd.DataFrame:
+    """
+    Read a staged dataset, preferring its fresh Parquet twin over the CSV.
+    Typed reads prefer the artifact validation left (see the module docstring).
+
+    `text` and the returned dtypes follow utils.read_csv. `columns` limits the
+    read to those columns, kept in file order (missing ones are skipped);
+    for Parquet the other columns are never decoded.
+    """
+    pq_path, typed = _staged_source(csv_path, text)
+    if pq_path is None:
+        df = read_csv(csv_path, text=text)
+        return df[[c for c in df.columns if c in set(columns)]] if columns is not None else df
+
+    if columns is not None:
+        wanted = set(columns)
+        columns = [c for c in pq.read_schema(str(pq_path)).names if c in wanted]
+    table = pq.read_table(str(pq_path), columns=columns)
+    return _typed_to_frame(table, _typed_columns(pq_path)) if typed else _table_to_frame(table, text)
+
+
+def iter_staged(csv_path, chunksize: int, text: bool = False, columns=None):
+    """
+    Stream a staged dataset as DataFrames of at most `chunksize` rows.
+
+    Same sources, dtypes and `columns` handling as read_staged; the row index
+    continues across chunks. A header-only dataset yields no frames.
+    """
+    pq_path, typed = _staged_source(csv_path, text)
+    if pq_path is None:
+        for df in read_csv(csv_path, text=text, chunksize=chunksize):
+            yield df[[c for c in df.columns if c in set(columns)]] if columns is not None else df
+        return
+
+    pf = pq.ParquetFile(str(pq_path))
+    if columns is not None:
+        wanted = set(columns)
+        columns = [c for c in pf.schema_arrow.names if c in wanted]
+    typed = _typed_columns(pq_path) if typed else None
+    start = 0
+    for batch in pf.iter_batches(batch_size=chunksize, columns=columns):
+        table = pa.Table.from_batches([batch])
+        yield _typed_to_frame(table, typed, start) if typed is not None else _table_to_frame(table, text, start)
+        start += batch.num_rows
@@ -2,7 +2,7 @@
 transform.py
 
 Simple transform runner that:
-- Loads staged CSV (data/staged.csv) into a local SQLite DB at data/loyalty.db
+- Loads staged CSV (data/staged.csv, or data/staged.parquet when ingest wrote a fresh one) into a local SQLite DB at data/loyalty.db
 - Runs SQL files in `sql/transforms/` in alphabetical order
 - Writes results back as tables in the SQLite DB (so you can inspect via sqlite browser)
 
@@ -12,16 +12,19 @@ Usage:
 """
 from pathlib import Path
 import sqlite3
-import pandas as pd
+import sys
 import glob
 
 ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+from etl.staging import read_staged
 DEFAULT_CSV = ROOT / "data" / "staged.csv"
 DB_PATH = ROOT / "data" / "loyalty.db"
 TRANSFORMS_DIR = ROOT / "sql" / "transforms"
 
 def csv_to_sqlite_table(csv_path: Path, conn: sqlite3.Connection, table_name: str = "transactions"):
-    df = pd.read_csv(csv_path)
+    df = read_staged(csv_path)
     df.to_sql(table_name, conn, if_exists="replace", index=False)
     print(f"Wrote {len(df)} rows -> {table_name}")
 
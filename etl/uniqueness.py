@@ -0,0 +1,172 @@
+"""Memory-bounded duplicate detection for unique-key validation.
+
+DuplicateCounter is exact: key values are buffered with their row
+positions and, past `spill_rows`, written to hash-partitioned files on
+disk; each partition is then counted on its own, so only one partition's
+keys are ever in memory. The result follows duplicated(keep=False): every
+row whose value occurs more than once counts, and the sample lists the
+duplicated values in order of first appearance.
+
+RepeatFilter is the optional prefilter. Two Bloom filters over 64-bit key
+hashes record "seen" and "seen again" while the file streams past, in a
+fixed amount of memory. Every value that occurs twice ends up in "seen
+again" (Bloom filters have no false negatives), so a second pass that
+hands only rows matching it to a DuplicateCounter still gives exact counts
+and samples, while unique rows (the vast majority) never reach the disk.
+When nothing was seen again, the second pass is skipped entirely.
+"""
+import heapq
+import shutil
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# key values buffered in memory before spilling, and spill partitions
+SPILL_ROWS = 2_000_000
+SPILL_PARTITIONS = 16
+
+# bits per Bloom filter (16 MiB each: ~1% false positives at 13M distinct keys) and hash functions
+BLOOM_BITS = 1 << 27
+BLOOM_HASHES = 7
+
+_HASH_KEY = "retail-uniq-keys"
+
+
+def key_hashes(values: np.ndarray) -> np.ndarray:
+    """64-bit hash per key value (missing values hash alike, as duplicated() treats them)."""
+    return pd.util.hash_array(values, hash_key=_HASH_KEY, categorize=False)
+
+
+class DuplicateCounter:
+    """Exact duplicate count and first-appearance sample over (value, position) pairs."""
+
+    def __init__(self, spill_rows: int = SPILL_ROWS, partitions: int = SPILL_PARTITIONS):
+        self.spill_rows = spill_rows
+        self.partitions = partitions
+        self._buffer = []  # (values, positions)
+        self._buffered = 0
+        self._spills = []  # (partition, path)
+        self._spill_dir = None
+
+    def add(self, values: np.ndarray, positions: np.ndarray):
+        """Record key values at increasing row positions."""
+        self._buffer.append((values, positions))
+        self._buffered += len(values)
+        if self._buffered >= self.spill_rows:
+            self._spill()
+
+    def merge(self, other: "DuplicateCounter", offset: int):
+        """Fold in a counter for the rows after this one's, whose positions start at `offset`."""
+        for values, positions in other._buffer:
+            self.add(values, positions + offset)
+        for part, path in other._spills:
+            shifted = pd.read_pickle(path)
+            shifted["pos"] += offset
+            shifted.to_pickle(path)
+            self._spills.append((part, path))
+
+    def _spill(self):
+        if not self._buffer:
+            return
+        if self._spill_dir is None:
+            self._spill_dir = Path(tempfile.mkdtemp(prefix="validate_unique_"))
+        values = np.concatenate([v for v, _ in self._buffer])
+        positions = np.concatenate([p for _, p in self._buffer])
+        parts = key_hashes(values) % np.uint64(self.partitions)
+        for part in np.unique(parts):
+            mask = parts == part
+            path = self._spill_dir / f"{int(part):03d}_{len(self._spills):06d}.pkl"
+            pd.DataFrame({"value": values[mask], "pos": positions[mask]}).to_pickle(path)
+            self._spills.append((int(part), path))
+        self._buffer, self._buffered = [], 0
+
+    @staticmethod
+    def _duplicates(frame: pd.DataFrame):
+        """(duplicate row count, [(first position, value)] of the duplicated values)."""
+        stats = frame.groupby("value", dropna=False, sort=False)["pos"].agg(["size", "min"])
+        dups = stats[stats["size"] > 1]
+        return int(dups["size"].sum()), list(zip(dups["min"].tolist(), dups.index.tolist()))
+
+    def result(self, sample_size: int):
+        """(duplicate row count, up to `sample_size` duplicated values); removes any spill files."""
+        if not self._spills:
+            values = np.concatenate([v for v, _ in self._buffer]) if self._buffer else np.empty(0, dtype=object)
+            ser = pd.Series(values, dtype=object)
+            dup_mask = ser.duplicated(keep=False).to_numpy()
+            return int(dup_mask.sum()), ser[dup_mask].unique().tolist()[:sample_size]
+        self._spill()
+        count, firsts = 0, []
+        try:
+            for part in range(self.partitions):
+                paths = [path for p, path in self._spills if p == part]
+                if not paths:
+                    continue
+                part_count, part_firsts = self._duplicates(pd.concat([pd.read_pickle(path) for path in paths], ignore_index=True))
+                count += part_count
+                firsts = heapq.nsmallest(sample_size, firsts + part_firsts, key=lambda item: item[0])
+        finally:
+            self.close()
+        return count, [value for _, value in firsts]
+
+    def close(self):
+        """Remove spilled partitions."""
+        if self._spill_dir is not None:
+            shutil.rmtree(self._spill_dir, ignore_errors=True)
+            self._spill_dir = None
+        self._spills = []
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over 64-bit hashes (double hashing into `bits` bits)."""
+
+    def __init__(self, bits: int = BLOOM_BITS, hashes: int = BLOOM_HASHES):
+        self.bits = bits
+        self.hashes = hashes
+        self.words = np.zeros((bits + 63) // 64, dtype=np.uint64)
+
+    def _positions(self, h: np.ndarray) -> np.ndarray:
+        """(hashes, n) bit positions."""
+        step = (h >> np.uint64(32)) | np.uint64(1)
+        with np.errstate(over="ignore"):
+            return np.stack([(h + np.uint64(i) * step) % np.uint64(self.bits) for i in range(self.hashes)])
+
+    def contains(self, h: np.ndarray) -> np.ndarray:
+        pos = self._positions(h)
+        bits = (self.words[pos >> np.uint64(6)] >> (pos & np.uint64(63))) & np.uint64(1)
+        return bits.all(axis=0).astype(bool)
+
+    def add(self, h: np.ndarray):
+        pos = self._positions(h).ravel()
+        np.bitwise_or.at(self.words, pos >> np.uint64(6), np.uint64(1) << (pos & np.uint64(63)))
+
+    def any(self) -> bool:
+        return bool(self.words.any())
+
+
+class RepeatFilter:
+    """Bloom filters of keys seen and keys seen more than once, in stream order."""
+
+    def __init__(self, bits: int = BLOOM_BITS, hashes: int = BLOOM_HASHES):
+        self.seen = BloomFilter(bits, hashes)
+        self.repeated = BloomFilter(bits, hashes)
+
+    def update(self, h: np.ndarray):
+        # a repeat was seen in an earlier chunk or earlier in this one
+        again = self.seen.contains(h) | pd.Series(h).duplicated().to_numpy()
+        self.seen.add(h)
+        if again.any():
+            self.repeated.add(h[again])
+
+    def merge(self, other: "RepeatFilter"):
+        """Fold in the filter of another part of the file; keys seen in both count as repeated."""
+        self.repeated.words |= other.repeated.words | (self.seen.words & other.seen.words)
+        self.seen.words |= other.seen.words
+
+    def any(self) -> bool:
+        return self.repeated.any()
+
+    def maybe_repeated(self, h: np.ndarray) -> np.ndarray:
+        """Rows that may hold a duplicated key (never misses a real one)."""
+        return self.repeated.contains(h)
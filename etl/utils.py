@@ -1,9 +1,27 @@
 """Common ETL utilities used by other etl modules."""
 from pathlib import Path
+import csv
+import io
+import numpy as np
 import pandas as pd
 import yaml
 
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+except ImportError:  # pyarrow is optional; readers fall back to the pandas C parser
+    pa = None
+    pa_csv = None
+
 ROOT = Path(__file__).resolve().parents[1]
+CONFIG_PATH = ROOT / "configs" / "ingestion_config.yml"
+NUMERIC_TYPES = ("int", "integer", "float", "numeric", "number")
+
+# pandas' default na_values, so the Arrow reader nulls exactly what read_csv would
+NA_VALUES = ["", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan", "1.#IND", "1.#QNAN", "<NA>", "N/A", "NA", "NULL", "NaN", "None", "n/a", "nan", "null"]
+
+# Arrow block size for streaming reads (bytes)
+ARROW_BLOCK_SIZE = 1 << 22
 
 def load_config(path: str = "configs/ingestion_config.yml"):
     p = Path(path)
@@ -11,13 +29,228 @@ def load_config(path: str = "configs/ingestion_config.yml"):
         raise FileNotFoundError(p)
     return yaml.safe_load(p.read_text())
 
+def column_types(path=CONFIG_PATH) -> dict:
+    """Column name -> lowercased type from the `columns:` section of the ingestion config."""
+    cfg = load_config(path) or {}
+    col_types = {}
+    for c in cfg.get("columns", []) or []:
+        if isinstance(c, dict) and "name" in c:
+            col_types[str(c["name"])] = str(c.get("type", "string")).lower()
+        elif isinstance(c, str):
+            col_types[c] = "string"
+    return col_types
+
+def numeric_columns(path=CONFIG_PATH) -> list:
+    return [c for c, t in column_types(path).items() if t in NUMERIC_TYPES]
+
 def read_csv_to_df(path: str):
     p = Path(path)
     if not p.exists():
         raise FileNotFoundError(p)
-    return pd.read_csv(p)
+    return read_csv(p)
+
+def _arrow_type(config_type: str):
+    if config_type in ("int", "integer"):
+        return pa.int64()
+    if config_type in ("float", "numeric", "number"):
+        return pa.float64()
+    return pa.string()
+
+def header_columns(source) -> list:
+    """Column names from the first line of a CSV path (or of raw header bytes)."""
+    if isinstance(source, bytes):
+        line = source.decode("utf-8-sig")
+    else:
+        with open(source, encoding="utf-8-sig", newline="") as fh:
+            line = fh.readline()
+    return next(csv.reader([line]), [])
+
+def arrow_csv_options(columns, text: bool, names=None, na_values=None, usecols=None):
+    """pyarrow.csv options that null exactly what pd.read_csv would (or only `na_values`), reading `usecols` (default: all)."""
+    if text:
+        col_types = {c: pa.string() for c in columns}
+    else:
+        # columns outside the config stay text, as on the fallback and staged paths
+        cfg = column_types()
+        col_types = {c: _arrow_type(cfg.get(c, "string")) for c in columns}
+    read_opts = pa_csv.ReadOptions(column_names=list(names) if names is not None else None, block_size=ARROW_BLOCK_SIZE)
+    convert_opts = pa_csv.ConvertOptions(
+        column_types=col_types,
+        null_values=NA_VALUES if na_values is None else list(na_values),
+        strings_can_be_null=True,
+        quoted_strings_can_be_null=True,
+        include_columns=list(usecols) if usecols is not None else None,
+    )
+    return read_opts, convert_opts
+
+def arrow_to_frame(table, text: bool, start: int = 0) -> pd.DataFrame:
+    if text:
+        # default string dtype, like read_csv(dtype=str); older pandas yields object + None
+        df = table.to_pandas()
+        if any(dtype == object for dtype in df.dtypes):
+            df = df.fillna(np.nan)
+    else:
+        df = table.to_pandas(types_mapper=pd.ArrowDtype)
+    if start:
+        df.index = pd.RangeIndex(start, start + len(df))
+    return df
+
+def numeric_to_arrow(values: np.ndarray, config_type: str):
+    """Arrow array of the config type from coerced float64 values (NaN and non-integral ints become null)."""
+    if config_type in ("int", "integer"):
+        values = values.copy()
+        values[values % 1 != 0] = np.nan
+    return pa.array(values, from_pandas=True).cast(_arrow_type(config_type))  # NaN -> null
+
+def coerce_to_config_types(df: pd.DataFrame) -> pd.DataFrame:
+    """Typed frame from a text frame: config int/float columns coerced (bad values become null)."""
+    cfg = column_types()
+    for col in df.columns:
+        t = cfg.get(col, "string")
+        if isinstance(df[col].dtype, pd.ArrowDtype) and (t in NUMERIC_TYPES) == pd.api.types.is_numeric_dtype(df[col].dtype):
+            continue  # already typed (e.g. read back from Parquet staging)
+        if t in NUMERIC_TYPES:
+            coerced = pd.to_numeric(df[col], errors="coerce")
+            if pa is None:
+                df[col] = coerced
+                continue
+            arr = numeric_to_arrow(coerced.to_numpy(dtype="float64", na_value=np.nan), t)
+            df[col] = pd.Series(pd.arrays.ArrowExtensionArray(arr), index=df.index)
+        elif pa is not None:
+            df[col] = df[col].astype(pd.ArrowDtype(pa.string()))
+    return df
+
+def _pandas_kwargs(na_values, usecols) -> dict:
+    kwargs = {} if na_values is None else {"keep_default_na": False, "na_values": list(na_values)}
+    if usecols is not None:
+        kwargs["usecols"] = list(usecols)
+    return kwargs
+
+def read_csv(path, text: bool = False, chunksize: int = None, names=None, header: bytes = None, na_values=None, usecols=None):
+    """
+    Shared CSV reader for every ETL stage.
+
+    text=True returns every column as strings with NaN for missing values,
+    exactly like pd.read_csv(path, dtype=str). Otherwise the columns listed
+    in configs/ingestion_config.yml get their configured int/float/string
+    type as Arrow-backed dtypes and every other column is read as text; if a
+    value does not parse, the file is read as text and those columns are
+    coerced (bad values become null).
+
+    With pyarrow installed, files are parsed by pyarrow's multithreaded CSV
+    reader; without it this is plain pd.read_csv. With `chunksize`, an
+    iterator of DataFrames of that many rows is returned. `path` may be a
+    binary file object (see open_csv_byte_range) if `header` holds its
+    header line. `na_values` replaces the values read as missing (default:
+    pandas' NA_VALUES), e.g. [""] to keep text such as "NA" verbatim, and
+    `usecols` limits the read to those columns.
+    """
+    if chunksize:
+        return _iter_csv(path, text, chunksize, names, header, na_values, usecols)
+    if pa_csv is None:
+        if text:
+            return pd.read_csv(path, dtype=str, names=names, **_pandas_kwargs(na_values, usecols))
+        return coerce_to_config_types(pd.read_csv(path, dtype=str, names=names, **_pandas_kwargs(na_values, usecols)))
+
+    columns = list(names) if names is not None else header_columns(header if header is not None else path)
+    read_opts, convert_opts = arrow_csv_options(columns, text, names, na_values, usecols)
+    try:
+        return arrow_to_frame(pa_csv.read_csv(path, read_options=read_opts, convert_options=convert_opts), text)
+    except pa.ArrowInvalid:
+        if text or header is not None:
+            raise
+        return coerce_to_config_types(read_csv(path, text=True, names=names, na_values=na_values, usecols=usecols))
+
+def _iter_csv(path, text: bool, chunksize: int, names=None, header: bytes = None, na_values=None, usecols=None):
+    """Stream `path` as DataFrames of `chunksize` rows (the last one may be shorter)."""
+    if pa_csv is None or not text:
+        frames = pd.read_csv(path, dtype=str, chunksize=chunksize, names=names, **_pandas_kwargs(na_values, usecols))
+        for df in frames:
+            yield df if text else coerce_to_config_types(df)
+        return
+
+    columns = list(names) if names is not None else header_columns(header if header is not None else path)
+    read_opts, convert_opts = arrow_csv_options(columns, text, names, na_values, usecols)
+    pending, rows, start = [], 0, 0
+    for batch in pa_csv.open_csv(path, read_options=read_opts, convert_options=convert_opts):
+        pending.append(batch)
+        rows += batch.num_rows
+        while rows >= chunksize:
+            table = pa.Table.from_batches(pending)
+            yield arrow_to_frame(table.slice(0, chunksize), text, start)
+            start += chunksize
+            rest = table.slice(chunksize)
+            pending, rows = rest.to_batches(), rest.num_rows
+    if rows:
+        yield arrow_to_frame(pa.Table.from_batches(pending), text, start)
 
 def ensure_data_dir():
     d = ROOT / "data"
     d.mkdir(parents=True, exist_ok=True)
     return d
+
+
+def split_csv_byte_ranges(path, n_parts: int):
+    """
+    Split a CSV into up to `n_parts` byte ranges that start and end on line boundaries.
+
+    Returns (header_bytes, [(start, end), ...]) where the ranges cover every
+    data row exactly once, in file order. Assumes no quoted field contains a
+    newline (true for the retail extracts), so a line break always ends a row.
+    """
+    p = Path(path)
+    size = p.stat().st_size
+    with p.open("rb") as fh:
+        header = fh.readline()
+        data_start = fh.tell()
+        bounds = [data_start]
+        for i in range(1, max(1, n_parts)):
+            target = data_start + (size - data_start) * i // n_parts
+            if target <= bounds[-1]:
+                continue
+            fh.seek(target - 1)
+            fh.readline()  # finish the line that straddles the target
+            pos = fh.tell()
+            if bounds[-1] < pos < size:
+                bounds.append(pos)
+        bounds.append(size)
+    ranges = [(a, b) for a, b in zip(bounds, bounds[1:]) if b > a]
+    return header, ranges
+
+
+class ByteRangeReader(io.RawIOBase):
+    """Read-only file object over bytes [start, end) of a file, optionally prefixed (e.g. with the CSV header)."""
+
+    def __init__(self, path, start: int, end: int, prefix: bytes = b""):
+        self._fh = open(path, "rb")
+        self._fh.seek(start)
+        self._remaining = end - start
+        self._prefix = prefix
+
+    def readable(self):
+        return True
+
+    def readinto(self, buf):
+        n = 0
+        if self._prefix:
+            n = min(len(buf), len(self._prefix))
+            buf[:n] = self._prefix[:n]
+            self._prefix = self._prefix[n:]
+            return n
+        want = min(len(buf), self._remaining)
+        if want <= 0:
+            return 0
+        data = self._fh.read(want)
+        n = len(data)
+        buf[:n] = data
+        self._remaining -= n
+        return n
+
+    def close(self):
+        self._fh.close()
+        super().close()
+
+
+def open_csv_byte_range(path, start: int, end: int, header: bytes):
+    """Buffered reader for one partition from split_csv_byte_ranges, with the header replayed first."""
+    return io.BufferedReader(ByteRangeReader(path, start, end, prefix=header))
@@ -8,14 +8,26 @@ Features:
     * required columns exist
     * required columns have no nulls
     * unique keys are unique
-    * simple data-type coercion checks (string, int, float, timestamp)
+    * simple data-type coercion checks (string, int, float, timestamp); timestamp
+      columns are parsed with their `validations:` format when one is configured
     * STRICT format checks:
         - Email: strict regex
         - Date: exact YYYY-MM-DD
         - Time: exact HH:MM:SS (24h)
 - Writes JSON report to validation_results/<csv_stem>_result.json
 - CLI:
-    python etl/validate.py path/to/file.csv [--no-save] [--raise-on-fail]
+    python etl/validate.py path/to/file.csv [--no-save] [--raise-on-fail] [--chunksize N] [--failure-budget N] [--workers N] [--unique-prefilter] [--no-key-index] [--emit-typed] [--no-cache] [--sample N [--seed S]]
+- --chunksize streams the file with bounded memory (same report); --failure-budget
+  stops once more than N values have failed; --workers validates column groups
+  in N processes; --unique-prefilter checks unique_keys through Bloom filters
+- unique_keys are also checked against earlier ingests recorded in
+  data/key_index.sqlite (skip with --no-key-index)
+- reports are cached by the content of the file and config
+  (validation_results/.cache/; bypass with --no-cache)
+- --sample N validates about N rows picked by seeking through the file and
+  reports estimated failure rates with 95% confidence intervals (etl/sampling.py)
+- --emit-typed also writes the coerced int/float columns and their null mask
+  to <csv_stem>.typed.parquet for clean_csv / transform (see etl/staging.py)
 """
 from pathlib import Path
 import argparse
@@ -27,8 +39,17 @@ import re
 from datetime import datetime
 
 REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+from etl.expectations import EMAIL_PATTERN, FLOAT_TYPES, INT_TYPES, ColumnView, TypeConvertible, Unique, build_plan, email_matches, run_plan
+from etl.key_index import KEY_INDEX_PATH, KeyIndex, file_digest
+from etl.result_cache import ResultCache
+from etl.sampling import CONFIDENCE, failure_estimate, read_sample
+from etl.staging import TypedStagingWriter, iter_staged, read_staged, staged_columns
 CONFIG_PATH = REPO_ROOT / "configs" / "ingestion_config.yml"
 VALIDATION_DIR = REPO_ROOT / "validation_results"
+# rows per chunk for run_validation, which may see arbitrarily large staged files
+DEFAULT_CHUNKSIZE = 200_000
 
 
 class ValidationError(Exception):
@@ -63,7 +84,7 @@ def load_config():
 # --- Strict format check helpers ---
 
 # Email regex: conservative but strict - allows common emails and rejects obvious bad ones.
-_EMAIL_RE = re.compile(r"^[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}$")
+_EMAIL_RE = re.compile(rf"^{EMAIL_PATTERN}$")
 
 def validate_email_strict(value: str) -> bool:
     """Return True if value matches strict email pattern."""
@@ -110,56 +131,36 @@ def validate_time_strict(value: str, fmt: str = "%H:%M:%S") -> bool:
         return False
 
 
+def validate_email_series(ser):
+    """
+    validate_email_strict over a whole column in one vectorized regex pass.
+
+    Values are stripped and full-matched against EMAIL_PATTERN; for
+    Arrow-backed strings both run as Arrow kernels. Missing values are invalid.
+    """
+    import pandas as pd
+    return pd.Series(email_matches(ColumnView(ser).stripped), index=ser.index)
+
+
 # --- Type coercion helper used previously ---
 def _coerce_and_check_series(df_col, desired_type):
     """
     Try to coerce a pandas Series to desired_type.
     Return dict with keys: success (bool), failed_count (int), sample_values (list)
     """
-    import pandas as pd
     res = {"success": True, "failed_count": 0, "sample_values": []}
-    ser = df_col
-    if desired_type in ("string", "str", "object"):
-        return res
-    if desired_type in ("int", "integer"):
-        coerced = pd.to_numeric(ser, errors="coerce")
-        failed_mask = coerced.isna() & ser.notna() & (ser.str.strip() != "")
-        failed = ser[failed_mask]
-        res["failed_count"] = int(failed.shape[0])
-        res["sample_values"] = failed.head(10).astype(str).tolist()
-        res["success"] = res["failed_count"] == 0
-        return res
-    if desired_type in ("float", "numeric", "number"):
-        coerced = pd.to_numeric(ser, errors="coerce")
-        failed_mask = coerced.isna() & ser.notna() & (ser.str.strip() != "")
-        failed = ser[failed_mask]
-        res["failed_count"] = int(failed.shape[0])
-        res["sample_values"] = failed.head(10).astype(str).tolist()
-        res["success"] = res["failed_count"] == 0
-        return res
-    if desired_type in ("timestamp", "datetime", "date"):
-        coerced = None
-        try:
-            coerced = pd.to_datetime(ser, errors="coerce")
-        except Exception:
-            # fallback: mark as all failed if parsing raises
-            failed_mask = ser.notna() & (ser.str.strip() != "")
-            failed = ser[failed_mask]
-            res["failed_count"] = int(failed.shape[0])
-            res["sample_values"] = failed.head(10).astype(str).tolist()
-            res["success"] = False
-            return res
-        failed_mask = coerced.isna() & ser.notna() & (ser.str.strip() != "")
-        failed = ser[failed_mask]
-        res["failed_count"] = int(failed.shape[0])
-        res["sample_values"] = failed.head(10).astype(str).tolist()
-        res["success"] = res["failed_count"] == 0
+    view = ColumnView(df_col)
+    failed = TypeConvertible(df_col.name, 0, desired_type).failed_mask(view)
+    if failed is None:
         return res
+    res["failed_count"] = int(failed.sum())
+    res["sample_values"] = view.samples(failed)
+    res["success"] = res["failed_count"] == 0
     return res
 
 
 # --- Main validator ---
-def validate_csv(csv_path: str, save_result: bool = True):
+def validate_csv(csv_path: str, save_result: bool = True, chunksize: int = None, failure_budget: int = None, workers: int = 1, unique_prefilter: bool = False, key_index_path=KEY_INDEX_PATH, emit_typed: bool = False, use_cache: bool = False, sample: int = None, seed: int = 0):
     """
     Run validations and return a result dict:
       {
@@ -168,129 +169,90 @@ def validate_csv(csv_path: str, save_result: bool = True):
         results: [ ... failing expectations ... ],
         meta: {csv: ..., config: ...}
       }
-    """
-    import pandas as pd
 
+    With `chunksize`, the file is streamed that many rows at a time and the
+    report is the same as for a whole-file read. With `failure_budget`,
+    validation stops once more values than that have failed; the report then
+    covers the rows read so far and meta.stopped_early is set. With
+    `workers` > 1, column groups are validated in that many processes.
+    `unique_prefilter` checks unique_keys with Bloom filters and a second
+    pass over just the possibly repeated rows (same result, less disk).
+    When the key index at `key_index_path` exists (see etl/key_index.py),
+    unique keys are also checked against the values ingested from other
+    files; pass None to skip that. `emit_typed` writes the typed artifact
+    (etl/staging.py) from the values the type checks coerced; it is only
+    kept when the whole file was read. With `use_cache`, the report of an
+    unchanged file and config is returned from etl/result_cache.py
+    (meta.cached is then set).
+
+    With `sample`, only about that many rows (stratified by byte offset,
+    drawn with `seed`) of the CSV are read and validated. The report has the
+    same shape; counts are sample counts, each failing per-row expectation
+    adds its estimated failure rate and confidence interval, and
+    meta.sample lists the estimates of every such expectation. Duplicates
+    found in a sample are reported but not extrapolated.
+    """
     csv_p = Path(csv_path)
     if not csv_p.exists():
         raise FileNotFoundError(csv_p)
+    if sample and emit_typed:
+        raise ValueError("emit_typed needs a full validation run, not a sample")
+
+    cache = ResultCache() if use_cache else None
+    if cache is not None:
+        cache_key = cache.key(csv_p, CONFIG_PATH, failure_budget=failure_budget, key_index=_file_stamp(key_index_path), sample=sample, seed=seed)
+        # the typed artifact is a side effect a cached report would skip
+        cached = None if emit_typed else cache.get(cache_key)
+        if cached is not None:
+            cached["meta"].update(csv=str(csv_p), cached=True)
+            if save_result:
+                _save_result(csv_p, cached)
+            return cached
 
     cfg = load_config()
     col_types = cfg["col_types"]
     required = cfg["required"]
     unique_keys = cfg["unique_keys"]
-    validations_cfg = cfg.get("validations", {})
-
-    # read all as strings (safe)
-    df = pd.read_csv(csv_p, dtype=str)
-    total_rows = int(df.shape[0])
-
-    failing = []
-
-    # 1) required columns exist
-    for col in required:
-        if col not in df.columns:
-            failing.append({
-                "expectation": "expect_column_to_exist",
-                "column": col,
-                "success": False,
-                "reason": "column missing"
-            })
-
-    # 2) required columns not null (empty string or NaN)
-    present_required = [c for c in required if c in df.columns]
-    for col in present_required:
-        missing_mask = df[col].isna() | df[col].str.strip().eq("")
-        missing_count = int(missing_mask.sum())
-        if missing_count > 0:
-            failing.append({
-                "expectation": "expect_column_values_to_not_be_null",
-                "column": col,
-                "success": False,
-                "result": {"unexpected_count": missing_count, "sample_unexpected_values": df.loc[missing_mask, col].head(10).astype(str).tolist()}
-            })
-
-    # 3) unique keys
-    for key in unique_keys:
-        if key not in df.columns:
-            failing.append({
-                "expectation": "expect_column_to_exist",
-                "column": key,
-                "success": False,
-                "reason": "column missing (for uniqueness check)"
-            })
-            continue
-        dup_mask = df[key].duplicated(keep=False)
-        dup_count = int(dup_mask.sum())
-        if dup_count > 0:
-            dup_values = df.loc[dup_mask, key].unique().tolist()[:20]
-            failing.append({
-                "expectation": "expect_column_values_to_be_unique",
-                "column": key,
-                "success": False,
-                "result": {"duplicate_count": dup_count, "sample_duplicate_values": dup_values}
-            })
-
-    # 4) type coercion checks for columns declared in config
-    for col, desired_type in col_types.items():
-        if col not in df.columns:
-            continue
-        check = _coerce_and_check_series(df[col], desired_type)
-        if not check["success"]:
-            failing.append({
-                "expectation": "expect_column_type_convertible",
-                "column": col,
-                "success": False,
-                "result": {"desired_type": desired_type, "failed_count": check["failed_count"], "sample_bad_values": check["sample_values"]}
-            })
-
-    # 5) STRICT format checks for Email, Date, Time
-    # We run strict checks IF the column exists. Also allow overrides via validations_cfg.
-    # validations_cfg can specify custom formats like: {"Date": "%d/%m/%Y", "Time": "%H:%M"}
-    # For Email, specify "email".
-    # For Date and Time, provide strptime format string.
-    # If not provided, use defaults: Email -> strict regex, Date -> "%Y-%m-%d", Time -> "%H:%M:%S"
-
-    # EMAIL
-    if "Email" in df.columns:
-        invalid_mask = df["Email"].isna() | df["Email"].str.strip().eq("") | ~df["Email"].apply(lambda v: validate_email_strict(v))
-        invalid_count = int(invalid_mask.sum())
-        if invalid_count > 0:
-            failing.append({
-                "expectation": "expect_column_values_to_match_strict_email",
-                "column": "Email",
-                "success": False,
-                "result": {"invalid_count": invalid_count, "sample_invalid_values": df.loc[invalid_mask, "Email"].head(10).astype(str).tolist()}
-            })
-
-    # DATE
-    if "Date" in df.columns:
-        date_fmt = validations_cfg.get("Date", "%Y-%m-%d")
-        # Use validate_date_strict with the given format
-        invalid_mask = df["Date"].isna() | df["Date"].str.strip().eq("") | ~df["Date"].apply(lambda v: validate_date_strict(v, fmt=date_fmt))
-        invalid_count = int(invalid_mask.sum())
-        if invalid_count > 0:
-            failing.append({
-                "expectation": "expect_column_values_to_match_strict_date",
-                "column": "Date",
-                "success": False,
-                "result": {"invalid_count": invalid_count, "sample_invalid_values": df.loc[invalid_mask, "Date"].head(10).astype(str).tolist(), "expected_format": date_fmt}
-            })
-
-    # TIME
-    if "Time" in df.columns:
-        time_fmt = validations_cfg.get("Time", "%H:%M:%S")
-        invalid_mask = df["Time"].isna() | df["Time"].str.strip().eq("") | ~df["Time"].apply(lambda v: validate_time_strict(v, fmt=time_fmt))
-        invalid_count = int(invalid_mask.sum())
-        if invalid_count > 0:
-            failing.append({
-                "expectation": "expect_column_values_to_match_strict_time",
-                "column": "Time",
-                "success": False,
-                "result": {"invalid_count": invalid_count, "sample_invalid_values": df.loc[invalid_mask, "Time"].head(10).astype(str).tolist(), "expected_format": time_fmt}
-            })
+
+    # read all as strings (safe); only the columns some check looks at, which
+    # with a fresh Parquet staging file (etl/staging.py) skips the others entirely
+    # (the typed artifact needs every column)
+    needed = None if emit_typed else set(required) | set(unique_keys) | set(col_types) | {"Email", "Date", "Time"}
+    estimated_rows = None
+    if sample:
+        sampled, estimated_rows = read_sample(csv_p, sample, seed)
+        frames = [sampled]
+        unique_prefilter = False  # its second pass would read the whole file
+    elif chunksize:
+        frames = iter_staged(csv_p, chunksize, text=True, columns=needed)
+    else:
+        frames = [read_staged(csv_p, text=True, columns=needed)]
+
+    # every expectation is planned up front and evaluated in one pass per
+    # column, sharing the stripped text and blank mask (see etl/expectations.py)
+    def key_source(col):
+        return (df[col] for df in iter_staged(csv_p, chunksize or DEFAULT_CHUNKSIZE, text=True, columns=[col]))
+
+    columns = staged_columns(csv_p)
+    key_index = load_id = typed_writer = None
+    if unique_keys and key_index_path is not None and Path(key_index_path).exists():
+        key_index, load_id = KeyIndex(key_index_path), file_digest(csv_p)
+    if emit_typed:
+        typed_writer = TypedStagingWriter(csv_p, [c for c, t in col_types.items() if c in columns and t in INT_TYPES + FLOAT_TYPES])
+    try:
+        plan = build_plan(cfg, columns, unique_prefilter=unique_prefilter, source=key_source, key_index=key_index, load_id=load_id)
+        failing = run_plan(frames, plan, failure_budget=failure_budget, workers=workers, sink=typed_writer)
+    except Exception:
+        if typed_writer is not None:
+            typed_writer.close(publish=False)
+        raise
+    finally:
+        if key_index is not None:
+            key_index.close()
+    total_rows = plan.rows
 
     total_expectations = len(required) + len(unique_keys) + len(col_types) + 3  # +3 for strict checks (Email,Date,Time)
+    total_expectations += plan.history_checks
     unsuccessful = len(failing)
     successful = max(0, total_expectations - unsuccessful)
 
@@ -308,24 +270,84 @@ def validate_csv(csv_path: str, save_result: bool = True):
             "config_path": str(CONFIG_PATH)
         }
     }
-
+    if sample:
+        _add_sample_estimates(result, plan, sample, seed, estimated_rows)
+    if plan.timestamp_checks:
+        # timestamp type checks without a format in `validations:` (slower format inference)
+        result["statistics"]["timestamp_format_fallbacks"] = sum(exp.inferred for exp in plan.timestamp_checks)
+    if plan.stopped_early:
+        result["meta"]["stopped_early"] = True
+        result["meta"]["failure_budget"] = failure_budget
+    if typed_writer is not None:
+        typed_writer.close(publish=not plan.stopped_early)
+        if not plan.stopped_early:
+            result["meta"]["typed_artifact"] = str(typed_writer.dest)
+
+    if cache is not None:
+        cache.put(cache_key, result)
     if save_result:
-        VALIDATION_DIR.mkdir(parents=True, exist_ok=True)
-        out_file = VALIDATION_DIR / f"{csv_p.stem}_result.json"
-        with out_file.open("w", encoding="utf-8") as fo:
-            json.dump(result, fo, indent=2, default=str)
+        _save_result(csv_p, result)
 
     return result
 
 
+def _add_sample_estimates(result: dict, plan, sample: int, seed: int, estimated_rows: int):
+    estimates = []
+    for exp in plan.expectations:
+        if not isinstance(exp, Unique):
+            estimates.append({"expectation": exp.name, "column": exp.column, **failure_estimate(exp.count, plan.rows)})
+    by_check = {(e["expectation"], e["column"]): e for e in estimates}
+    for failure in result["results"]:
+        estimate = by_check.get((failure["expectation"], failure.get("column")))
+        if estimate is not None:
+            failure["result"].update(estimated_failure_rate=estimate["estimated_failure_rate"], confidence_interval=estimate["confidence_interval"])
+    result["statistics"]["estimated_total_rows"] = estimated_rows
+    result["meta"]["sample"] = {"requested_rows": sample, "seed": seed, "confidence": CONFIDENCE, "estimates": estimates}
+
+
+def _save_result(csv_p: Path, result: dict):
+    VALIDATION_DIR.mkdir(parents=True, exist_ok=True)
+    out_file = VALIDATION_DIR / f"{csv_p.stem}_result.json"
+    with out_file.open("w", encoding="utf-8") as fo:
+        json.dump(result, fo, indent=2, default=str)
+
+
+def _file_stamp(path):
+    """(size, mtime_ns) of an optional file, None when it is not used or absent."""
+    if path is None or not Path(path).exists():
+        return None
+    st = Path(path).stat()
+    return (st.st_size, st.st_mtime_ns)
+
+
+def run_validation(csv_path: str, chunksize: int = DEFAULT_CHUNKSIZE, failure_budget: int = None, workers: int = 1, unique_prefilter: bool = False, emit_typed: bool = False, use_cache: bool = True, save_result: bool = True) -> bool:
+    """
+    Validate a staged file chunk by chunk (or reuse the cached report of an
+    unchanged one), save and print the report, and return whether it
+    passed. Used by ingest.py --validate and the admin service's /validate
+    endpoint.
+    """
+    res = validate_csv(csv_path, save_result=save_result, chunksize=chunksize, failure_budget=failure_budget, workers=workers, unique_prefilter=unique_prefilter, emit_typed=emit_typed, use_cache=use_cache)
+    print_summary(res)
+    return bool(res.get("success", False))
+
+
 def print_summary(result: dict):
     print("\nValidation summary:")
     print(f"  success: {result.get('success')}")
+    if (result.get("meta") or {}).get("cached"):
+        print("  (cached report: file and config unchanged)")
     stats = result.get("statistics", {}) or {}
     print(f"  evaluated_expectations: {stats.get('evaluated_expectations')}")
     print(f"  successful_expectations: {stats.get('successful_expectations')}")
     print(f"  unsuccessful_expectations: {stats.get('unsuccessful_expectations')}")
     print(f"  rows: {stats.get('rows')}")
+    if stats.get("timestamp_format_fallbacks"):
+        print(f"  timestamp checks without a configured format: {stats['timestamp_format_fallbacks']}")
+    if (result.get("meta") or {}).get("sample"):
+        print(f"  sampled rows of ~{stats.get('estimated_total_rows')}; counts are sample counts, see meta.sample for failure-rate estimates")
+    if (result.get("meta") or {}).get("stopped_early"):
+        print(f"  stopped early: more than {result['meta']['failure_budget']} failing values")
     failing = result.get("results", []) or []
     if failing:
         print("\nFailing expectations (up to 10):")
@@ -343,10 +365,19 @@ def _cli():
     parser.add_argument("csv", help="Path to CSV file to validate")
     parser.add_argument("--no-save", action="store_true", help="Do not save JSON report")
     parser.add_argument("--raise-on-fail", action="store_true", help="Raise ValidationError (exit non-zero) when validation fails")
+    parser.add_argument("--chunksize", type=int, default=None, help="Stream the file this many rows at a time")
+    parser.add_argument("--failure-budget", type=int, default=None, help="Stop once more than this many values have failed")
+    parser.add_argument("--workers", type=int, default=1, help="Validate column groups in this many processes")
+    parser.add_argument("--unique-prefilter", action="store_true", help="Check unique_keys with a Bloom-filter prefilter and a second pass over candidates")
+    parser.add_argument("--no-key-index", action="store_true", help="Do not check unique_keys against previously ingested files")
+    parser.add_argument("--emit-typed", action="store_true", help="Write the coerced columns to <csv_stem>.typed.parquet for later stages")
+    parser.add_argument("--no-cache", action="store_true", help="Always re-validate instead of reusing the cached report")
+    parser.add_argument("--sample", type=int, default=None, help="Validate about this many rows sampled across the file and estimate failure rates")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed for --sample")
     args = parser.parse_args()
 
     try:
-        res = validate_csv(args.csv, save_result=not args.no_save)
+        res = validate_csv(args.csv, save_result=not args.no_save, chunksize=args.chunksize, failure_budget=args.failure_budget, workers=args.workers, unique_prefilter=args.unique_prefilter, key_index_path=None if args.no_key_index else KEY_INDEX_PATH, emit_typed=args.emit_typed, use_cache=not args.no_cache, sample=args.sample, seed=args.seed)
         print_summary(res)
         if (not res.get("success", False)) and args.raise_on_fail:
             raise ValidationError("Validation failed; use validation_results/ for details.")
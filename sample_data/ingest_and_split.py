@@ -1,5 +1,9 @@
-import pandas as pd
 import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from etl.utils import read_csv
 
 # --- CONFIGURATION ---
 INPUT_FILE = "retail_data_delta.csv"  # Your file name
@@ -24,7 +28,7 @@ column_names = [
 ]
 
 # NOTE: Adjust 'names' if your CSV actually has a header row
-df = pd.read_csv(INPUT_FILE, names=column_names, low_memory=False)
+df = read_csv(INPUT_FILE, names=column_names)
 
 print("Data loaded. Splitting into entities...")
 
@@ -1,11 +1,21 @@
 -- SQL: create_tables_postgres.sql
 -- Wide "raw" transactions table that mirrors your CSV columns.
 -- Adapt types if you prefer tighter typing.
+--
+-- raw_transactions is range partitioned on the transaction date, one
+-- partition per month (raw_transactions_pYYYY_MM). etl/load_to_postgres.py
+-- creates the partitions a file needs before loading it and COPYs straight
+-- into them; rows without a date go to raw_transactions_default. Queries
+-- bounded on date only scan the matching months, and old months can be
+-- detached or archived (load_to_postgres.py --detach-before). A
+-- raw_transactions created before partitioning stays a plain table and is
+-- loaded as before; to convert it, rename it, rerun this file and reload
+-- the history.
 
 CREATE EXTENSION IF NOT EXISTS "uuid-ossp";
 
 CREATE TABLE IF NOT EXISTS raw_transactions (
-    id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),   -- internal surrogate id
+    id UUID NOT NULL DEFAULT uuid_generate_v4(),   -- internal surrogate id
     transaction_id TEXT,
     customer_id TEXT,
     name TEXT,
@@ -35,10 +45,25 @@ CREATE TABLE IF NOT EXISTS raw_transactions (
     order_status TEXT,
     ratings NUMERIC,
     products TEXT,
-    created_at TIMESTAMP DEFAULT now()
-);
+    created_at TIMESTAMP DEFAULT now(),
+    -- unique keys of a partitioned table must include the partition key
+    UNIQUE (id, date)
+) PARTITION BY RANGE (date);
+
+DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = 'raw_transactions'::regclass) THEN
+        CREATE TABLE IF NOT EXISTS raw_transactions_default PARTITION OF raw_transactions DEFAULT;
+    END IF;
+END $$;
 
 -- Optional index examples to speed common queries
 CREATE INDEX IF NOT EXISTS idx_raw_transactions_transaction_id ON raw_transactions(transaction_id);
 CREATE INDEX IF NOT EXISTS idx_raw_transactions_customer_id ON raw_transactions(customer_id);
 CREATE INDEX IF NOT EXISTS idx_raw_transactions_date ON raw_transactions(date);
+-- etl/load_to_postgres.py --upsert adds a UNIQUE index on transaction_id
+-- (ux_raw_transactions_transaction_id) for its ON CONFLICT merge; on the
+-- partitioned table it is on (transaction_id, date) NULLS NOT DISTINCT, and
+-- the raw_transaction_keys table (transaction_id PRIMARY KEY -> date) keeps
+-- transaction_id unique across months; once it exists, further files are
+-- loaded with --upsert only.
@@ -0,0 +1,141 @@
+import csv
+from pathlib import Path
+import pandas as pd
+import pytest
+from etl.bad_records import clean_csv
+from etl.clean_csv import clean_frame, strip_whitespace
+from etl.cleaning_rules import compile_rules
+
+SAMPLE = Path(__file__).resolve().parents[1] / "sample_data" / "retail_data_Source.csv"
+
+
+def _dirty_sample(path: Path, n_rows: int = 400):
+    with SAMPLE.open(newline="") as fh:
+        rows = [r for _, r in zip(range(n_rows + 1), csv.reader(fh))]
+    amount = rows[0].index("Amount")
+    for i, row in enumerate(rows[1:]):
+        if i % 7 == 0:
+            row[amount] = " "
+    with path.open("w", newline="") as fh:
+        csv.writer(fh).writerows(rows)
+
+
+def test_chunked_clean_matches_in_memory(tmp_path):
+    src = tmp_path / "in.csv"
+    _dirty_sample(src)
+
+    full = clean_csv(src, out_path=tmp_path / "full.csv", bad_records_out=tmp_path / "full_bad.csv", drop_missing=True)
+    chunked = clean_csv(src, out_path=tmp_path / "chunked.csv", bad_records_out=tmp_path / "chunked_bad.csv", drop_missing=True, chunksize=37)
+
+    assert full["dropped_rows"] == 58
+    assert chunked == full
+    assert (tmp_path / "chunked.csv").read_text() == (tmp_path / "full.csv").read_text()
+    assert (tmp_path / "chunked_bad.csv").read_text() == (tmp_path / "full_bad.csv").read_text()
+
+
+def test_integer_columns_keep_their_rendering_across_chunks(tmp_path):
+    src = tmp_path / "in.csv"
+    with SAMPLE.open(newline="") as fh:
+        rows = [r for _, r in zip(range(41), csv.reader(fh))]
+    with src.open("w", newline="") as fh:
+        csv.writer(fh).writerows(rows)
+
+    clean_csv(src, out_path=tmp_path / "full.csv")
+    assert pd.read_csv(tmp_path / "full.csv", dtype=str)["Ratings"].iloc[0] == "2"
+
+    rows[30][rows[0].index("Ratings")] = ""
+    with src.open("w", newline="") as fh:
+        csv.writer(fh).writerows(rows)
+    clean_csv(src, out_path=tmp_path / "full.csv")
+    clean_csv(src, out_path=tmp_path / "chunked.csv", chunksize=10)
+    assert pd.read_csv(tmp_path / "full.csv", dtype=str)["Ratings"].iloc[0] == "2.0"
+    assert (tmp_path / "chunked.csv").read_text() == (tmp_path / "full.csv").read_text()
+
+
+def test_parallel_clean_preserves_row_order(tmp_path):
+    src = tmp_path / "in.csv"
+    _dirty_sample(src)
+
+    serial = clean_csv(src, out_path=tmp_path / "serial.csv", bad_records_out=tmp_path / "serial_bad.csv", drop_missing=True)
+    parallel = clean_csv(src, out_path=tmp_path / "parallel.csv", bad_records_out=tmp_path / "parallel_bad.csv", drop_missing=True, workers=3)
+
+    assert parallel == serial
+    assert (tmp_path / "parallel.csv").read_text() == (tmp_path / "serial.csv").read_text()
+    assert (tmp_path / "parallel_bad.csv").read_text() == (tmp_path / "serial_bad.csv").read_text()
+
+
+def test_strip_whitespace_only_touches_string_columns():
+    df = pd.DataFrame({
+        "Name": pd.Series([" Ann ", None, "Bob\t"], dtype=str),
+        "Amount": pd.Series([" 1.5 ", "2", None], dtype=str),
+        "Mixed": [" x ", 3, None],
+        "Count": [1, 2, 3],
+    })
+    out = strip_whitespace(df, skip={"Amount"})
+
+    assert out["Name"].tolist()[0] == "Ann" and out["Name"].tolist()[2] == "Bob"
+    assert out["Amount"].tolist()[0] == " 1.5 "
+    assert out["Mixed"].tolist()[:2] == ["x", 3]
+    assert out["Count"].tolist() == [1, 2, 3]
+    assert df["Name"].tolist()[0] == " Ann "
+
+
+def test_rejected_rows_are_written_stripped():
+    df = pd.DataFrame({
+        "Email": pd.Series([None, "a@b.c"], dtype=str),
+        "Amount": pd.Series([" Nan ", " 2 "], dtype=str),
+        "Name": pd.Series(["  x  ", "y"], dtype=str),
+    })
+    cleaned, bad, _ = clean_frame(df, drop_missing=True)
+
+    assert bad["Amount"].tolist() == ["Nan"] and bad["Name"].tolist() == ["x"]
+    assert cleaned["Amount"].tolist() == [2.0]
+
+
+def test_missing_flags_shared_by_fill_drop_and_summary():
+    df = pd.DataFrame({
+        "Transaction_ID": ["t1", None, " ", "NaN"],
+        "Customer_ID": ["c1", "", "Nan", "c4"],
+        "Email": ["a@b.com", "nan", None, "x@y.org"],
+        "Amount": ["1", " 2 ", "NAN", None],
+    }, dtype=str)
+
+    cleaned, bad_rows, summary = clean_frame(df, drop_missing=True)
+    assert bad_rows.index.tolist() == [1, 2, 3]
+    assert summary["final_rows"] == 1 and summary["dropped_rows"] == 3
+
+    cleaned, bad_rows, summary = clean_frame(df, fill_defaults=True)
+    assert cleaned["Customer_ID"].tolist() == ["c1", "unknown", "unknown", "c4"]
+    assert cleaned["Email"].tolist() == ["a@b.com", "unknown@example.com", "unknown@example.com", "x@y.org"]
+    assert summary["missing_transaction_ids_after"] == 0 and summary["missing_emails_after"] == 0
+
+    _, _, summary = clean_frame(df)
+    assert summary["missing_transaction_ids_after"] == 2
+    assert summary["missing_customer_ids_after"] == 1
+    assert summary["missing_emails_after"] == 1
+
+
+def test_cleaning_rules_drive_clean_frame():
+    plan = compile_rules({"columns": {
+        "When": {"parse_date": ["%d.%m.%Y"]},
+        "Customer_ID": {"default": "n/a", "required": True},
+        "Score": {"numeric": True},
+        "Ignored": {"numeric": True},
+    }}, col_types={"Score": "float"})
+    assert [r.column for r in plan.present(["When", "Score", "Customer_ID"])] == ["When", "Customer_ID", "Score"]
+    assert plan.strip_skip == {"Score"}
+
+    df = pd.DataFrame({"When": ["31.12.2023", "bad"], "Customer_ID": ["c1", " "], "Score": [" 4 ", "x"], "Amount": ["", "1"]}, dtype=str)
+    cleaned, _, summary = clean_frame(df, fill_defaults=True, plan=plan)
+    assert cleaned["When"].tolist() == ["2023-12-31", "bad"]
+    assert cleaned["Customer_ID"].tolist() == ["c1", "n/a"]
+    assert cleaned["Score"].tolist()[0] == 4.0 and pd.isna(cleaned["Score"].tolist()[1])
+    assert cleaned["Amount"].tolist()[0] == ""  # no rule: not coerced, not required
+
+    _, bad_rows, _ = clean_frame(df, drop_missing=True, plan=plan)
+    assert bad_rows.index.tolist() == [1]
+
+    overridden = compile_rules({"columns": {"When": {"parse_date": ["%d.%m.%Y"]}}}, date_formats=["%Y"])
+    assert overridden.rules[0].parse_formats == ("%Y",)
+    with pytest.raises(ValueError):
+        compile_rules({"columns": {"Amount": {"nullable": True}}})
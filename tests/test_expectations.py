@@ -0,0 +1,91 @@
+import json
+import pandas as pd
+import pytest
+from etl.expectations import build_plan, run_plan
+
+CFG = {
+    "col_types": {"Transaction_ID": "string", "Amount": "float", "Email": "string", "Date": "string"},
+    "required": ["Transaction_ID", "Customer_ID", "Amount"],
+    "unique_keys": ["Transaction_ID", "Order_ID"],
+    "validations": {"Date": "%m/%d/%Y"},
+}
+
+
+def test_plan_reports_failures_in_validate_order():
+    df = pd.DataFrame({
+        "Transaction_ID": ["t1", "t1", " "],
+        "Amount": ["1.5", "x", ""],
+        "Email": ["a@b.com", "bad", None],
+        "Date": ["12/31/2023", "2023-12-31", "02/30/2023"],
+    }, dtype=str)
+    plan = build_plan(CFG, df.columns)
+    assert plan.columns == ["Transaction_ID", "Amount", "Email", "Date"]
+
+    failing = run_plan(df, plan)
+    assert [(f["expectation"], f["column"]) for f in failing] == [
+        ("expect_column_to_exist", "Customer_ID"),
+        ("expect_column_values_to_not_be_null", "Transaction_ID"),
+        ("expect_column_values_to_not_be_null", "Amount"),
+        ("expect_column_values_to_be_unique", "Transaction_ID"),
+        ("expect_column_to_exist", "Order_ID"),
+        ("expect_column_type_convertible", "Amount"),
+        ("expect_column_values_to_match_strict_email", "Email"),
+        ("expect_column_values_to_match_strict_date", "Date"),
+    ]
+    assert failing[5]["result"] == {"desired_type": "float", "failed_count": 1, "sample_bad_values": ["x"]}
+    assert failing[6]["result"]["invalid_count"] == 2
+    assert failing[7]["result"]["sample_invalid_values"] == ["2023-12-31", "02/30/2023"]
+
+
+def test_chunked_run_matches_whole_frame_and_spills_uniqueness():
+    n = 500
+    df = pd.DataFrame({
+        "Transaction_ID": [f"t{i % 180}" if i % 3 else f"u{i}" for i in range(n)],
+        "Customer_ID": ["c" if i % 11 else "" for i in range(n)],
+        "Amount": [str(i) if i % 13 else "x" for i in range(n)],
+    }, dtype=str)
+    cfg = dict(CFG, unique_keys=["Transaction_ID"])
+
+    whole = run_plan(df, build_plan(cfg, df.columns))
+    plan = build_plan(cfg, df.columns)
+    plan.by_column["Transaction_ID"][-1].counter.spill_rows = 64
+    chunked = run_plan((df.iloc[i:i + 37] for i in range(0, n, 37)), plan)
+    assert chunked == whole
+    assert plan.rows == n
+
+    plan = build_plan(cfg, df.columns)
+    run_plan((df.iloc[i:i + 50] for i in range(0, n, 50)), plan, failure_budget=5)
+    assert plan.stopped_early and plan.rows == 50
+
+
+def test_pooled_run_matches_serial():
+    pytest.importorskip("pyarrow")
+    df = pd.DataFrame({
+        "Transaction_ID": ["t1", "t1", " ", "t4"] * 50,
+        "Amount": ["1.5", "x", "", "2"] * 50,
+        "Email": ["a@b.com", "bad", None, "c@d.org"] * 50,
+        "Date": ["12/31/2023", "2023-12-31", "02/30/2023", "01/01/2024"] * 50,
+    }, dtype=str)
+    serial = run_plan(df, build_plan(CFG, df.columns))
+    pooled = run_plan((df.iloc[i:i + 64] for i in range(0, len(df), 64)), build_plan(CFG, df.columns), workers=2)
+    # samples hold NaN, which only compares equal as the same object
+    assert json.dumps(pooled) == json.dumps(serial)
+
+
+def test_timestamp_type_checks_use_the_configured_format():
+    cfg = {
+        "col_types": {"Date": "timestamp", "Shipped": "datetime"},
+        "required": [],
+        "unique_keys": [],
+        "validations": {"Date": "%m/%d/%Y", "Email": "email"},
+    }
+    df = pd.DataFrame({
+        "Date": ["12/31/2023", "2023-12-31", " 1/2/2024 ", "", "02/30/2023"],
+        "Shipped": ["2024-01-01", "2024-01-02", "soon", None, "2024-01-05"],
+    }, dtype=str)
+    plan = build_plan(cfg, df.columns)
+    assert [(exp.column, exp.fmt, exp.inferred) for exp in plan.timestamp_checks] == [("Date", "%m/%d/%Y", False), ("Shipped", None, True)]
+
+    failing = {f["column"]: f["result"] for f in run_plan(df, plan) if f["expectation"] == "expect_column_type_convertible"}
+    assert failing["Date"] == {"desired_type": "timestamp", "failed_count": 2, "sample_bad_values": ["2023-12-31", "02/30/2023"], "expected_format": "%m/%d/%Y"}
+    assert failing["Shipped"]["sample_bad_values"] == ["soon"]
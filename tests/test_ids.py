@@ -0,0 +1,21 @@
+import uuid
+import pandas as pd
+from etl.ids import bulk_uuid4, content_uuids
+
+
+def test_bulk_uuid4_are_valid_and_distinct():
+    ids = bulk_uuid4(1000)
+    assert len(set(ids)) == 1000
+    for s in ids[:50]:
+        u = uuid.UUID(s)
+        assert u.version == 4 and str(u) == s
+
+
+def test_content_uuids_are_stable_per_row():
+    df = pd.DataFrame({"Customer_ID": ["1", "2", "1", None], "Amount": ["5", "5", "5", "7"]}, dtype=str)
+    ids = content_uuids(df)
+
+    assert (content_uuids(df.copy()) == ids).all()
+    assert ids[0] == ids[2] and len(set(ids)) == 3
+    assert content_uuids(df.iloc[[3]])[0] == ids[3]
+    assert uuid.UUID(ids[1]).version == 8
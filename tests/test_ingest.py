@@ -9,3 +9,19 @@ def test_copy_to_dest(tmp_path):
     out = copy_to_dest(str(src), dest)
     assert out.exists()
     assert out.read_text() == src.read_text()
+
+
+def test_unvalidated_ingest_does_not_touch_key_index(tmp_path, monkeypatch):
+    import sys
+    from etl import ingest, key_index, validate
+
+    src = tmp_path / "in.csv"
+    src.write_text("Transaction_ID,Amount\nt1,2\n")
+
+    opened = []
+    monkeypatch.setattr(validate, "load_config", lambda *args, **kwargs: {"unique_keys": ["Transaction_ID"]})
+    monkeypatch.setattr(key_index, "KeyIndex", lambda *args, **kwargs: opened.append(args))
+    monkeypatch.setattr(sys, "argv", ["ingest.py", str(src), "--dest", str(tmp_path / "staged.csv")])
+    ingest.main()
+    assert (tmp_path / "staged.csv").read_text() == src.read_text()
+    assert opened == []
@@ -0,0 +1,27 @@
+import pandas as pd
+from etl.expectations import build_plan, run_plan
+from etl.key_index import KeyIndex, file_digest
+
+CFG = {"col_types": {}, "required": [], "unique_keys": ["Transaction_ID"], "validations": {}}
+
+
+def test_delta_keys_are_checked_against_earlier_loads(tmp_path):
+    first, delta = tmp_path / "first.csv", tmp_path / "delta.csv"
+    pd.DataFrame({"Transaction_ID": ["t1", "t2", "t3"], "Amount": ["1", "2", "3"]}).to_csv(first, index=False)
+    pd.DataFrame({"Transaction_ID": ["t4", "t2", "t5"], "Amount": ["4", "5", "6"]}).to_csv(delta, index=False)
+
+    with KeyIndex(tmp_path / "keys.sqlite") as index:
+        assert index.add_file(first, ["Transaction_ID"]) == 3
+        assert index.add_file(first, ["Transaction_ID"]) == 0
+        assert index.probe("Transaction_ID", ["t2", "t9", None, "t3"]).tolist() == [True, False, False, True]
+
+        df = pd.read_csv(delta, dtype=str)
+        plan = build_plan(CFG, df.columns, key_index=index, load_id=file_digest(delta))
+        assert plan.history_checks == 1
+        failing = run_plan(df, plan)
+        assert [f["expectation"] for f in failing] == ["expect_column_values_to_not_exist_in_history"]
+        assert failing[0]["result"] == {"existing_count": 1, "sample_existing_values": ["t2"]}
+
+        # re-validating an ingested file does not report it against itself
+        df = pd.read_csv(first, dtype=str)
+        assert run_plan(df, build_plan(CFG, df.columns, key_index=index, load_id=file_digest(first))) == []
@@ -0,0 +1,327 @@
+import argparse
+import csv
+import io
+import uuid
+import pandas as pd
+import pytest
+from etl.load_to_postgres import ChunkStream, copy_chunks, table_mapping, typed_frame
+
+
+@pytest.fixture
+def pg():
+    """(connection, params) on a throwaway schema of the Postgres from docker-compose.yml (PG* env vars); skipped without one."""
+    from etl import load_to_postgres as lp
+
+    if lp.psycopg2 is None:
+        pytest.skip("psycopg2 is not installed")
+    params = lp.conn_params(argparse.Namespace(host=None, port=None, dbname=None, user=None, password=None))
+    try:
+        admin = lp.connect({**params, "connect_timeout": 3})
+    except lp.psycopg2.OperationalError:
+        pytest.skip("Postgres is not available")
+    admin.autocommit = True
+    schema = f"etl_test_{uuid.uuid4().hex[:8]}"
+    with admin.cursor() as cur:
+        cur.execute(f"CREATE SCHEMA {schema}")
+    params = {**params, "options": f"-c search_path={schema},public"}
+    conn = lp.connect(params)
+    try:
+        yield conn, params
+    finally:
+        conn.close()
+        with admin.cursor() as cur:
+            cur.execute(f"DROP SCHEMA {schema} CASCADE")
+        admin.close()
+
+
+def test_rows_are_typed_client_side_for_copy(tmp_path):
+    src = tmp_path / "delta.csv"
+    src.write_text(
+        "Transaction_ID,Age,Date,Year,Amount,Ratings,Feedback\n"
+        " t1 ,22,12/31/2023,2023, 1.5,4.12345678901234567,\"Good, fast\"\n"
+        "t2,30,not a date,2023.5,x,inf,  \n"
+        ",41,2024-01-02,99999999999,,,\n"
+    )
+    df = pd.read_csv(src, dtype=str)
+    mapping = table_mapping(df.columns)
+    assert [tbl for _, tbl in mapping] == ["transaction_id", "date", "year", "amount", "ratings", "feedback"]
+
+    typed = typed_frame(df, mapping)
+    assert typed["transaction_id"].tolist()[:2] == ["t1", "t2"] and pd.isna(typed["transaction_id"][2])
+    assert typed["date"].tolist()[0] == "2023-12-31" and pd.isna(typed["date"][1])
+    assert typed["year"].tolist()[0] == 2023 and typed["year"].isna().tolist() == [False, True, True]
+    assert typed["amount"].isna().tolist() == [False, True, True]
+    assert typed["ratings"].isna().tolist() == [False, True, True]
+
+    stream = ChunkStream(copy_chunks(src, mapping, chunksize=2))
+    rows = list(csv.reader(io.StringIO(stream.read().decode())))
+    assert rows == [
+        ["t1", "2023-12-31", "2023", "1.5", "4.12345678901234567", "Good, fast"],
+        ["t2", "", "", "", "", ""],
+        ["", "2024-01-02", "", "", "", ""],
+    ]
+
+
+def test_na_tokens_stay_text_outside_typed_columns(tmp_path):
+    src = tmp_path / "delta.csv"
+    src.write_text("Transaction_ID,Name,Date,Amount,Feedback\nt1,NA,NA,NA,None\nt2, null ,N/A,nan,\n")
+    mapping = table_mapping(["Transaction_ID", "Name", "Date", "Amount", "Feedback"])
+
+    rows = list(csv.reader(io.StringIO(b"".join(copy_chunks(src, mapping)).decode())))
+    assert rows == [["t1", "NA", "", "", "None"], ["t2", "null", "", "", ""]]
+
+
+def test_partitions_produce_the_same_copy_rows(tmp_path):
+    from etl.utils import open_csv_byte_range, split_csv_byte_ranges
+
+    src = tmp_path / "source.csv"
+    src.write_text("Transaction_ID,Amount,Date\n" + "".join(f"t{i},{i}.5,1/{i % 28 + 1}/2024\n" for i in range(500)))
+    mapping = table_mapping(["Transaction_ID", "Amount", "Date"])
+    whole = b"".join(copy_chunks(src, mapping, chunksize=64))
+
+    header, ranges = split_csv_byte_ranges(src, 3)
+    parts = []
+    for start, end in ranges:
+        with open_csv_byte_range(src, start, end, header) as fh:
+            parts.append(b"".join(copy_chunks(fh, mapping, chunksize=64, header=header)))
+    assert len(ranges) == 3 and b"".join(parts) == whole
+
+
+def test_merge_updates_only_changed_rows():
+    from etl.load_to_postgres import merge_sql
+
+    sql = merge_sql("raw_transactions_delta_x", table_mapping(["Transaction_ID", "Amount", "Email"]))
+    assert "ORDER BY transaction_id, load_seq DESC" in sql
+    assert "ON CONFLICT (transaction_id) DO UPDATE SET amount = EXCLUDED.amount, email = EXCLUDED.email" in sql
+    assert "WHERE (t.amount, t.email) IS DISTINCT FROM (EXCLUDED.amount, EXCLUDED.email)" in sql
+    assert "ON CONFLICT (transaction_id) DO NOTHING" in merge_sql("s", table_mapping(["Transaction_ID"]))
+
+
+def test_chunks_are_routed_to_monthly_partitions(tmp_path):
+    from etl.load_to_postgres import file_months, merge_key, merge_sql, partition_ddl, routed_chunks
+
+    src = tmp_path / "delta.csv"
+    src.write_text("Transaction_ID,Date\nt1,01/31/2024\nt2,bad\nt3,2023-12-05\nt4,1/2/2024\n")
+    mapping = table_mapping(["Transaction_ID", "Date"])
+    assert file_months(src, mapping) == {"2023-12", "2024-01"}
+    assert partition_ddl("2023-12").endswith("raw_transactions_p2023_12 PARTITION OF raw_transactions FOR VALUES FROM ('2023-12-01') TO ('2024-01-01')")
+
+    routed = list(routed_chunks(src, mapping, chunksize=3))
+    assert routed == [
+        ("raw_transactions_default", b"t2,\n"),
+        ("raw_transactions_p2023_12", b"t3,2023-12-05\n"),
+        ("raw_transactions_p2024_01", b"t1,2024-01-31\n"),
+        ("raw_transactions_p2024_01", b"t4,2024-01-02\n"),
+    ]
+    assert b"".join(sorted(data for _, data in routed)) == b"".join(sorted(copy_chunks(src, mapping, chunksize=1)))
+
+    src.write_text("Transaction_ID,Date\nt1,1-01-01\nt2,999-01-01\nt3,0999-01-01\nt4,12/31/9999\nt5,2262-03-31\n")
+    assert file_months(src, mapping) == {"2262-03"}
+    assert [partition for partition, _ in routed_chunks(src, mapping)] == ["raw_transactions_default", "raw_transactions_p2262_03"]
+
+    sql = merge_sql("s", table_mapping(["Transaction_ID", "Date", "Amount"]), merge_key(partitioned=True))
+    assert "DISTINCT ON (transaction_id) transaction_id, date, amount" in sql
+    assert "ON CONFLICT (transaction_id, date) DO UPDATE SET amount = EXCLUDED.amount" in sql
+    assert "WHERE t.transaction_id = src.transaction_id AND t.date IS NOT DISTINCT FROM src.date" in sql
+    assert "xmax" not in sql
+
+
+def test_staging_table_load_casts_known_columns(pg, tmp_path):
+    from etl.load_to_postgres import create_table_and_load
+
+    conn, _ = pg
+    src = tmp_path / "source.csv"
+    src.write_text("Transaction_ID,Name,Amount,Quantity,Date,Unknown\nt1,NA, 1.5 ,2,2024-01-31,x\nt2, ,,,,y\n")
+    create_table_and_load(conn, src)
+    with conn.cursor() as cur:
+        cur.execute("SELECT transaction_id, name, amount, quantity, date::date::text FROM raw_transactions ORDER BY transaction_id")
+        assert cur.fetchall() == [("t1", "NA", 1.5, 2, "2024-01-31"), ("t2", None, None, None, None)]
+
+
+def test_recovery_rolls_decided_runs_forward_and_others_back(pg, tmp_path):
+    from etl import load_to_postgres as lp
+
+    conn, params = pg
+    with conn.cursor() as cur:
+        cur.execute("SHOW max_prepared_transactions")
+        if int(cur.fetchone()[0]) < 3:
+            pytest.skip("server has too few max_prepared_transactions")
+    lp.run_sql_file(conn, lp.DDL_FILE)
+    lp.recover_loads(conn)  # creates the run log
+
+    def prepare(run_id, transaction_id):
+        other = lp.connect(params)
+        other.tpc_begin(f"{lp.run_prefix(run_id)}0000")
+        with other.cursor() as cur:
+            cur.execute("INSERT INTO raw_transactions (transaction_id) VALUES (%s)", (transaction_id,))
+        other.tpc_prepare()
+        other.close()
+        with conn.cursor() as cur:
+            cur.execute(f"INSERT INTO {lp.LOAD_RUNS_TABLE} (run_id, csv, file_digest, partitions) VALUES (%s, 'x.csv', 'd', 1)", (run_id,))
+        conn.commit()
+
+    decided, undecided, live = (f"test{uuid.uuid4().hex[:8]}{n}" for n in "abc")
+    prepare(decided, "decided")
+    lp._set_run_state(conn, decided, "committing")
+    prepare(undecided, "undecided")
+    prepare(live, "live")
+    holder = lp.connect(params)
+    try:
+        lp._run_lock(holder, live)
+        assert lp.recover_loads(conn) == {decided: "done", undecided: "aborted"}
+        assert lp._prepared_count(conn, lp.run_prefix(live)) == 1
+    finally:
+        holder.close()
+        lp.finish_prepared(conn, lp.run_prefix(live), commit=False)
+    with conn.cursor() as cur:
+        cur.execute("SELECT transaction_id FROM raw_transactions")
+        assert cur.fetchall() == [("decided",)]
+
+
+def _create_table(conn, partitioned: bool):
+    """raw_transactions from the DDL, or the plain table created before partitioning."""
+    from etl.load_to_postgres import DDL_FILE
+
+    ddl = DDL_FILE.read_text()
+    if not partitioned:
+        ddl = ddl.replace(") PARTITION BY RANGE (date);", ");")
+    with conn.cursor() as cur:
+        cur.execute(ddl)
+    conn.commit()
+
+
+@pytest.mark.parametrize("partitioned", [True, False])
+def test_upsert_merges_deltas_on_transaction_id(pg, tmp_path, partitioned):
+    from etl.load_to_postgres import upsert_load
+
+    conn, _ = pg
+    _create_table(conn, partitioned)
+    first = tmp_path / "first.csv"
+    first.write_text("Transaction_ID,Date,Amount\nt1,2024-01-05,1\nt2,2024-02-05,2\nt2,2024-02-05,3\n,2024-01-01,9\nt4,,4\nt4,,4\n")
+    assert upsert_load(conn, first) == {"rows": 6, "inserted": 3, "updated": 0, "unchanged": 0, "duplicates_in_delta": 2, "skipped_without_transaction_id": 1}
+
+    second = tmp_path / "second.csv"
+    second.write_text("Transaction_ID,Date,Amount\nt1,2024-01-05,1\nt2,2024-02-05,5\nt3,2024-03-05,7\nt4,,8\n")
+    assert upsert_load(conn, second) == {"rows": 4, "inserted": 1, "updated": 2, "unchanged": 1, "duplicates_in_delta": 0, "skipped_without_transaction_id": 0}
+
+    with conn.cursor() as cur:
+        cur.execute("SELECT transaction_id, amount::float8 FROM raw_transactions ORDER BY transaction_id")
+        assert cur.fetchall() == [("t1", 1.0), ("t2", 5.0), ("t3", 7.0), ("t4", 8.0)]
+        cur.execute("SELECT count(*) FROM pg_tables WHERE tablename LIKE 'raw_transactions_delta_%'")
+        assert cur.fetchone()[0] == 0
+
+
+@pytest.mark.parametrize("partitioned", [True, False])
+def test_corrected_date_moves_the_row(pg, tmp_path, partitioned):
+    from etl.load_to_postgres import upsert_load
+
+    conn, _ = pg
+    _create_table(conn, partitioned)
+    first = tmp_path / "first.csv"
+    first.write_text("Transaction_ID,Date,Amount\nt1,2024-01-31,1\nt2,2024-01-15,2\n")
+    upsert_load(conn, first)
+    second = tmp_path / "second.csv"
+    second.write_text("Transaction_ID,Date,Amount\nt1,2024-02-01,1\nt2,2024-01-15,2\n")
+    assert upsert_load(conn, second) == {"rows": 2, "inserted": 0, "updated": 1, "unchanged": 1, "duplicates_in_delta": 0, "skipped_without_transaction_id": 0}
+
+    with conn.cursor() as cur:
+        cur.execute("SELECT transaction_id, date::date::text FROM raw_transactions ORDER BY transaction_id")
+        assert cur.fetchall() == [("t1", "2024-02-01"), ("t2", "2024-01-15")]
+        if partitioned:
+            cur.execute("SELECT count(*) FROM raw_transactions_p2024_02")
+            assert cur.fetchone()[0] == 1
+            cur.execute("SELECT transaction_id, date::date::text FROM raw_transaction_keys ORDER BY transaction_id")
+            assert cur.fetchall() == [("t1", "2024-02-01"), ("t2", "2024-01-15")]
+
+
+def test_appends_are_refused_once_merge_keys_exist(pg, tmp_path):
+    from etl.load_to_postgres import bulk_load, create_table_and_load, stream_load, upsert_load
+
+    conn, params = pg
+    _create_table(conn, partitioned=True)
+    delta = tmp_path / "delta.csv"
+    delta.write_text("Transaction_ID,Date,Amount\nt1,2024-01-31,1\n")
+    upsert_load(conn, delta)
+    again = tmp_path / "again.csv"
+    again.write_text("Transaction_ID,Date,Amount\nt1,2024-02-01,1\n")
+    for load in (stream_load, create_table_and_load):
+        with pytest.raises(RuntimeError):
+            load(conn, again)
+    with pytest.raises(RuntimeError):
+        bulk_load(conn, params, again)
+    with conn.cursor() as cur:
+        cur.execute("SELECT transaction_id, date::date::text FROM raw_transactions")
+        assert cur.fetchall() == [("t1", "2024-01-31")]
+
+
+@pytest.mark.parametrize("partitioned", [True, False])
+def test_merge_key_rejects_existing_duplicates(pg, partitioned):
+    from etl.load_to_postgres import ensure_merge_key, psycopg2
+
+    conn, _ = pg
+    _create_table(conn, partitioned)
+    with conn.cursor() as cur:
+        cur.execute("INSERT INTO raw_transactions (transaction_id) VALUES ('t1'), ('t1')")
+    conn.commit()
+    with pytest.raises(RuntimeError):
+        ensure_merge_key(conn, partitioned)
+
+    with conn.cursor() as cur:
+        cur.execute("DELETE FROM raw_transactions")
+    conn.commit()
+    ensure_merge_key(conn, partitioned)
+    with conn.cursor() as cur:
+        cur.execute("INSERT INTO raw_transactions (transaction_id) VALUES ('t1')")
+        with pytest.raises(psycopg2.IntegrityError):
+            # undated rows still collide (NULLS NOT DISTINCT on the partitioned table)
+            cur.execute("INSERT INTO raw_transactions (transaction_id) VALUES ('t1')")
+    conn.rollback()
+
+
+def test_resumed_bulk_load_skips_the_ddl_indexes():
+    from etl.load_to_postgres import DDL_FILE, without_index_statements
+
+    ddl = DDL_FILE.read_text()
+    stripped = without_index_statements(ddl)
+    assert "CREATE INDEX" in ddl and "CREATE INDEX" not in stripped
+    assert "CREATE TABLE IF NOT EXISTS raw_transactions (" in stripped and "PARTITION OF raw_transactions DEFAULT" in stripped
+
+
+def _plain_indexes(conn):
+    with conn.cursor() as cur:
+        cur.execute("SELECT indexname FROM pg_indexes WHERE tablename = 'raw_transactions' AND indexname LIKE 'idx_%' ORDER BY indexname")
+        names = [row[0] for row in cur.fetchall()]
+    conn.commit()
+    return names
+
+
+def test_bulk_load_defers_and_rebuilds_indexes(pg, tmp_path, monkeypatch):
+    from etl import load_to_postgres as lp
+
+    conn, params = pg
+    src = tmp_path / "source.csv"
+    src.write_text("Transaction_ID,Customer_ID,Date\n" + "".join(f"t{i},c{i % 7},2024-0{i % 3 + 1}-05\n" for i in range(30)))
+    indexes = ["idx_raw_transactions_customer_id", "idx_raw_transactions_date", "idx_raw_transactions_transaction_id"]
+
+    seen = []
+    stream_load = lp.stream_load
+    monkeypatch.setattr(lp, "stream_load", lambda conn, *args, **kwargs: seen.append(_plain_indexes(conn)) or stream_load(conn, *args, **kwargs))
+    assert lp.bulk_load(conn, params, src) == 30
+    assert seen == [[]] and _plain_indexes(conn) == indexes and lp.deferred_indexes(conn) == []
+
+    # interrupted after the drop: the rerun neither rebuilds them before loading nor loses them
+    assert lp.defer_indexes(conn) == indexes and _plain_indexes(conn) == []
+    assert lp.bulk_load(conn, params, src) == 30
+    assert seen[-1] == [] and _plain_indexes(conn) == indexes and lp.deferred_indexes(conn) == []
+    with conn.cursor() as cur:
+        # partitioned: the rebuilt indexes cover the partitions too
+        cur.execute("SELECT count(*) FROM pg_indexes WHERE tablename = 'raw_transactions_p2024_01' AND indexdef NOT LIKE '%UNIQUE%'")
+        assert cur.fetchone()[0] == 3
+
+    # interrupted after the load: --rebuild-indexes finishes without loading again
+    lp.defer_indexes(conn)
+    assert lp.rebuild_indexes(conn, params) == indexes
+    assert _plain_indexes(conn) == indexes
+    with conn.cursor() as cur:
+        cur.execute("SELECT count(*) FROM raw_transactions")
+        assert cur.fetchone()[0] == 60
@@ -0,0 +1,36 @@
+import pandas as pd
+from etl.clean_csv import try_parse_date, try_parse_time
+from etl.parsing import clear_caches, get_cache, parse_date_series, parse_time_series
+
+DATE_FMTS = ["%m/%d/%Y", "%Y-%m-%d"]
+TIME_FMTS = ["%H:%M:%S", "%H:%M"]
+
+
+def test_parse_series_matches_scalar_helpers():
+    dates = pd.Series([" 12/31/2023 ", "2023-1-5", "2/30/2023", "13/01/2023", "", None, "nan", "0001-01-01", "1/1/23"])
+    times = pd.Series(["7:38:33", " 12:00 ", "25:00", "07:05:60", "", None, "12:00:00.5", "1:2:3"])
+
+    assert parse_date_series(dates, DATE_FMTS).tolist() == [try_parse_date(v, DATE_FMTS) for v in dates]
+    assert parse_time_series(times, TIME_FMTS).tolist() == [try_parse_time(v, TIME_FMTS) for v in times]
+
+
+def test_distinct_values_parsed_once_across_calls():
+    clear_caches()
+    chunk = pd.Series(["12/31/2023", "6/7/2023", "12/31/2023", None, "bad"] * 100)
+
+    first = parse_date_series(chunk, DATE_FMTS)
+    cache = get_cache(("date", tuple(DATE_FMTS)))
+    assert len(cache) == 3 and cache.misses == 3
+
+    second = parse_date_series(chunk.iloc[::-1], DATE_FMTS)
+    assert cache.misses == 3 and cache.hits == 3
+    assert second.iloc[::-1].tolist() == first.tolist()
+    assert first.tolist()[:5] == ["2023-12-31", "2023-06-07", "2023-12-31", None, None]
+
+
+def test_leap_seconds_are_rejected_like_strptime():
+    from etl.parsing import matches_format_series
+
+    times = pd.Series(["00:00:60", "00:00:61", "23:59:61", "00:01:01", "00:00:00"])
+    assert parse_time_series(times, TIME_FMTS).tolist() == [None, None, None, "00:01:01", "00:00:00"]
+    assert matches_format_series(times, "%H:%M:%S").tolist() == [False, False, False, True, True]
@@ -0,0 +1,78 @@
+import pandas as pd
+import pytest
+from etl.utils import read_csv
+
+pytest.importorskip("pyarrow")
+from etl.staging import fresh_staged_parquet, read_staged, write_parquet_staging
+
+
+def test_parquet_staging_round_trip(tmp_path):
+    staged = tmp_path / "staged.csv"
+    staged.write_text(
+        "Transaction_ID,Email,Amount,Year\n"
+        "1,a@b.com,1.5,2023\n"
+        ",NA,x,2024\n"
+    )
+    out = write_parquet_staging(staged)
+    assert out == tmp_path / "staged.parquet"
+    assert fresh_staged_parquet(staged) == out
+
+    typed = read_staged(staged)
+    assert typed["Year"].tolist() == [2023, 2024]
+    assert typed["Amount"].isna().tolist() == [False, True]
+
+    text = read_staged(staged, text=True, columns=["Email", "Amount", "Nope"])
+    pd.testing.assert_frame_equal(text, read_csv(staged, text=True)[["Email", "Amount"]])
+
+    staged.write_text("Transaction_ID,Email,Amount,Year\n9,c@d.org,2,2025\n")
+    assert fresh_staged_parquet(staged) is None
+    assert read_staged(staged)["Transaction_ID"].tolist() == ["9"]
+
+
+def test_validation_typed_artifact_feeds_later_stages(tmp_path):
+    from etl import validate
+    from etl.clean_csv import clean_csv
+    from etl.staging import FAILED_PREFIX, fresh_typed_parquet
+
+    staged = tmp_path / "staged.csv"
+    staged.write_text(
+        "Transaction_ID,Email,Amount,Year\n"
+        "1,a@b.com, 1.5,2023\n"
+        "2,c@d.org,x,2024.5\n"
+        "3,e@f.net,,\n"
+    )
+    expected_clean = clean_csv(staged, out_path=tmp_path / "plain.csv")
+
+    res = validate.validate_csv(str(staged), save_result=False, emit_typed=True, chunksize=2, key_index_path=None)
+    artifact = fresh_typed_parquet(staged)
+    assert res["meta"]["typed_artifact"] == str(artifact)
+    failed = pd.read_parquet(artifact)
+    assert failed[FAILED_PREFIX + "Amount"].tolist() == [False, True, False]
+    assert failed[FAILED_PREFIX + "Year"].tolist() == [False, False, False]
+
+    typed = read_staged(staged)
+    assert typed["Amount"].tolist()[0] == 1.5 and typed["Amount"].isna().tolist() == [False, True, True]
+    assert typed["Year"].isna().tolist() == [False, True, True]
+    assert FAILED_PREFIX + "Amount" not in typed.columns
+
+    assert clean_csv(staged, out_path=tmp_path / "typed.csv", chunksize=2) == expected_clean
+    assert (tmp_path / "typed.csv").read_text() == (tmp_path / "plain.csv").read_text()
+
+
+@pytest.mark.parametrize("amount", ["1.5", "x"])
+def test_every_typed_read_gives_the_same_frame(tmp_path, amount):
+    staged = tmp_path / "staged.csv"
+    staged.write_text(
+        "Transaction_ID,Age,Amount,Year\n"
+        f"1,22,{amount},2023\n"
+        "2,35,2,2024\n"
+    )
+    direct = read_csv(staged)
+    assert str(direct["Age"].dtype) == "string[pyarrow]"
+
+    from etl import validate
+    validate.validate_csv(str(staged), save_result=False, emit_typed=True, key_index_path=None)
+    pd.testing.assert_frame_equal(read_staged(staged), direct)
+
+    write_parquet_staging(staged)
+    pd.testing.assert_frame_equal(read_staged(staged), direct)
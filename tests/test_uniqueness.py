@@ -0,0 +1,52 @@
+import numpy as np
+import pandas as pd
+from etl.uniqueness import DuplicateCounter, RepeatFilter, key_hashes
+
+
+def _keys(n=3000):
+    rng = np.random.default_rng(7)
+    values = np.array([f"k{i}" for i in rng.integers(0, 2500, n)], dtype=object)
+    values[::97] = np.nan
+    return values
+
+
+def test_spilled_counter_matches_duplicated():
+    values = _keys()
+    ser = pd.Series(values, dtype=object)
+    dup_mask = ser.duplicated(keep=False)
+    expected = (int(dup_mask.sum()), ser[dup_mask].unique().tolist()[:20])
+
+    counter = DuplicateCounter(spill_rows=500, partitions=4)
+    for start in range(0, len(values), 300):
+        counter.add(values[start:start + 300], np.arange(start, min(start + 300, len(values))))
+    count, samples = counter.result(20)
+    assert count == expected[0]
+    assert samples[1:] == expected[1][1:] and pd.isna(samples[0]) and pd.isna(expected[1][0])
+
+
+def test_repeat_filter_never_misses_a_duplicate():
+    values = _keys()
+    first, second = RepeatFilter(bits=1 << 12), RepeatFilter(bits=1 << 12)
+    first.update(key_hashes(values[:1500]))
+    second.update(key_hashes(values[1500:]))
+    first.merge(second)
+
+    dup_mask = pd.Series(values, dtype=object).duplicated(keep=False).to_numpy()
+    assert first.maybe_repeated(key_hashes(values))[dup_mask].all()
+
+
+def test_spill_files_removed_when_validation_raises():
+    import pytest
+    from etl.expectations import Unique, ValidationPlan, run_plan
+
+    plan = ValidationPlan()
+    unique = Unique("id", spill_rows=10)
+    plan.add(unique)
+
+    def frames():
+        yield pd.DataFrame({"id": pd.Series([f"k{i}" for i in range(50)], dtype=object)})
+        raise ValueError("bad chunk")
+
+    with pytest.raises(ValueError):
+        run_plan(frames(), plan)
+    assert unique.counter._spill_dir is None and not unique.counter._spills
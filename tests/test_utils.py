@@ -0,0 +1,41 @@
+import pandas as pd
+from etl.utils import open_csv_byte_range, read_csv, split_csv_byte_ranges
+
+
+def _write(tmp_path):
+    src = tmp_path / "in.csv"
+    src.write_text(
+        "Transaction_ID,Email,Amount,Zipcode\n"
+        "1, a@b.com ,1.50,007\n"
+        ",NA,,\n"
+        "3,null,x,N/A\n"
+        "4,c@d.org,2,10\n"
+    )
+    return src
+
+
+def test_text_read_matches_pandas(tmp_path):
+    src = _write(tmp_path)
+    expected = pd.read_csv(src, dtype=str)
+
+    pd.testing.assert_frame_equal(read_csv(src, text=True), expected)
+    pd.testing.assert_frame_equal(pd.concat(list(read_csv(src, text=True, chunksize=3))), expected)
+
+
+def test_typed_read_uses_config_types(tmp_path):
+    df = read_csv(_write(tmp_path))
+
+    assert df["Amount"].isna().tolist() == [False, True, True, False]
+    assert df["Amount"].iloc[0] == 1.5
+    assert df["Zipcode"].tolist()[0] == "007"
+
+
+def test_byte_ranges_cover_every_row_once(tmp_path):
+    src = _write(tmp_path)
+    header, ranges = split_csv_byte_ranges(src, 3)
+
+    parts = []
+    for start, end in ranges:
+        with open_csv_byte_range(src, start, end, header) as fh:
+            parts.append(read_csv(fh, text=True, header=header))
+    assert pd.concat(parts)["Transaction_ID"].tolist() == pd.read_csv(src, dtype=str)["Transaction_ID"].tolist()
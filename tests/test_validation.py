@@ -15,5 +15,55 @@ def test_validation_sample(tmp_path, monkeypatch):
     # run validate
     sys.path.insert(0, str(repo_root))
     from etl import validate
-    ok = validate.run_validation(str(staged))
+    ok = validate.run_validation(str(staged), save_result=False, use_cache=False)
     assert ok is True
+
+
+def test_unchanged_file_reuses_cached_report(tmp_path, monkeypatch):
+    repo_root = Path(__file__).resolve().parents[1]
+    sys.path.insert(0, str(repo_root))
+    from etl import validate
+    from etl.result_cache import ResultCache
+
+    monkeypatch.setattr(validate, "ResultCache", lambda: ResultCache(tmp_path / "cache", max_entries=2))
+    staged = tmp_path / "staged.csv"
+    shutil.copy2(repo_root / "sample_data" / "sample_transactions.csv", staged)
+
+    first = validate.validate_csv(str(staged), save_result=False, use_cache=True)
+    assert "cached" not in first["meta"]
+    again = validate.validate_csv(str(staged), save_result=False, use_cache=True)
+    assert again["meta"]["cached"] is True
+    assert again["statistics"] == first["statistics"]
+
+    # new content, new key; the oldest entries are evicted
+    with staged.open("a") as fh:
+        fh.write("," * 29 + "\n")
+    changed = validate.validate_csv(str(staged), save_result=False, use_cache=True)
+    assert "cached" not in changed["meta"] and changed["success"] is False
+    validate.validate_csv(str(staged), save_result=False, use_cache=True, failure_budget=0)
+    validate.validate_csv(str(staged), save_result=False, use_cache=True, failure_budget=1)
+    assert len(list((tmp_path / "cache").glob("*.json"))) == 3  # two reports + the digest stamps
+
+
+def test_sample_mode_reports_estimates(tmp_path):
+    repo_root = Path(__file__).resolve().parents[1]
+    sys.path.insert(0, str(repo_root))
+    from etl import validate
+    from etl.sampling import sample_lines
+
+    staged = tmp_path / "staged.csv"
+    rows = (repo_root / "sample_data" / "sample_transactions.csv").read_text().splitlines()
+    # every fourth row lacks its Amount
+    body = [r if i % 4 else ",".join("" if j == 19 else v for j, v in enumerate(r.split(","))) for i, r in enumerate(rows[1:] * 40)]
+    staged.write_text("\n".join([rows[0]] + body) + "\n")
+
+    header, lines, _ = sample_lines(staged, 200, seed=1)
+    assert len(lines) == 200 and all(line in staged.read_bytes() for line in lines)
+
+    res = validate.validate_csv(str(staged), save_result=False, sample=200, seed=1, key_index_path=None)
+    assert res["statistics"]["rows"] == 200
+    assert abs(res["statistics"]["estimated_total_rows"] - 1000) < 50
+    amount = next(f for f in res["results"] if f["expectation"] == "expect_column_values_to_not_be_null" and f["column"] == "Amount")
+    low, high = amount["result"]["confidence_interval"]
+    assert low < 0.25 < high
+    assert {e["column"] for e in res["meta"]["sample"]["estimates"]} >= {"Amount", "Email"}